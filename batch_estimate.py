@@ -0,0 +1,141 @@
+"""Batch-Schätzung für den gesamten Bestand offener Aufträge.
+
+Aufruf:
+    python batch_estimate.py offene_auftraege.xlsx -o schaetzungen.csv
+
+Eingabe (CSV/Excel/JSON):
+- JSON: Liste von Aufträgen in der Form von SIMULATED_AP_PLUS_PROJECTS
+  ({'Interne_Auftragsnummer': ..., 'Systeme': [...], 'Zugewiesener_Mitarbeiter': ...,
+  optional 'Geplanter_Start': '2025-03-03'}).
+- CSV/Excel: eine Zeile pro System mit der Spalte 'Interne_Auftragsnummer' und den
+  System-Spalten ('Produkttyp', 'Größe', 'Seitenverkleidung', 'Dachtyp', 'Anzahl_Gewerke', ...).
+  Zeilen mit gleicher Auftragsnummer bilden einen Auftrag.
+
+Ausgabe: CSV, JSON (Liste) oder JSON Lines (.jsonl) mit einer Zeile je Auftrag. Die Ergebnisse
+werden blockweise geschrieben, sodass auch sehr große Auftragslisten wenig Speicher brauchen.
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from feature_encoder import ProjectFeatureEncoder
+from resources import get_model, load_model
+from zeitprognose import estimate_batch
+
+# Spalten, die in CSV/Excel den Auftrag beschreiben (alle anderen gehören zum System)
+AUFTRAG_SPALTEN = ['Interne_Auftragsnummer', 'Zugewiesener_Mitarbeiter', 'Geplanter_Start']
+
+# Anzahl Aufträge pro predict-Aufruf; ein normaler Morgenlauf passt in einen Block
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def projects_from_frame(df):
+    """Fasst eine Tabelle mit einer Zeile pro System zu Aufträgen zusammen (Reihenfolge bleibt erhalten)."""
+    if 'Interne_Auftragsnummer' not in df.columns:
+        raise ValueError("Spalte 'Interne_Auftragsnummer' fehlt in der Auftragsliste")
+
+    projects = {}
+    for record in df.to_dict('records'):
+        nummer = record['Interne_Auftragsnummer']
+        if pd.isna(nummer):
+            continue
+        project = projects.get(nummer)
+        if project is None:
+            project = projects[nummer] = {'Interne_Auftragsnummer': nummer, 'Systeme': []}
+            for spalte in AUFTRAG_SPALTEN[1:]:
+                wert = record.get(spalte)
+                if wert is not None and pd.notna(wert):
+                    project[spalte] = wert
+        # Leere Zellen weglassen, damit unvollständige Systeme vom Encoder übersprungen werden
+        system = {k: v for k, v in record.items() if k not in AUFTRAG_SPALTEN and pd.notna(v)}
+        if system:
+            project['Systeme'].append(system)
+    return list(projects.values())
+
+
+def load_projects(path):
+    """Liest eine Auftragsliste aus CSV, Excel oder JSON.
+
+    path ist ein Dateipfad oder ein Datei-Objekt mit Attribut name (z.B. ein Streamlit-Upload).
+    """
+    endung = os.path.splitext(getattr(path, 'name', path))[1].lower()
+    if endung == '.json':
+        if hasattr(path, 'read'):
+            return json.load(path)
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    if endung == '.csv':
+        return projects_from_frame(pd.read_csv(path))
+    if endung in ('.xlsx', '.xls'):
+        return projects_from_frame(pd.read_excel(path))
+    raise ValueError(f"Unbekanntes Eingabeformat: {endung} (erwartet .csv, .xlsx, .xls oder .json)")
+
+
+def iter_estimates(projects, model, encoder=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Schätzt die Aufträge blockweise und liefert je Block einen Ergebnis-DataFrame."""
+    if encoder is None:
+        encoder = ProjectFeatureEncoder.for_model(model)
+    for start in range(0, len(projects), chunk_size):
+        yield estimate_batch(projects[start:start + chunk_size], model, encoder)
+
+
+def write_results(chunks, path):
+    """Schreibt die Ergebnis-Blöcke nacheinander in eine CSV-, JSON- oder JSON-Lines-Datei."""
+    endung = os.path.splitext(path)[1].lower()
+    if endung not in ('.csv', '.json', '.jsonl'):
+        raise ValueError(f"Unbekanntes Ausgabeformat: {endung} (erwartet .csv, .json oder .jsonl)")
+
+    anzahl = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if endung == '.json':
+            f.write('[')
+        for chunk in chunks:
+            if endung == '.csv':
+                chunk.to_csv(f, index=False, header=(anzahl == 0))
+                anzahl += len(chunk)
+                continue
+            for record in chunk.to_dict('records'):
+                zeile = json.dumps(record, ensure_ascii=False)
+                if endung == '.json':
+                    f.write((',\n' if anzahl > 0 else '\n') + zeile)
+                else:
+                    f.write(zeile + '\n')
+                anzahl += 1
+        if endung == '.json':
+            f.write('\n]\n')
+    return anzahl
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schätzt Zeichnungs- und Stücklistenzeiten für eine Liste offener Aufträge.")
+    parser.add_argument('eingabe', help="Auftragsliste (.csv, .xlsx, .xls oder .json)")
+    parser.add_argument('-o', '--ausgabe', default='schaetzungen.csv', help="Ergebnisdatei (.csv, .json oder .jsonl)")
+    parser.add_argument('--modell', default=None, help="Pfad zu einer Modelldatei (Standard: aktive Version der Registry)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Aufträge pro predict-Aufruf")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    # Standardmodell über resources laden, damit der geteilte Vorhersage-Cache greift
+    model = get_model() if args.modell is None else load_model(args.modell)
+    encoder = ProjectFeatureEncoder.for_model(model)
+    t_modell = time.perf_counter() - start
+
+    start = time.perf_counter()
+    projects = load_projects(args.eingabe)
+    t_einlesen = time.perf_counter() - start
+    print(f"Modell geladen in {t_modell:.3f}s, {len(projects)} Aufträge eingelesen in {t_einlesen:.3f}s")
+
+    start = time.perf_counter()
+    anzahl = write_results(iter_estimates(projects, model, encoder, args.chunk_size), args.ausgabe)
+    t_schaetzung = time.perf_counter() - start
+
+    durchsatz = anzahl / t_schaetzung if t_schaetzung > 0 else float('inf')
+    print(f"{anzahl} Aufträge geschätzt und nach {args.ausgabe} geschrieben in {t_schaetzung:.3f}s "
+          f"({durchsatz:.0f} Aufträge/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Benchmark-Suite für Einlesen, Kodierung, Training und Schätzung.
+
+Erzeugt für jede Größe (Standard 100 bis 100.000 Projekte) eine synthetische Historie und
+Auftragsliste (synthetic_data.py) und misst getrennt:
+    historie_excel     Excel-Datei lesen (openpyxl, kalter Cache)
+    historie_cache     dieselbe Datei über den Parquet-Cache
+    aufbereitung       wide_to_long + Kodierung der Historie (build_training_set)
+    kodierung          Kodierung der offenen Aufträge (encode_many)
+    training           Random Forest wie train_model.py
+    batch              estimate_batch über alle Aufträge (ohne Vorhersage-Cache)
+Einmal je Lauf:
+    einzelschaetzung   estimate_times für ein Projekt (Median)
+    app_start          erster Lauf von zeitprognose_app.py (Importe, Modell laden)
+    app_rerun          zweiter Lauf (Streamlit-Rerun)
+
+Die Ergebnisse werden als JSON gespeichert. Mit --vergleich wird gegen einen früheren Lauf
+verglichen; ist eine Messung um mehr als --schwelle (relativ) langsamer, endet das Skript
+mit Exit-Code 1.
+
+Aufruf:
+    python benchmark.py --groessen 100 1000 10000 -o benchmark_neu.json --vergleich benchmark_alt.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from feature_encoder import ProjectFeatureEncoder
+from history_cache import read_workbook_cached
+from history_ingest import build_training_set
+from model_registry import REGISTRY
+from resources import active_model_path, get_model, model_version
+from synthetic_data import synthetic_history, synthetic_orders, write_history_workbook
+from train_model import test_mask, train_full
+from zeitprognose import estimate_batch, estimate_times
+
+GROESSEN = [100, 1000, 10000, 100000]
+# Excel-Dateien über dieser Größe werden nicht geschrieben/gelesen (openpyxl braucht Minuten)
+EXCEL_MAX = 10000
+# Relative Verschlechterung, ab der eine Messung als Regression gilt
+SCHWELLE = 0.25
+# Absolute Mindestdifferenz, damit Rauschen bei sehr kurzen Messungen nicht anschlägt
+MIN_DIFFERENZ_S = 0.005
+EINZEL_WIEDERHOLUNGEN = 200
+
+APP_DATEI = 'zeitprognose_app.py'
+_APP_SKRIPT = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter()
+at.run()
+erster = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+print(json.dumps({'app_start': erster, 'app_rerun': time.perf_counter() - start, 'fehler': bool(at.exception)}))
+"""
+
+
+def _wiederholungen(n):
+    """Kleine Größen mehrfach messen (bestes Ergebnis zählt), große nur einmal."""
+    return min(5, max(1, 10000 // max(n, 1)))
+
+
+def _messen(funktion, wiederholungen=1):
+    """Führt funktion wiederholt aus; gibt (kürzeste Laufzeit in s, Ergebnis) zurück."""
+    beste = float('inf')
+    ergebnis = None
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        ergebnis = funktion()
+        beste = min(beste, time.perf_counter() - start)
+    return beste, ergebnis
+
+
+def _messung(stufe, projekte, sekunden):
+    return {
+        'stufe': stufe,
+        'projekte': projekte,
+        'sekunden': sekunden,
+        'projekte_pro_s': projekte / sekunden if sekunden > 0 else None,
+    }
+
+
+def bench_size(n, model, encoder, seed=42, excel_max=EXCEL_MAX, training_max=None, verbose=True):
+    """Alle größenabhängigen Messungen für n Projekte als Liste von Messungen."""
+    wiederholungen = _wiederholungen(n)
+    historie = synthetic_history(n, seed)
+    orders = synthetic_orders(n, seed + 1)
+    messungen = []
+
+    if n <= excel_max:
+        with tempfile.TemporaryDirectory() as tmp:
+            pfad = os.path.join(tmp, 'historie.xlsx')
+            write_history_workbook(historie, pfad)
+            cache_dir = os.path.join(tmp, 'cache')
+            excel_s, (df, info) = _messen(lambda: read_workbook_cached(pfad, cache_dir=cache_dir))
+            assert info['quelle'] == 'excel', info
+            messungen.append(_messung('historie_excel', n, excel_s))
+            cache_s, (df, info) = _messen(lambda: read_workbook_cached(pfad, cache_dir=cache_dir), wiederholungen)
+            messungen.append(_messung('historie_cache', n, cache_s))
+    elif verbose:
+        print(f"  historie_excel/historie_cache übersprungen (> {excel_max} Projekte)")
+
+    sekunden, training_set = _messen(lambda: build_training_set(historie), wiederholungen)
+    messungen.append(_messung('aufbereitung', n, sekunden))
+
+    systeme = [order['Systeme'] for order in orders]
+    sekunden, _ = _messen(lambda: encoder.encode_many(systeme), wiederholungen)
+    messungen.append(_messung('kodierung', n, sekunden))
+
+    if training_max is None or n <= training_max:
+        ist_test = test_mask(training_set.projekt_ids)
+        sekunden, _ = _messen(lambda: train_full(training_set.X, training_set.y, ist_test), wiederholungen)
+        messungen.append(_messung('training', n, sekunden))
+    elif verbose:
+        print(f"  training übersprungen (> {training_max} Projekte)")
+
+    sekunden, _ = _messen(lambda: estimate_batch(orders, model, encoder, cache=None), wiederholungen)
+    messungen.append(_messung('batch', n, sekunden))
+    return messungen
+
+
+def bench_single(model, encoder, seed=42, wiederholungen=EINZEL_WIEDERHOLUNGEN):
+    """Median-Latenz von estimate_times für ein einzelnes Projekt (ohne Vorhersage-Cache)."""
+    systeme = synthetic_orders(1, seed)[0]['Systeme']
+    listen = [[s.get(feld) for s in systeme] for feld in
+              ('Produkttyp', 'Größe', 'Seitenverkleidung', 'Dachtyp', 'Anzahl_Gewerke', 'Tortyp', 'Photovoltaikintegration')]
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        estimate_times(*listen, None, None, 'Alle', None, model, encoder, cache=None)
+        zeiten.append(time.perf_counter() - start)
+    return _messung('einzelschaetzung', 1, float(np.median(zeiten)))
+
+
+def bench_app(app_datei=APP_DATEI):
+    """Erster Lauf und Rerun der Streamlit-App in einem frischen Prozess."""
+    verzeichnis = os.path.dirname(os.path.abspath(app_datei))
+    ausgabe = subprocess.run(
+        [sys.executable, '-c', _APP_SKRIPT, os.path.abspath(app_datei)],
+        cwd=verzeichnis, capture_output=True, text=True, check=True,
+    )
+    werte = json.loads(ausgabe.stdout.strip().splitlines()[-1])
+    if werte['fehler']:
+        print("Warnung: App-Lauf mit Fehler beendet")
+    return [_messung('app_start', 1, werte['app_start']), _messung('app_rerun', 1, werte['app_rerun'])]
+
+
+def run(groessen=GROESSEN, seed=42, excel_max=EXCEL_MAX, training_max=None, mit_app=True, verbose=True):
+    """Führt alle Messungen aus und gibt das Ergebnis-Dict (wie in der JSON-Datei) zurück."""
+    # Dasselbe Modell wie App und Dienst: aktive Registry-Version (kompaktes Artefakt, falls vorhanden)
+    model = get_model()
+    encoder = ProjectFeatureEncoder.for_model(model)
+
+    messungen = [bench_single(model, encoder, seed)]
+    for n in groessen:
+        if verbose:
+            print(f"Messe {n} Projekte...")
+        messungen.extend(bench_size(n, model, encoder, seed, excel_max, training_max, verbose))
+    if mit_app:
+        messungen.extend(bench_app())
+
+    return {
+        'erstellt': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plattform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'modell': type(model).__name__,
+        'modell_datei': os.path.basename(active_model_path()),
+        'modell_registry_version': REGISTRY.active(),
+        'modell_hash': (model_version(model) or '')[:12] or None,
+        'seed': seed,
+        'groessen': list(groessen),
+        'messungen': {f"{m['stufe']}/{m['projekte']}": m for m in messungen},
+    }
+
+
+def compare(alt, neu, schwelle=SCHWELLE, min_differenz_s=MIN_DIFFERENZ_S):
+    """Vergleicht zwei Ergebnisse; eine Zeile je gemeinsamer Messung mit Spalte 'regression'."""
+    zeilen = []
+    for name, messung in neu['messungen'].items():
+        if name not in alt['messungen']:
+            continue
+        alt_s = alt['messungen'][name]['sekunden']
+        neu_s = messung['sekunden']
+        verhaeltnis = neu_s / alt_s if alt_s > 0 else float('inf')
+        zeilen.append({
+            'messung': name,
+            'alt_s': alt_s,
+            'neu_s': neu_s,
+            'verhaeltnis': verhaeltnis,
+            'regression': verhaeltnis > 1 + schwelle and neu_s - alt_s > min_differenz_s,
+        })
+    return pd.DataFrame(zeilen, columns=['messung', 'alt_s', 'neu_s', 'verhaeltnis', 'regression'])
+
+
+def print_results(ergebnis):
+    tabelle = pd.DataFrame(ergebnis['messungen'].values())
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.4f}'.format):
+        print(tabelle.to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst Einlesen, Kodierung, Training und Schätzung auf synthetischen Daten.")
+    parser.add_argument('--groessen', type=int, nargs='+', default=GROESSEN, help="Anzahl Projekte je Stufe")
+    parser.add_argument('-o', '--ausgabe', default='benchmark_ergebnis.json', help="Ergebnisdatei (JSON)")
+    parser.add_argument('--vergleich', help="Früheres Ergebnis (JSON), gegen das verglichen wird")
+    parser.add_argument('--schwelle', type=float, default=SCHWELLE, help="Relative Verschlechterung, ab der eine Regression gemeldet wird")
+    parser.add_argument('--excel-max', type=int, default=EXCEL_MAX, help="Größte Projektzahl, für die eine Excel-Datei gemessen wird")
+    parser.add_argument('--training-max', type=int, help="Größte Projektzahl, für die das Training gemessen wird")
+    parser.add_argument('--ohne-app', action='store_true', help="Start der Streamlit-App nicht messen")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    ergebnis = run(args.groessen, args.seed, args.excel_max, args.training_max, not args.ohne_app)
+    print_results(ergebnis)
+    with open(args.ausgabe, 'w', encoding='utf-8') as f:
+        json.dump(ergebnis, f, ensure_ascii=False, indent=2)
+    print(f"Ergebnis gespeichert in {args.ausgabe}")
+
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            alt = json.load(f)
+        if alt.get('modell_hash') != ergebnis['modell_hash']:
+            print(f"Hinweis: anderes Modell als im Vergleichslauf ({alt.get('modell_hash')} -> {ergebnis['modell_hash']})")
+        vergleich = compare(alt, ergebnis, args.schwelle)
+        with pd.option_context('display.width', 200, 'display.float_format', '{:.4f}'.format):
+            print(vergleich.to_string(index=False))
+        regressionen = vergleich[vergleich['regression']]
+        if len(regressionen):
+            print(f"{len(regressionen)} Regression(en) über {args.schwelle:.0%}: {', '.join(regressionen['messung'])}")
+            sys.exit(1)
+        print(f"Keine Regression über {args.schwelle:.0%} gegenüber {args.vergleich}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Kapazitätsplanung: Arbeitslast je Konstrukteur und Kalenderwoche.
+
+plan_capacity schätzt alle offenen Aufträge mit einem einzigen Batch-Aufruf
+(estimate_batch), ordnet jeden Auftrag über 'Geplanter_Start' einer Kalenderwoche zu
+(ohne Datum oder mit Datum in der Vergangenheit: die aktuelle Woche, bei nicht lesbarem
+Datum: WOCHE_UNGUELTIG) und summiert
+Zeichnungs- und Stücklistenstunden je Mitarbeiter und Woche per groupby. Übersteigt die
+Summe die Wochenkapazität, gilt der Mitarbeiter in dieser Woche als überlastet.
+
+rebalance schlägt Umverteilungen innerhalb derselben Woche vor (Greedy): Solange ein
+Mitarbeiter überlastet ist, wird einer seiner Aufträge zum Kollegen mit der meisten freien
+Kapazität verschoben, sofern er dort hineinpasst. Bevorzugt wird der kleinste Auftrag, der
+die Überlast allein abbaut, sonst der größte passende. Nicht zugewiesene Aufträge haben
+keine Kapazität und werden so ebenfalls verteilt.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import TRACER
+from zeitprognose import estimate_batch
+
+WOCHENKAPAZITAET_H = 38.0
+NICHT_ZUGEWIESEN = 'Nicht zugewiesen'
+SPALTE_START = 'Geplanter_Start'
+# Woche für Aufträge mit nicht lesbarem Startdatum (werden gemeldet, nicht umverteilt)
+WOCHE_UNGUELTIG = 'Startdatum ungültig'
+
+CapacityPlan = namedtuple('CapacityPlan', ['auftraege', 'auslastung', 'vorschlaege'])
+CapacityPlan.__doc__ = """Ergebnis der Kapazitätsplanung: Aufträge mit Stunden und Woche, Auslastung je
+(Mitarbeiter, Woche) und Umverteilungsvorschläge."""
+
+VORSCHLAG_SPALTEN = ['Interne_Auftragsnummer', 'Woche', 'Stunden', 'Von', 'Nach']
+
+
+def parse_start_dates(starts):
+    """Startdaten als Series von Timestamps und Maske der nicht lesbaren Angaben.
+
+    Erkannt werden ISO 8601 (mit oder ohne Uhrzeit), Datumsobjekte und deutsche Angaben
+    (TT.MM.JJJJ). Jeder Wert wird für sich gelesen, nicht nach dem Format des ersten Werts.
+    Fehlende oder leere Angaben sind NaT, gelten aber nicht als unlesbar.
+    """
+    werte = pd.Series(starts, dtype=object)
+    fehlt = werte.isna() | (werte.astype(str).str.strip() == '')
+    datum = pd.to_datetime(werte.where(~fehlt), errors='coerce', format='ISO8601')
+    rest = datum.isna() & ~fehlt
+    if rest.any():
+        datum[rest] = pd.to_datetime(werte[rest], errors='coerce', format='mixed', dayfirst=True)
+    return datum, (datum.isna() & ~fehlt).to_numpy()
+
+
+def calendar_weeks(starts, heute=None):
+    """ISO-Kalenderwochen ('2025-W07') zu den Startdaten.
+
+    Fehlende oder vergangene Daten -> aktuelle Woche, nicht lesbare Daten -> WOCHE_UNGUELTIG.
+    """
+    heute = pd.Timestamp(heute or date.today()).normalize()
+    datum, ungueltig = parse_start_dates(starts)
+    datum = datum.where(datum >= heute, heute)
+    iso = datum.dt.isocalendar()
+    wochen = (iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)).to_numpy(dtype=object)
+    wochen[ungueltig] = WOCHE_UNGUELTIG
+    return wochen
+
+
+def _capacity_for(mitarbeiter, kapazitaet):
+    """Wochenkapazität je Mitarbeiter (kapazitaet: Stunden für alle oder Dict je Mitarbeiter)."""
+    if isinstance(kapazitaet, dict):
+        werte = [kapazitaet.get(name, WOCHENKAPAZITAET_H) for name in mitarbeiter]
+    else:
+        werte = [kapazitaet] * len(mitarbeiter)
+    return pd.Series(werte, index=mitarbeiter, dtype=np.float64).where(
+        pd.Index(mitarbeiter) != NICHT_ZUGEWIESEN, 0.0
+    )
+
+
+def workload(auftraege, kapazitaet=WOCHENKAPAZITAET_H, mitarbeiter=None):
+    """Stunden, Kapazität und Auslastung je (Mitarbeiter, Woche).
+
+    mitarbeiter ergänzt Mitarbeiter ohne Aufträge, damit sie in jeder Woche als mögliches
+    Ziel einer Umverteilung erscheinen. Spalten: Mitarbeiter, Woche, Auftraege, Stunden,
+    Kapazitaet, Frei, Auslastung, Ueberlastet. Für WOCHE_UNGUELTIG sind Kapazitaet, Frei und
+    Auslastung NaN und Ueberlastet False.
+    """
+    namen = list(dict.fromkeys(list(mitarbeiter or []) + auftraege['Mitarbeiter'].tolist()))
+    wochen = sorted(auftraege['Woche'].unique())
+    index = pd.MultiIndex.from_product([namen, wochen], names=['Mitarbeiter', 'Woche'])
+
+    summen = auftraege.groupby(['Mitarbeiter', 'Woche']).agg(
+        Auftraege=('Interne_Auftragsnummer', 'size'),
+        Stunden=('Stunden', 'sum'),
+    ).reindex(index, fill_value=0)
+    # Nicht zugewiesene Aufträge und WOCHE_UNGUELTIG nur zeigen, wo es Aufträge gibt
+    ungueltig = summen.index.get_level_values('Woche') == WOCHE_UNGUELTIG
+    summen = summen[
+        ((summen.index.get_level_values('Mitarbeiter') != NICHT_ZUGEWIESEN) & ~ungueltig) | (summen['Auftraege'] > 0)
+    ]
+
+    summen['Kapazitaet'] = _capacity_for(namen, kapazitaet).reindex(summen.index.get_level_values('Mitarbeiter')).to_numpy()
+    # Ohne lesbares Startdatum keine Woche: keine Kapazität, Auslastung NaN, nie überlastet
+    summen.loc[summen.index.get_level_values('Woche') == WOCHE_UNGUELTIG, 'Kapazitaet'] = np.nan
+    summen['Frei'] = summen['Kapazitaet'] - summen['Stunden']
+    summen['Auslastung'] = summen['Stunden'] / summen['Kapazitaet'].where(summen['Kapazitaet'] > 0)
+    summen['Ueberlastet'] = summen['Frei'] < 0
+    return summen.reset_index()
+
+
+def _rebalance_week(nummern, stunden, von, namen, frei):
+    """Greedy-Umverteilung einer Woche; frei wird angepasst. Gibt Liste von (Auftrag, Stunden, Von, Nach)."""
+    vorschlaege = []
+    ziele = np.array([name != NICHT_ZUGEWIESEN for name in namen])
+    offen = np.ones(len(nummern), dtype=bool)
+    for quelle in np.argsort(frei):
+        if frei[quelle] >= 0:
+            break
+        eigene = np.flatnonzero((von == quelle) & offen)
+        while frei[quelle] < 0 and len(eigene):
+            kandidaten_frei = np.where(ziele, frei, -np.inf)
+            kandidaten_frei[quelle] = -np.inf
+            ziel = int(np.argmax(kandidaten_frei))
+            passend = eigene[stunden[eigene] <= kandidaten_frei[ziel]]
+            if not len(passend):
+                break
+            reicht = passend[stunden[passend] >= -frei[quelle]]
+            wahl = reicht[np.argmin(stunden[reicht])] if len(reicht) else passend[np.argmax(stunden[passend])]
+            frei[quelle] += stunden[wahl]
+            frei[ziel] -= stunden[wahl]
+            offen[wahl] = False
+            eigene = eigene[eigene != wahl]
+            vorschlaege.append((nummern[wahl], float(stunden[wahl]), namen[quelle], namen[ziel]))
+    return vorschlaege
+
+
+def rebalance(auftraege, auslastung):
+    """Umverteilungsvorschläge für alle überlasteten (Mitarbeiter, Woche); Spalten VORSCHLAG_SPALTEN."""
+    zeilen = []
+    for woche, last in auslastung.groupby('Woche', sort=True):
+        if woche == WOCHE_UNGUELTIG or not last['Ueberlastet'].any():
+            continue
+        namen = last['Mitarbeiter'].tolist()
+        frei = last['Frei'].to_numpy(dtype=np.float64).copy()
+        woche_auftraege = auftraege[auftraege['Woche'] == woche]
+        von = pd.Index(namen).get_indexer(woche_auftraege['Mitarbeiter'])
+        for nummer, stunden, quelle, ziel in _rebalance_week(
+            woche_auftraege['Interne_Auftragsnummer'].to_numpy(),
+            woche_auftraege['Stunden'].to_numpy(dtype=np.float64),
+            von, namen, frei,
+        ):
+            zeilen.append((nummer, woche, stunden, quelle, ziel))
+    return pd.DataFrame(zeilen, columns=VORSCHLAG_SPALTEN)
+
+
+def plan_capacity(projects, model=None, encoder=None, kapazitaet=WOCHENKAPAZITAET_H, mitarbeiter=None, heute=None,
+                  cache=None):
+    """Schätzt alle Aufträge und berechnet Auslastung und Umverteilungsvorschläge (siehe CapacityPlan).
+
+    projects: Aufträge in der Form von SIMULATED_AP_PLUS_PROJECTS, optional mit 'Geplanter_Start'
+    (Datum). kapazitaet: Wochenstunden für alle oder Dict je Mitarbeiter. Standardmäßig wird der
+    Vorhersage-Cache umgangen (wie bei scenario_sweep), damit Tausende Aufträge die Einträge
+    der interaktiven Schätzungen nicht verdrängen.
+    """
+    projects = list(projects)
+    with TRACER.span('kapazitaetsplanung', auftraege=len(projects)):
+        auftraege = estimate_batch(projects, model, encoder, cache)
+        with TRACER.span('aggregation'):
+            auftraege['Mitarbeiter'] = auftraege['Zugewiesener_Mitarbeiter'].fillna(NICHT_ZUGEWIESEN)
+            auftraege['Woche'] = calendar_weeks([p.get(SPALTE_START) for p in projects], heute)
+            ungueltig = int((auftraege['Woche'] == WOCHE_UNGUELTIG).sum())
+            if ungueltig:
+                print(f"{ungueltig} Aufträge mit nicht lesbarem {SPALTE_START}, eingeplant unter '{WOCHE_UNGUELTIG}'")
+            TRACER.count('startdatum_ungueltig', ungueltig)
+            auftraege['Stunden'] = auftraege['Zeichnungszeit_h'] + auftraege['Stuecklistenzeit_h']
+            auslastung = workload(auftraege, kapazitaet, mitarbeiter)
+        with TRACER.span('umverteilung'):
+            vorschlaege = rebalance(auftraege, auslastung)
+        TRACER.count('ueberlastungen', int(auslastung['Ueberlastet'].sum()))
+    return CapacityPlan(auftraege, auslastung, vorschlaege)
@@ -0,0 +1,227 @@
+"""Kompaktes Inferenz-Artefakt für Random-Forest-Modelle ohne scikit-learn zur Laufzeit.
+
+export_forest legt alle Bäume eines RandomForestRegressor hintereinander in zusammenhängende
+NumPy-Arrays (Feature, Schwelle, linkes/rechtes Kind, Werte) und speichert sie als .npy-Dateien
+in einem Verzeichnis (<modell>.forest/). CompactForest lädt diese per Memory-Mapping und wertet
+alle Bäume gleichzeitig mit reinem NumPy aus. Blätter verweisen auf sich selbst, sodass nach
+max_depth Schritten jede Zeile in ihrem Blatt steht.
+
+Die Vorhersagen sind identisch zu model.predict (gleiche float32-Umwandlung der Eingabe,
+gleiche Summationsreihenfolge über die Bäume). Über max_depth/max_trees lässt sich das
+Artefakt verkleinern; dann weichen die Vorhersagen entsprechend ab.
+
+Aufruf für ein vorhandenes Modell:
+    python compact_forest.py ki_zeitprognose_model.joblib [--max-tiefe 12] [--max-baeume 50]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from feature_encoder import FEATURE_NAMES
+
+FOREST_SUFFIX = '.forest'
+META_DATEI = 'meta.json'
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+# Zeilen je Auswertungsblock, begrenzt den Speicher für (Bäume x Zeilen)-Indexmatrizen
+BLOCK_ZEILEN = 4096
+
+
+def compact_path(model_path):
+    """Pfad des kompakten Artefakts zu einer Modelldatei (z.B. modelle/v0003.forest)."""
+    return os.path.splitext(model_path)[0] + FOREST_SUFFIX
+
+
+def _flatten_tree(tree, offset, max_depth):
+    """Knoten-Arrays eines sklearn-Baums, optional auf max_depth gekürzt, mit globalen Indizes."""
+    left = tree.children_left.astype(np.int64)
+    right = tree.children_right.astype(np.int64)
+
+    # Knoten in Breitensuche bis zur Tiefengrenze sammeln
+    behalten = [0]
+    tiefe = {0: 0}
+    blatt = {}
+    for knoten in behalten:
+        ist_blatt = left[knoten] == -1 or (max_depth is not None and tiefe[knoten] >= max_depth)
+        blatt[knoten] = ist_blatt
+        if not ist_blatt:
+            for kind in (left[knoten], right[knoten]):
+                tiefe[kind] = tiefe[knoten] + 1
+                behalten.append(kind)
+
+    neu = {alt: offset + i for i, alt in enumerate(behalten)}
+    n = len(behalten)
+    feature = np.zeros(n, dtype=np.int32)
+    threshold = np.full(n, np.inf)
+    links = np.empty(n, dtype=np.int64)
+    rechts = np.empty(n, dtype=np.int64)
+    for i, alt in enumerate(behalten):
+        if blatt[alt]:
+            links[i] = rechts[i] = offset + i  # Blatt verweist auf sich selbst
+        else:
+            feature[i] = tree.feature[alt]
+            threshold[i] = tree.threshold[alt]
+            links[i] = neu[left[alt]]
+            rechts[i] = neu[right[alt]]
+    value = tree.value[behalten][:, :, 0].astype(np.float64)
+    return feature, threshold, links, rechts, value, max(tiefe.values())
+
+
+def export_forest(model, path, max_depth=None, max_trees=None, feature_names=None, source_hash=None):
+    """Exportiert einen RandomForestRegressor als kompaktes Artefakt nach path (Verzeichnis).
+
+    feature_names ist die Spaltenreihenfolge, mit der das Modell trainiert wurde (Standard:
+    model.feature_names_in_, sonst FEATURE_NAMES aus feature_encoder). source_hash (SHA-256 der
+    Modelldatei) erlaubt beim Laden zu prüfen, ob das Artefakt noch zum Modell passt.
+    Gibt die Metadaten zurück.
+    """
+    estimators = model.estimators_[:max_trees] if max_trees else model.estimators_
+    if feature_names is None:
+        feature_names = getattr(model, 'feature_names_in_', FEATURE_NAMES)
+
+    teile = []
+    roots = []
+    offset = 0
+    tiefe = 0
+    for estimator in estimators:
+        teil = _flatten_tree(estimator.tree_, offset, max_depth)
+        teile.append(teil[:5])
+        roots.append(offset)
+        offset += len(teil[0])
+        tiefe = max(tiefe, teil[5])
+
+    arrays = {
+        'feature': np.concatenate([t[0] for t in teile]),
+        'threshold': np.concatenate([t[1] for t in teile]),
+        'left': np.concatenate([t[2] for t in teile]),
+        'right': np.concatenate([t[3] for t in teile]),
+        'value': np.ascontiguousarray(np.concatenate([t[4] for t in teile])),
+        'roots': np.array(roots, dtype=np.int64),
+    }
+    meta = {
+        'n_trees': len(estimators),
+        'n_nodes': int(offset),
+        'n_outputs': int(arrays['value'].shape[1]),
+        'max_depth': int(tiefe),
+        'max_depth_limit': max_depth,
+        'max_trees_limit': max_trees,
+        'feature_names': [str(name) for name in feature_names],
+        'quelle_hash': source_hash,
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    with open(os.path.join(path, META_DATEI), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+class CompactForest:
+    """Reine NumPy-Auswertung eines exportierten Random Forest (siehe export_forest)."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.feature_names = list(meta['feature_names'])
+        self.n_trees = meta['n_trees']
+        self.max_depth = meta['max_depth']
+        self._feature = arrays['feature']
+        self._threshold = arrays['threshold']
+        self._left = arrays['left']
+        self._right = arrays['right']
+        self._value = arrays['value']
+        self._roots = arrays['roots']
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Lädt ein Artefakt; mit mmap=True werden die Arrays nur bei Bedarf von der Platte gelesen."""
+        with open(os.path.join(path, META_DATEI), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _leaves(self, X):
+        """Blattindizes je (Baum, Zeile) als Matrix (n_trees, n_rows)."""
+        # Wie sklearn: Eingabe als float32, Vergleich mit den float64-Schwellen
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        zeilen = np.arange(len(X))[None, :]
+        knoten = np.repeat(self._roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            links = X[zeilen, self._feature[knoten]] <= self._threshold[knoten]
+            knoten = np.where(links, self._left[knoten], self._right[knoten])
+        return knoten
+
+    def predict_trees(self, X):
+        """Vorhersagen aller Bäume als Array (n_trees, n_rows, n_outputs)."""
+        X = np.atleast_2d(X)
+        if len(X) <= BLOCK_ZEILEN:
+            return self._value[self._leaves(X)]
+        return np.concatenate(
+            [self._value[self._leaves(X[start:start + BLOCK_ZEILEN])] for start in range(0, len(X), BLOCK_ZEILEN)],
+            axis=1,
+        )
+
+    def predict(self, X):
+        """Mittelwert über alle Bäume, Form (n_rows, n_outputs) wie RandomForestRegressor.predict."""
+        X = np.atleast_2d(X)
+        ergebnis = np.empty((len(X), self._value.shape[1]))
+        for start in range(0, len(X), BLOCK_ZEILEN):
+            # Summe über die Bäume in Baumreihenfolge, dann teilen (gleiche Rundung wie sklearn)
+            ergebnis[start:start + BLOCK_ZEILEN] = self._value[self._leaves(X[start:start + BLOCK_ZEILEN])].sum(axis=0)
+        ergebnis /= self.n_trees
+        return ergebnis
+
+
+def verify(model, forest, X):
+    """Vergleicht forest.predict mit model.predict; gibt die größte absolute Abweichung zurück."""
+    if len(X) == 0:
+        return 0.0
+    erwartet = np.asarray(model.predict(X), dtype=np.float64).reshape(len(X), -1)
+    return float(np.max(np.abs(forest.predict(np.asarray(X, dtype=np.float64)) - erwartet)))
+
+
+def main(argv=None):
+    # Nur für Export und Prüfung nötig, nicht für die Auswertung
+    import joblib
+    import pandas as pd
+
+    from feature_encoder import ProjectFeatureEncoder
+    from history_cache import file_hash, read_workbook_cached
+    from history_ingest import build_training_set
+
+    parser = argparse.ArgumentParser(description="Exportiert ein Random-Forest-Modell als kompaktes NumPy-Artefakt.")
+    parser.add_argument('modell', help="Modelldatei (.joblib)")
+    parser.add_argument('--ausgabe', help="Zielverzeichnis (Standard: <modell>.forest)")
+    parser.add_argument('--max-tiefe', type=int, help="Bäume auf diese Tiefe kürzen")
+    parser.add_argument('--max-baeume', type=int, help="Nur die ersten N Bäume übernehmen")
+    parser.add_argument('--historie', default='KI_Zeitprognose_Vorlage_Projekt-W.xlsx', help="Projekthistorie für die Prüfung")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.modell)
+    ziel = args.ausgabe or compact_path(args.modell)
+    meta = export_forest(model, ziel, args.max_tiefe, args.max_baeume, source_hash=file_hash(args.modell))
+    print(f"Exportiert nach {ziel}: {meta['n_trees']} Bäume, {meta['n_nodes']} Knoten, Tiefe {meta['max_depth']}")
+
+    # Prüfung gegen das Originalmodell auf den Projekten der Historie
+    forest = CompactForest.load(ziel)
+    df, _ = read_workbook_cached(args.historie, header=1)
+    training_set = build_training_set(df, ProjectFeatureEncoder(forest.feature_names))
+    X = training_set.X
+    X_model = pd.DataFrame(X, columns=forest.feature_names) if hasattr(model, 'feature_names_in_') else X
+    print(f"Maximale Abweichung zu model.predict auf {len(X)} Projekten: {verify(model, forest, X_model):.3g}")
+
+    for name, predict, eingabe in (('kompakt', forest.predict, X[:1]), ('sklearn', model.predict, X_model[:1])):
+        start = time.perf_counter()
+        for _ in range(20):
+            predict(eingabe)
+        print(f"Einzelvorhersage {name}: {(time.perf_counter() - start) / 20 * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Gemeinsame Feature-Kodierung für Training (train_model.py) und Schätzung (zeitprognose_app.py).
+
+Ein Projekt besteht aus mehreren Systemen. Der Encoder fasst alle Systeme eines Projekts
+in einer festen Feature-Zeile zusammen (Anzahl, Flächen, Zähler je Kategorie). Die
+Spaltenindizes der Kategorien werden einmalig berechnet, danach wird jede Zeile in einem
+einzigen Durchlauf über die Systeme in ein vorab angelegtes NumPy-Array geschrieben.
+"""
+import numpy as np
+import pandas as pd
+
+# Kategorien, für die das Modell je Projekt einen Zähler erhält (Reihenfolge = Spaltenreihenfolge)
+PRODUKTTYP_KATEGORIEN = ['Carport', 'Fahrradüberdachung', 'Mülleinhausung', 'Pergola', 'Mülltonnenbox']
+SEITENVERKLEIDUNG_KATEGORIEN = ['Gittermatte', 'Ohne', 'Stahl-Lochblech', 'Stahl-Vollblech', 'Trespa', 'WL', 'WL+LBK']
+DACHTYP_KATEGORIEN = ['Gründach', 'Gründach-Light', 'Ohne', 'Polycarbonat', 'Trapezblech']
+
+KATEGORIE_FELDER = {
+    'Produkttyp': PRODUKTTYP_KATEGORIEN,
+    'Seitenverkleidung': SEITENVERKLEIDUNG_KATEGORIEN,
+    'Dachtyp': DACHTYP_KATEGORIEN,
+}
+
+FEATURE_ANZAHL_SYSTEME = 'Anzahl_Systeme'
+FEATURE_GESAMTFLAECHE = 'Gesamtflaeche'
+FEATURE_DURCHSCHNITT_GROESSE = 'Durchschnittliche_Systemgroesse'
+FEATURE_ANZAHL_GEWERKE = 'Gesamt_Anzahl_Gewerke'
+
+# Die 21 Feature-Spalten in der Reihenfolge, in der train_model.py sie erzeugt
+FEATURE_NAMES = [
+    FEATURE_ANZAHL_SYSTEME,
+    FEATURE_GESAMTFLAECHE,
+    FEATURE_DURCHSCHNITT_GROESSE,
+    FEATURE_ANZAHL_GEWERKE,
+] + [f'{feld}_{wert}' for feld, werte in KATEGORIE_FELDER.items() for wert in werte]
+
+
+class ProjectFeatureEncoder:
+    """Kodiert Projekte (Listen von System-Dicts) in Feature-Zeilen bzw. -Matrizen.
+
+    Ein System-Dict braucht die Schlüssel 'Produkttyp', 'Größe', 'Seitenverkleidung',
+    'Dachtyp' und 'Anzahl' (oder 'Anzahl_Gewerke' wie in den ap+ Daten). Systeme, deren
+    Größe oder Anzahl sich nicht in Zahlen umwandeln lässt, werden übersprungen.
+    Unbekannte Kategorien (z.B. Seitenverkleidung 'Aluline') erhöhen keinen Zähler.
+    """
+
+    def __init__(self, feature_names=None):
+        self.feature_names = list(FEATURE_NAMES if feature_names is None else feature_names)
+        fehlend = set(FEATURE_NAMES) - set(self.feature_names)
+        unbekannt = set(self.feature_names) - set(FEATURE_NAMES)
+        if fehlend or unbekannt:
+            raise ValueError(
+                f"Feature-Schema passt nicht zum Encoder (fehlend: {sorted(fehlend)}, unbekannt: {sorted(unbekannt)})"
+            )
+        self.n_features = len(self.feature_names)
+
+        spalte = {name: i for i, name in enumerate(self.feature_names)}
+        self._i_anzahl_systeme = spalte[FEATURE_ANZAHL_SYSTEME]
+        self._i_gesamtflaeche = spalte[FEATURE_GESAMTFLAECHE]
+        self._i_durchschnitt = spalte[FEATURE_DURCHSCHNITT_GROESSE]
+        self._i_gewerke = spalte[FEATURE_ANZAHL_GEWERKE]
+        # (Feldname, {Kategorie: Spaltenindex}) für den Einzeldurchlauf über die Systeme
+        self._kategorie_spalten = [
+            (feld, {wert: spalte[f'{feld}_{wert}'] for wert in werte})
+            for feld, werte in KATEGORIE_FELDER.items()
+        ]
+
+    @classmethod
+    def for_model(cls, model):
+        """Encoder, dessen Spaltenreihenfolge zum (ggf. mit Feature-Namen trainierten) Modell passt.
+
+        Berücksichtigt feature_names_in_ (sklearn) und feature_names (CompactForest).
+        """
+        feature_names = getattr(model, 'feature_names_in_', None)
+        if feature_names is None:
+            feature_names = getattr(model, 'feature_names', None)
+        return cls(None if feature_names is None else list(feature_names))
+
+    def encode(self, systems):
+        """Kodiert ein einzelnes Projekt in eine Matrix der Form (1, n_features)."""
+        X = np.zeros((1, self.n_features), dtype=np.float64)
+        self._fill_row(X[0], systems)
+        return X
+
+    def encode_many(self, projects):
+        """Kodiert mehrere Projekte (Liste von System-Listen) in eine Matrix (N, n_features)."""
+        projects = list(projects)
+        X = np.zeros((len(projects), self.n_features), dtype=np.float64)
+        for row, systems in zip(X, projects):
+            self._fill_row(row, systems)
+        return X
+
+    def encode_long(self, systems, projekt_codes, n_projects):
+        """Kodiert eine lange Systemtabelle (eine Zeile pro System) vektorisiert.
+
+        systems braucht die Spalten 'Produkttyp', 'Größe', 'Seitenverkleidung', 'Dachtyp'
+        und 'Anzahl' (bereits numerisch und vollständig), projekt_codes ordnet jede Zeile
+        einem Projekt 0..n_projects-1 zu. Die Werte je Projekt werden als gruppierte Summen
+        (np.bincount) gebildet; bei Sortierung nach Projekt und Systemnummer ergibt das
+        exakt dieselben Werte wie encode_many.
+        """
+        projekt_codes = np.asarray(projekt_codes, dtype=np.int64)
+        X = np.zeros((n_projects, self.n_features), dtype=np.float64)
+
+        anzahl_systeme = np.bincount(projekt_codes, minlength=n_projects).astype(np.float64)
+        gesamtflaeche = np.bincount(projekt_codes, weights=systems['Größe'].to_numpy(dtype=np.float64), minlength=n_projects)
+        X[:, self._i_anzahl_systeme] = anzahl_systeme
+        X[:, self._i_gesamtflaeche] = gesamtflaeche
+        X[:, self._i_gewerke] = np.bincount(projekt_codes, weights=systems['Anzahl'].to_numpy(dtype=np.float64), minlength=n_projects)
+        np.divide(gesamtflaeche, anzahl_systeme, out=X[:, self._i_durchschnitt], where=anzahl_systeme > 0)
+
+        for feld, spalten in self._kategorie_spalten:
+            # Spaltenindex je System (-1 für unbekannte Kategorien), dann Zähler je Projekt
+            index = systems[feld].map(spalten).fillna(-1).to_numpy(dtype=np.int64)
+            bekannt = index >= 0
+            np.add.at(X, (projekt_codes[bekannt], index[bekannt]), 1)
+        return X
+
+    def encode_variants(self, systems, varianten):
+        """Kodiert viele Abwandlungen eines Projekts vektorisiert in eine Matrix (len(varianten), n_features).
+
+        systems sind die unveränderten Systeme, varianten ein DataFrame mit je einem weiteren
+        System pro Zeile (Spalten wie bei encode_long, numerisch und vollständig). Die
+        unveränderten Systeme werden einmal kodiert, der Beitrag des variierten Systems
+        kommt spaltenweise hinzu. Ergebnis wie encode_many mit dem variierten System am Ende.
+        """
+        n = len(varianten)
+        X = np.repeat(self.encode(systems), n, axis=0)
+        zeilen = np.arange(n)
+
+        X[:, self._i_anzahl_systeme] += 1
+        X[:, self._i_gesamtflaeche] += varianten['Größe'].to_numpy(dtype=np.float64)
+        # Anzahl abgeschnitten wie int(...) in _fill_row
+        X[:, self._i_gewerke] += np.trunc(varianten['Anzahl'].to_numpy(dtype=np.float64))
+        X[:, self._i_durchschnitt] = X[:, self._i_gesamtflaeche] / X[:, self._i_anzahl_systeme]
+
+        for feld, spalten in self._kategorie_spalten:
+            index = varianten[feld].map(spalten).fillna(-1).to_numpy(dtype=np.int64)
+            bekannt = index >= 0
+            X[zeilen[bekannt], index[bekannt]] += 1
+        return X
+
+    def system_contribution(self, system):
+        """Beitrag eines einzelnen Systems zur Feature-Zeile (ohne Durchschnittsgröße), Vektor (n_features,).
+
+        Für übersprungene Systeme (ungültige Größe/Anzahl) ein Nullvektor.
+        """
+        beitrag = np.zeros(self.n_features, dtype=np.float64)
+        self._fill_row(beitrag, [system])
+        beitrag[self._i_durchschnitt] = 0
+        return beitrag
+
+    def model_input(self, X, model):
+        """Gibt X in der Form zurück, die model.predict ohne Warnungen akzeptiert.
+
+        Modelle, die noch mit einem DataFrame trainiert wurden (feature_names_in_), erwarten
+        benannte Spalten; alle anderen bekommen die NumPy-Matrix direkt.
+        """
+        if hasattr(model, 'feature_names_in_'):
+            return pd.DataFrame(X, columns=self.feature_names)
+        return X
+
+    def _fill_row(self, row, systems):
+        anzahl_systeme = 0
+        gesamtflaeche = 0.0
+        gewerke = 0
+        for system in systems:
+            try:
+                groesse = float(system['Größe'])
+                anzahl = int(system['Anzahl'] if 'Anzahl' in system else system['Anzahl_Gewerke'])
+            except (KeyError, ValueError, TypeError):
+                continue
+            anzahl_systeme += 1
+            gesamtflaeche += groesse
+            gewerke += anzahl
+            for feld, spalten in self._kategorie_spalten:
+                i = spalten.get(system.get(feld))
+                if i is not None:
+                    row[i] += 1
+
+        row[self._i_anzahl_systeme] = anzahl_systeme
+        row[self._i_gesamtflaeche] = gesamtflaeche
+        row[self._i_durchschnitt] = gesamtflaeche / anzahl_systeme if anzahl_systeme > 0 else 0
+        row[self._i_gewerke] = gewerke
+        return anzahl_systeme
+
+
+class RunningProjectVector:
+    """Feature-Zeile eines Projekts, die bei Änderung eines Systems nur um dessen Differenz angepasst wird.
+
+    Für die Live-Schätzung: update(schluessel, system) zieht den alten Beitrag des Systems ab
+    und addiert den neuen, statt alle Systeme neu zu kodieren. row() liefert die Zeile wie
+    encoder.encode (Durchschnittsgröße aus den laufenden Summen).
+    """
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self._summe = np.zeros(encoder.n_features, dtype=np.float64)
+        self._beitraege = {}
+
+    def __contains__(self, schluessel):
+        return schluessel in self._beitraege
+
+    def keys(self):
+        return list(self._beitraege)
+
+    def update(self, schluessel, system):
+        """Setzt das System unter schluessel (neu oder geändert)."""
+        beitrag = self.encoder.system_contribution(system)
+        alt = self._beitraege.get(schluessel)
+        if alt is not None:
+            self._summe -= alt
+        self._summe += beitrag
+        self._beitraege[schluessel] = beitrag
+
+    def remove(self, schluessel):
+        """Entfernt das System unter schluessel."""
+        alt = self._beitraege.pop(schluessel, None)
+        if alt is not None:
+            self._summe -= alt
+
+    def row(self):
+        """Aktuelle Feature-Zeile als Matrix (1, n_features)."""
+        X = self._summe.copy()[None, :]
+        anzahl_systeme = X[0, self.encoder._i_anzahl_systeme]
+        if anzahl_systeme > 0:
+            X[0, self.encoder._i_durchschnitt] = X[0, self.encoder._i_gesamtflaeche] / anzahl_systeme
+        return X
@@ -0,0 +1,128 @@
+"""Spaltenorientierter Cache (Parquet) für die Excel-Projekthistorie.
+
+Das Einlesen von .xlsx über openpyxl ist langsam. Beim ersten Lesen wird das Blatt daher
+zusätzlich als Parquet-Datei im Cache-Verzeichnis abgelegt; der Dateiname enthält den
+SHA-256 der Quelldatei. Solange sich die Excel-Datei nicht ändert, wird danach nur noch die
+Parquet-Datei gelesen. Ohne pyarrow (oder wenn ein Blatt nicht als Parquet speicherbar ist)
+wird stattdessen ein Pickle geschrieben.
+
+Aufruf zum Vergleich der Ladezeiten:
+    python history_cache.py [KI_Zeitprognose_Vorlage_Projekt-W.xlsx]
+"""
+import glob
+import hashlib
+import os
+import sys
+import time
+
+import pandas as pd
+
+CACHE_DIR = '.zeitprognose_cache'
+
+
+def file_hash(path, blocksize=1 << 20):
+    """SHA-256 des Dateiinhalts als Hex-String."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_prefix(path, sheet_name, header, cache_dir):
+    # Verzeichnis-Hash im Namen: gleichnamige Exporte aus verschiedenen Ordnern (z.B. 2023/, 2024/)
+    # dürfen sich nicht gegenseitig als veraltet löschen
+    stem = os.path.splitext(os.path.basename(path))[0]
+    ordner = hashlib.sha256(os.path.dirname(os.path.abspath(path)).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f'{stem}-{ordner}-{sheet_name}-h{header}-')
+
+
+def _write_cache(df, prefix, version):
+    """Schreibt df als Parquet (bevorzugt) oder Pickle und gibt den Dateinamen zurück."""
+    ziel = f'{prefix}{version}.parquet'
+    try:
+        df.to_parquet(ziel + '.tmp', index=False)
+    except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+        # pyarrow fehlt oder gemischte Typen in einer Spalte: Pickle als Ausweichformat
+        print(f"Parquet-Cache nicht möglich ({e}), verwende Pickle")
+        if os.path.exists(ziel + '.tmp'):
+            os.remove(ziel + '.tmp')
+        ziel = f'{prefix}{version}.pkl'
+        df.to_pickle(ziel + '.tmp')
+    os.replace(ziel + '.tmp', ziel)
+    return ziel
+
+
+def _read_cache(cache_datei):
+    if cache_datei.endswith('.parquet'):
+        return pd.read_parquet(cache_datei)
+    return pd.read_pickle(cache_datei)
+
+
+def read_workbook_cached(path, sheet_name=0, header=1, cache_dir=CACHE_DIR):
+    """Liest ein Blatt einer Excel-Datei, über den Parquet-Cache wenn möglich.
+
+    Gibt (df, info) zurück; info enthält 'quelle' ('cache' oder 'excel'), die Ladezeit in
+    Sekunden ('sekunden', inkl. Hash), die Hash-Zeit ('hash_sekunden') und die Cache-Datei.
+    """
+    start = time.perf_counter()
+    version = file_hash(path)[:16]
+    hash_sekunden = time.perf_counter() - start
+
+    prefix = _cache_prefix(path, sheet_name, header, cache_dir)
+    vorhandene = [p for p in glob.glob(glob.escape(prefix) + '*') if not p.endswith('.tmp')]
+    treffer = [p for p in vorhandene if os.path.basename(p).startswith(os.path.basename(prefix) + version + '.')]
+
+    if treffer:
+        try:
+            df = _read_cache(treffer[0])
+            return df, {
+                'quelle': 'cache',
+                'sekunden': time.perf_counter() - start,
+                'hash_sekunden': hash_sekunden,
+                'cache_datei': treffer[0],
+            }
+        except Exception as e:
+            print(f"Cache-Datei {treffer[0]} nicht lesbar ({e}), lese Excel neu")
+
+    df = pd.read_excel(path, sheet_name=sheet_name, header=header)
+    excel_sekunden = time.perf_counter() - start
+
+    cache_datei = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_datei = _write_cache(df, prefix, version)
+        # Veraltete Cache-Dateien derselben Quelle entfernen
+        for alt in vorhandene:
+            if alt != cache_datei:
+                os.remove(alt)
+    except OSError as e:
+        print(f"Cache für {path} konnte nicht geschrieben werden: {e}")
+
+    return df, {
+        'quelle': 'excel',
+        'sekunden': excel_sekunden,
+        'hash_sekunden': hash_sekunden,
+        'cache_datei': cache_datei,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else 'KI_Zeitprognose_Vorlage_Projekt-W.xlsx'
+
+    start = time.perf_counter()
+    df = pd.read_excel(path, header=1)
+    direkt = time.perf_counter() - start
+    print(f"Excel direkt (openpyxl): {len(df)} Zeilen in {direkt:.3f}s")
+
+    for durchlauf in ('erster Aufruf', 'zweiter Aufruf'):
+        df, info = read_workbook_cached(path)
+        print(f"Mit Cache, {durchlauf} ({info['quelle']}): {len(df)} Zeilen in {info['sekunden']:.3f}s "
+              f"(davon Hash {info['hash_sekunden']:.3f}s)")
+    if info['quelle'] == 'cache' and info['sekunden'] > 0:
+        print(f"Beschleunigung warm gegenüber Excel: {direkt / info['sekunden']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
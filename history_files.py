@@ -0,0 +1,288 @@
+"""Projekthistorie aus mehreren Dateien (z.B. ein Export je Jahr und Abteilung).
+
+load_history_files nimmt eine Datei, ein Verzeichnis oder ein Glob-Muster (auch mehrere)
+und verarbeitet jede gefundene Datei (.xlsx, .xls, .csv, .parquet) in einem eigenen
+Prozess: Einlesen (Excel über den Parquet-Cache, CSV und Parquet blockweise),
+Spaltennamen vereinheitlichen (reconcile_columns) und je Block von CHUNK_ZEILEN Zeilen die
+Projekt-Features bilden. An den Hauptprozess gehen nur die kompakten Feature-Matrizen
+zurück, nicht die breiten Tabellen. Dort werden die Ergebnisse in Dateireihenfolge
+zusammengeführt und nach Projekt-ID dedupliziert (die zuletzt gelesene Datei gewinnt, bei
+sortierten Jahresexporten also die neueste). Zeilen ohne Projekt-ID erhalten die Ersatz-ID
+'Datei:Zeile' und werden daher nie mit anderen Zeilen zusammengelegt.
+
+Aufruf zum Prüfen eines Export-Ordners:
+    python history_files.py "exporte/*.xlsx"
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_encoder import ProjectFeatureEncoder
+from history_cache import read_workbook_cached
+from history_ingest import (
+    SPALTE_PROJEKT_ID,
+    SPALTE_STUECKLISTENZEIT,
+    SPALTE_SYSTEMANZAHL,
+    SPALTE_ZEICHNUNGSZEIT,
+    SYSTEM_FELDER,
+    TrainingSet,
+    build_training_set,
+)
+from instrumentation import TRACER
+
+ENDUNGEN = ('.xlsx', '.xls', '.csv', '.parquet')
+# Zeilen je Verarbeitungsblock; begrenzt die lange Systemtabelle in build_training_set
+CHUNK_ZEILEN = 20000
+
+# Weitere Schreibweisen aus älteren Exporten (normalisiert, siehe _normalize) -> Spaltenname der Vorlage
+SPALTEN_ALIASE = {
+    'projektnr': SPALTE_PROJEKT_ID,
+    'projektnummer': SPALTE_PROJEKT_ID,
+    'projekt': SPALTE_PROJEKT_ID,
+    'zeichnung': SPALTE_ZEICHNUNGSZEIT,
+    'zeichnungsstunden': SPALTE_ZEICHNUNGSZEIT,
+    'stueckliste': SPALTE_STUECKLISTENZEIT,
+    'stuecklistenstunden': SPALTE_STUECKLISTENZEIT,
+    'anzahlsysteme': SPALTE_SYSTEMANZAHL,
+}
+
+BERICHT_SPALTEN = ['Datei', 'Zeilen', 'Projekte', 'Uebersprungen', 'Sekunden', 'Quelle', 'Fehler']
+
+
+def _normalize(name):
+    """Vergleichsschlüssel für Spaltennamen: klein, Umlaute ausgeschrieben, ohne Einheiten und Trennzeichen."""
+    name = str(name).lower()
+    for umlaut, ersatz in (('ä', 'ae'), ('ö', 'oe'), ('ü', 'ue'), ('ß', 'ss')):
+        name = name.replace(umlaut, ersatz)
+    name = re.sub(r'[\(\[].*?[\)\]]', '', name)
+    return re.sub(r'[^a-z0-9]', '', name)
+
+
+_KANONISCH = {_normalize(n): n for n in [SPALTE_PROJEKT_ID, SPALTE_ZEICHNUNGSZEIT, SPALTE_STUECKLISTENZEIT, SPALTE_SYSTEMANZAHL]}
+_KANONISCH.update(SPALTEN_ALIASE)
+_SYSTEM_NORMALISIERT = re.compile(r'^(%s)(\d+)$' % '|'.join(_normalize(f) for f in SYSTEM_FELDER))
+_SYSTEM_FELD = {_normalize(f): f for f in SYSTEM_FELDER}
+
+
+def reconcile_columns(df):
+    """Benennt Spalten auf das Layout der Vorlage um ('Projekt ID', 'Groesse_1', 'Zeichnungszeit [h]', ...).
+
+    Unbekannte Spalten bleiben unverändert, bei Doppelungen gilt die erste. Fehlt
+    'Systemanzahl', wird sie aus der Anzahl gefüllter 'Produkttyp N'-Spalten abgeleitet.
+    """
+    umbenennung = {}
+    for spalte in df.columns:
+        schluessel = _normalize(spalte)
+        treffer = _SYSTEM_NORMALISIERT.match(schluessel)
+        if treffer:
+            umbenennung[spalte] = f'{_SYSTEM_FELD[treffer.group(1)]} {int(treffer.group(2))}'
+        elif schluessel in _KANONISCH:
+            umbenennung[spalte] = _KANONISCH[schluessel]
+    df = df.rename(columns=umbenennung)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    if SPALTE_SYSTEMANZAHL not in df.columns:
+        produkttypen = [s for s in df.columns if re.fullmatch(r'Produkttyp \d+', str(s))]
+        df = df.assign(**{SPALTE_SYSTEMANZAHL: df[produkttypen].notna().sum(axis=1) if produkttypen else np.nan})
+    return df
+
+
+def expand_history_paths(quellen):
+    """Dateiliste zu Dateien, Verzeichnissen (nicht rekursiv) und Glob-Mustern, sortiert und ohne Dubletten."""
+    if isinstance(quellen, (str, os.PathLike)):
+        quellen = [quellen]
+    dateien = []
+    for quelle in quellen:
+        quelle = os.fspath(quelle)
+        if os.path.isdir(quelle):
+            kandidaten = [os.path.join(quelle, name) for name in os.listdir(quelle)]
+        elif os.path.isfile(quelle):
+            dateien.append(quelle)
+            continue
+        else:
+            kandidaten = glob.glob(quelle, recursive=True)
+        dateien.extend(
+            p for p in sorted(kandidaten)
+            if os.path.isfile(p) and p.lower().endswith(ENDUNGEN) and not os.path.basename(p).startswith('~$')
+        )
+    return list(dict.fromkeys(dateien))
+
+
+def _csv_format(path):
+    """Kodierung und Trennzeichen einer CSV-Datei (deutsche Excel-Exporte: cp1252, ';' und Dezimalkomma)."""
+    with open(path, 'rb') as f:
+        kopf = f.read(1 << 16)
+    try:
+        text, kodierung = kopf.decode('utf-8-sig'), 'utf-8-sig'
+    except UnicodeDecodeError:
+        text, kodierung = kopf.decode('cp1252', errors='replace'), 'cp1252'
+    erste_zeile = text.splitlines()[0] if text else ''
+    if erste_zeile.count(';') > erste_zeile.count(','):
+        return {'encoding': kodierung, 'sep': ';', 'decimal': ','}
+    return {'encoding': kodierung, 'sep': ','}
+
+
+def _read_blocks(path, chunk_zeilen):
+    """Liest eine Datei blockweise; gibt (Iterator von DataFrames, Quelle)."""
+    endung = os.path.splitext(path)[1].lower()
+    if endung == '.csv':
+        return pd.read_csv(path, chunksize=chunk_zeilen, low_memory=False, **_csv_format(path)), 'csv'
+    if endung == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return iter([pd.read_parquet(path)]), 'parquet'
+        datei = pq.ParquetFile(path)
+        return (batch.to_pandas() for batch in datei.iter_batches(batch_size=chunk_zeilen)), 'parquet'
+
+    # Excel lässt sich nicht blockweise lesen; Kopfzeile wie in der Vorlage in Zeile 2, sonst Zeile 1
+    df, info = read_workbook_cached(path, header=1)
+    if SPALTE_PROJEKT_ID not in reconcile_columns(df.head(0)).columns:
+        df, info = read_workbook_cached(path, header=0)
+    return (df.iloc[start:start + chunk_zeilen] for start in range(0, max(len(df), 1), chunk_zeilen)), info['quelle']
+
+
+def _fill_missing_ids(block, path, offset):
+    """Ersetzt fehlende Projekt-IDs (Spalte fehlt oder Zelle leer) durch 'Datei:Zeile'.
+
+    Sonst würden ID-lose Zeilen verschiedener Dateien und Blöcke (Ersatz-IDs 0, 1, ... bzw.
+    'nan') beim Deduplizieren zusammenfallen.
+    """
+    if SPALTE_PROJEKT_ID in block.columns:
+        ids = block[SPALTE_PROJEKT_ID].astype(object)
+        fehlt = (ids.isna() | (ids.astype(str).str.strip() == '')).to_numpy()
+    else:
+        ids = pd.Series(None, index=block.index, dtype=object)
+        fehlt = np.ones(len(block), dtype=bool)
+    if not fehlt.any():
+        return block
+    ids = ids.to_numpy(copy=True)
+    ids[fehlt] = [f'{path}:{offset + i + 1}' for i in np.flatnonzero(fehlt)]
+    return block.assign(**{SPALTE_PROJEKT_ID: ids})
+
+
+def ingest_file(path, feature_names=None, chunk_zeilen=CHUNK_ZEILEN):
+    """Verarbeitet eine Datei zu kompakten Trainingsdaten (läuft im Worker-Prozess).
+
+    Gibt ein Dict mit X, y, projekt_ids (als Text), skipped (mit Spalte 'datei') und den
+    Kennzahlen Zeilen, Sekunden, Quelle zurück; bei Lesefehlern steht der Fehler unter 'fehler'.
+    """
+    start = time.perf_counter()
+    encoder = ProjectFeatureEncoder(feature_names)
+    teile, zeilen, quelle = [], 0, None
+    try:
+        bloecke, quelle = _read_blocks(path, chunk_zeilen)
+        for block in bloecke:
+            block = _fill_missing_ids(reconcile_columns(block.reset_index(drop=True)), path, zeilen)
+            teil = build_training_set(block, encoder)
+            teile.append(teil._replace(
+                projekt_ids=np.asarray([str(p) for p in teil.projekt_ids], dtype=object),
+                skipped=teil.skipped.assign(zeile=teil.skipped['zeile'] + zeilen, datei=path),
+            ))
+            zeilen += len(block)
+    except Exception as e:
+        return {'datei': path, 'fehler': f'{type(e).__name__}: {e}', 'zeilen': zeilen,
+                'sekunden': time.perf_counter() - start, 'quelle': quelle}
+
+    return {
+        'datei': path,
+        'X': np.concatenate([t.X for t in teile]) if teile else np.zeros((0, encoder.n_features)),
+        'y': np.concatenate([t.y for t in teile]) if teile else np.zeros((0, 2)),
+        'projekt_ids': np.concatenate([t.projekt_ids for t in teile]) if teile else np.zeros(0, dtype=object),
+        'skipped': pd.concat([t.skipped for t in teile], ignore_index=True) if teile else pd.DataFrame(),
+        'zeilen': zeilen,
+        'sekunden': time.perf_counter() - start,
+        'quelle': quelle,
+        'fehler': None,
+    }
+
+
+def load_history_files(quellen, encoder=None, max_workers=None, chunk_zeilen=CHUNK_ZEILEN):
+    """Liest alle Historiendateien parallel und führt sie zu einem TrainingSet zusammen.
+
+    Gibt (training_set, bericht, duplikate) zurück; bericht hat eine Zeile je Datei
+    (BERICHT_SPALTEN), duplikate ist die Anzahl entfernter Zeilen mit bereits vorhandener
+    Projekt-ID (es gilt das Vorkommen aus der späteren Datei).
+    """
+    encoder = encoder or ProjectFeatureEncoder()
+    dateien = expand_history_paths(quellen)
+    if not dateien:
+        raise FileNotFoundError(f"Keine Historiendateien ({', '.join(ENDUNGEN)}) gefunden: {quellen}")
+
+    worker = min(max_workers or os.cpu_count() or 1, len(dateien))
+    with TRACER.span('historie_dateien', dateien=len(dateien), prozesse=worker):
+        if worker > 1:
+            with ProcessPoolExecutor(max_workers=worker) as pool:
+                ergebnisse = list(pool.map(
+                    ingest_file, dateien, [encoder.feature_names] * len(dateien), [chunk_zeilen] * len(dateien)
+                ))
+        else:
+            ergebnisse = [ingest_file(p, encoder.feature_names, chunk_zeilen) for p in dateien]
+
+    bericht = pd.DataFrame([
+        {
+            'Datei': e['datei'],
+            'Zeilen': e['zeilen'],
+            'Projekte': len(e['X']) if e['fehler'] is None else 0,
+            'Uebersprungen': len(e['skipped']) if e['fehler'] is None else 0,
+            'Sekunden': round(e['sekunden'], 3),
+            'Quelle': e['quelle'],
+            'Fehler': e['fehler'],
+        }
+        for e in ergebnisse
+    ], columns=BERICHT_SPALTEN)
+    ok = [e for e in ergebnisse if e['fehler'] is None]
+    TRACER.count('dateien_gelesen', len(ok))
+    TRACER.count('zeilen_gelesen', int(bericht['Zeilen'].sum()))
+
+    X = np.concatenate([e['X'] for e in ok]) if ok else np.zeros((0, encoder.n_features))
+    y = np.concatenate([e['y'] for e in ok]) if ok else np.zeros((0, 2))
+    projekt_ids = np.concatenate([e['projekt_ids'] for e in ok]) if ok else np.zeros(0, dtype=object)
+    uebersprungen = [e['skipped'] for e in ok if len(e['skipped'])]
+    skipped = pd.concat(uebersprungen, ignore_index=True) if uebersprungen else pd.DataFrame(columns=['zeile', SPALTE_PROJEKT_ID, 'Grund', 'datei'])
+
+    # Dubletten über alle Dateien: das letzte Vorkommen (spätere Datei) gewinnt
+    behalten = ~pd.Index(projekt_ids).duplicated(keep='last')
+    duplikate = int((~behalten).sum())
+    TRACER.count('projekte_dupliziert', duplikate)
+
+    training_set = TrainingSet(
+        X=X[behalten],
+        y=y[behalten],
+        projekt_ids=projekt_ids[behalten],
+        feature_names=list(encoder.feature_names),
+        skipped=skipped,
+    )
+    return training_set, bericht, duplikate
+
+
+def print_report(bericht, duplikate):
+    """Gibt Dateizeiten, Zeilen- und Projektzahlen je Datei aus."""
+    print(bericht.drop(columns='Fehler').to_string(index=False))
+    for zeile in bericht[bericht['Fehler'].notna()].itertuples():
+        print(f"Datei {zeile.Datei} übersprungen: {zeile.Fehler}")
+    print(f"Summe: {bericht['Zeilen'].sum()} Zeilen, {bericht['Projekte'].sum()} Projekte, "
+          f"{duplikate} doppelte Projekt-IDs entfernt")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liest Historiendateien parallel ein und zeigt Zeilen und Zeiten je Datei.")
+    parser.add_argument('quellen', nargs='+', help="Dateien, Verzeichnisse oder Glob-Muster")
+    parser.add_argument('--prozesse', type=int, help="Anzahl Worker-Prozesse (Standard: Anzahl CPUs)")
+    parser.add_argument('--chunk-zeilen', type=int, default=CHUNK_ZEILEN)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    training_set, bericht, duplikate = load_history_files(args.quellen, max_workers=args.prozesse, chunk_zeilen=args.chunk_zeilen)
+    print_report(bericht, duplikate)
+    print(f"{len(training_set.X)} Projekte zum Training in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Vektorisierte Aufbereitung der Projekthistorie (Excel) zu Trainingsdaten.
+
+Die Historie hat eine Zeile pro Projekt mit nummerierten Spaltengruppen je System
+('Produkttyp 1', 'Anzahl 1', 'Dachtyp 1', 'Seitenverkleidung 1', 'Größe 1', 'Produkttyp 2', ...).
+wide_to_long formt diese in eine lange Tabelle mit einer Zeile pro System um,
+build_training_set prüft die Vollständigkeit per Maske gegen 'Systemanzahl' und fasst
+die Systeme mit dem ProjectFeatureEncoder zu Projekt-Features zusammen.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from feature_encoder import ProjectFeatureEncoder
+
+SPALTE_PROJEKT_ID = 'Projekt-ID'
+SPALTE_ZEICHNUNGSZEIT = 'Zeichnungszeit'
+SPALTE_STUECKLISTENZEIT = 'Stücklistenzeit'
+SPALTE_SYSTEMANZAHL = 'Systemanzahl'
+
+# Felder je System, die für die Features vorhanden sein müssen
+SYSTEM_FELDER = ['Produkttyp', 'Anzahl', 'Dachtyp', 'Seitenverkleidung', 'Größe']
+
+_SYSTEM_SPALTE = re.compile(r'^(%s) (\d+)$' % '|'.join(re.escape(f) for f in SYSTEM_FELDER))
+
+GRUND_SYSTEMANZAHL_UNGUELTIG = 'Systemanzahl fehlt oder ist ungültig'
+GRUND_UNZUREICHENDE_DATEN = 'Unzureichende Daten (Systemanzahl <= 0 oder Zeiten fehlen)'
+GRUND_SYSTEME_UNVOLLSTAENDIG = 'Weniger vollständige Systeme als Systemanzahl'
+
+TrainingSet = namedtuple('TrainingSet', ['X', 'y', 'projekt_ids', 'feature_names', 'skipped'])
+TrainingSet.__doc__ = """Trainingsdaten: Feature-Matrix X, Zielwerte y (Zeichnungszeit, Stücklistenzeit),
+Projekt-IDs je Zeile, Feature-Namen und übersprungene Zeilen (DataFrame mit Grund)."""
+
+
+def system_slots(columns):
+    """Nummern der System-Spaltengruppen in den Spalten (z.B. [1, 2, 3, 4])."""
+    slots = set()
+    for spalte in columns:
+        treffer = _SYSTEM_SPALTE.match(str(spalte))
+        if treffer:
+            slots.add(int(treffer.group(2)))
+    return sorted(slots)
+
+
+def wide_to_long(df):
+    """Formt die nummerierten System-Spalten in eine Tabelle mit einer Zeile pro (Projektzeile, System) um.
+
+    Ergebnis-Spalten: 'zeile' (Positionsindex der Projektzeile in df), 'system_nr' und
+    SYSTEM_FELDER. Fehlende Spalten einer Gruppe werden als leer behandelt. Die Tabelle ist
+    nach Projektzeile und Systemnummer sortiert.
+    """
+    zeilen = np.arange(len(df))
+    bloecke = []
+    for nr in system_slots(df.columns):
+        block = pd.DataFrame({'zeile': zeilen, 'system_nr': nr})
+        for feld in SYSTEM_FELDER:
+            spalte = f'{feld} {nr}'
+            block[feld] = df[spalte].to_numpy() if spalte in df.columns else np.nan
+        bloecke.append(block)
+    if not bloecke:
+        return pd.DataFrame(columns=['zeile', 'system_nr'] + SYSTEM_FELDER)
+    long_df = pd.concat(bloecke, ignore_index=True)
+    return long_df.sort_values(['zeile', 'system_nr'], kind='stable', ignore_index=True)
+
+
+def _numeric_column(df, spalte):
+    """Spalte als float-Array; nicht numerische oder fehlende Werte werden NaN."""
+    if spalte not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[spalte], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def build_training_set(df, encoder=None):
+    """Erzeugt aus der Projekthistorie die Trainingsdaten (siehe TrainingSet).
+
+    Eine Projektzeile wird übernommen, wenn Systemanzahl > 0, beide Zeiten vorhanden sind
+    und genau Systemanzahl der ersten Systeme vollständig sind (alle SYSTEM_FELDER gefüllt,
+    Größe und Anzahl numerisch).
+    """
+    if encoder is None:
+        encoder = ProjectFeatureEncoder()
+
+    n = len(df)
+    systemanzahl_roh = _numeric_column(df, SPALTE_SYSTEMANZAHL)
+    systemanzahl_ok = ~np.isnan(systemanzahl_roh)
+    systemanzahl = np.trunc(np.where(systemanzahl_ok, systemanzahl_roh, 0)).astype(np.int64)
+    zeiten = np.column_stack([_numeric_column(df, SPALTE_ZEICHNUNGSZEIT), _numeric_column(df, SPALTE_STUECKLISTENZEIT)])
+    daten_ok = systemanzahl_ok & (systemanzahl > 0) & ~np.isnan(zeiten).any(axis=1)
+
+    # Systeme: nur die ersten Systemanzahl Gruppen zählen, alle Felder müssen gültig sein
+    systeme = wide_to_long(df)
+    zeile = systeme['zeile'].to_numpy(dtype=np.int64)
+    systeme['Größe'] = pd.to_numeric(systeme['Größe'], errors='coerce')
+    systeme['Anzahl'] = np.trunc(pd.to_numeric(systeme['Anzahl'], errors='coerce'))
+    gueltig = (
+        systeme[SYSTEM_FELDER].notna().all(axis=1).to_numpy()
+        & (systeme['system_nr'].to_numpy() <= systemanzahl[zeile])
+    )
+    vollstaendige = np.bincount(zeile[gueltig], minlength=n)
+    uebernehmen = daten_ok & (vollstaendige == systemanzahl)
+
+    # Gründe für übersprungene Zeilen
+    grund = np.full(n, None, dtype=object)
+    grund[~uebernehmen & daten_ok] = GRUND_SYSTEME_UNVOLLSTAENDIG
+    grund[~daten_ok] = GRUND_UNZUREICHENDE_DATEN
+    grund[~systemanzahl_ok] = GRUND_SYSTEMANZAHL_UNGUELTIG
+    projekt_ids = df[SPALTE_PROJEKT_ID].to_numpy() if SPALTE_PROJEKT_ID in df.columns else np.arange(n)
+    skipped = pd.DataFrame({
+        'zeile': np.flatnonzero(~uebernehmen),
+        SPALTE_PROJEKT_ID: projekt_ids[~uebernehmen],
+        'Systemanzahl': systemanzahl_roh[~uebernehmen],
+        'vollstaendige_Systeme': vollstaendige[~uebernehmen],
+        'Grund': grund[~uebernehmen],
+    })
+
+    # Projekt-Features aus den gültigen Systemen der übernommenen Zeilen
+    code_je_zeile = np.full(n, -1, dtype=np.int64)
+    code_je_zeile[uebernehmen] = np.arange(uebernehmen.sum())
+    auswahl = gueltig & uebernehmen[zeile]
+    X = encoder.encode_long(systeme.loc[auswahl], code_je_zeile[zeile[auswahl]], int(uebernehmen.sum()))
+
+    return TrainingSet(
+        X=X,
+        y=zeiten[uebernehmen],
+        projekt_ids=projekt_ids[uebernehmen],
+        feature_names=list(encoder.feature_names),
+        skipped=skipped,
+    )
+
+
+def skip_summary(training_set):
+    """Zusammenfassung der übersprungenen Zeilen als Text (eine Zeile je Grund)."""
+    skipped = training_set.skipped
+    if skipped.empty:
+        return "Keine Zeilen übersprungen."
+    zeilen = [f"{len(skipped)} Zeilen übersprungen:"]
+    for grund, anzahl in skipped['Grund'].value_counts().items():
+        beispiele = ', '.join(str(p) for p in skipped.loc[skipped['Grund'] == grund, SPALTE_PROJEKT_ID].head(5))
+        zeilen.append(f"  - {grund}: {anzahl} (z.B. {beispiele})")
+    return '\n'.join(zeilen)
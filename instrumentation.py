@@ -0,0 +1,151 @@
+"""Leichtgewichtige Zeitmessung (Spans), Zähler und optionales Profiling.
+
+    with TRACER.span('predict', zeilen=len(X)):
+        ...
+    TRACER.count('cache_treffer', 3)
+
+Spans lassen sich verschachteln; jeder abgeschlossene Span wird mit seinem Pfad (z.B.
+'anfrage/kodierung') und der Dauer in einem Ringpuffer für das Debug-Panel der App gehalten.
+Das Log als JSON-Zeilen ist opt-in: nur wenn die Umgebungsvariable ZEITPROGNOSE_TRACE einen
+Dateinamen enthält (z.B. zeitprognose_trace.jsonl), wird jeder Span dorthin geschrieben.
+Zähler laufen prozessweit auf; zusätzlich trägt jeder Span der obersten Ebene (eine Anfrage,
+ein Trainingslauf) die während ihm gezählten Werte im Feld 'zaehler'.
+
+profile() zeichnet einen Block mit cProfile auf (opt-in, z.B. eine Anfrage in der App oder
+train_model.py --profil) und schreibt .prof-Datei und Textzusammenfassung.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Ohne ZEITPROGNOSE_TRACE kein Log (der Service schreibt sonst je Micro-Batch eine Zeile)
+TRACE_PATH = os.environ.get('ZEITPROGNOSE_TRACE', '')
+PROFIL_DIR = 'profile'
+# Anzahl der letzten Spans, die für die Anzeige im Speicher bleiben
+PUFFER_GROESSE = 200
+
+
+class Tracer:
+    """Sammelt Spans und Zähler; threadsicher (Streamlit bedient Sessions in eigenen Threads)."""
+
+    def __init__(self, path=TRACE_PATH, puffer_groesse=PUFFER_GROESSE):
+        self.path = path or None
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = Counter()
+        self._recent = deque(maxlen=puffer_groesse)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Misst die Dauer des Blocks; attrs werden mit ins Log geschrieben.
+
+        Der Block erhält das attrs-Dict und kann darin weitere Attribute ergänzen
+        (z.B. die Quelle, aus der gelesen wurde).
+        """
+        stack = self._stack()
+        frame = {'name': name, 'zaehler': Counter()}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs['fehler'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            dauer_ms = (time.perf_counter() - start) * 1000
+            stack.pop()
+            event = {
+                'zeit': datetime.now().isoformat(timespec='milliseconds'),
+                'typ': 'span',
+                'name': name,
+                'pfad': '/'.join([f['name'] for f in stack] + [name]),
+                'dauer_ms': round(dauer_ms, 3),
+                'thread': threading.current_thread().name,
+            }
+            event.update(attrs)
+            if not stack and frame['zaehler']:
+                event['zaehler'] = dict(frame['zaehler'])
+            self._emit(event)
+
+    def count(self, name, n=1):
+        """Erhöht einen Zähler (prozessweit und für den laufenden Span der obersten Ebene)."""
+        if not n:
+            return
+        with self._lock:
+            self._counters[name] += n
+        stack = self._stack()
+        if stack:
+            stack[0]['zaehler'][name] += n
+
+    def _emit(self, event):
+        with self._lock:
+            self._recent.append(event)
+            if self.path is None:
+                return
+            try:
+                if self._file is None:
+                    # Datei offen halten (zeilengepuffert), damit ein Span nicht jedes Mal open() kostet
+                    self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+                self._file.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                print(f"Trace-Log {self.path} nicht schreibbar, schreibe keine Spans mehr: {e}")
+                self.path = None
+
+    def counters(self):
+        """Zählerstände seit Prozessstart."""
+        with self._lock:
+            return dict(self._counters)
+
+    def recent(self, n=None):
+        """Die letzten n abgeschlossenen Spans, neueste zuerst."""
+        with self._lock:
+            events = list(self._recent)
+        events.reverse()
+        return events[:n] if n else events
+
+
+def profile_path(name, directory=PROFIL_DIR):
+    """Dateiname für ein neues Profil, z.B. profile/anfrage-20240101-120000.prof."""
+    return os.path.join(directory, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+
+
+@contextmanager
+def profile(path, top=25):
+    """Zeichnet den Block mit cProfile auf.
+
+    Schreibt die Statistik nach path (auswertbar mit pstats oder snakeviz) und die top
+    Funktionen nach kumulierter Zeit nach path + '.txt'. Das gelieferte Dict enthält nach
+    dem Block 'datei' und 'zusammenfassung'.
+    """
+    ergebnis = {'datei': path, 'zusammenfassung': None}
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield ergebnis
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+        ergebnis['zusammenfassung'] = text.getvalue()
+        with open(path + '.txt', 'w', encoding='utf-8') as f:
+            f.write(ergebnis['zusammenfassung'])
+        print(f"Profil gespeichert: {path}")
+
+
+TRACER = Tracer()
@@ -0,0 +1,123 @@
+"""Versionierte Modell-Artefakte mit Metadaten.
+
+Jedes Training legt eine neue Version im Verzeichnis modelle/ ab:
+    modelle/v0001.joblib   das trainierte Modell
+    modelle/v0001.json     Metadaten (Feature-Schema, Projekt-IDs, Scores, Zeitstempel, ...)
+    modelle/v0001.forest/  kompaktes NumPy-Artefakt (nur Random Forest, siehe compact_forest.py)
+    modelle/v0001.nachbarn/ Nachbarindex für ähnliche Projekte (siehe similar_projects.py)
+
+Aktiv ist die neueste Version, solange keine Version festgepinnt ist (modelle/aktiv.json).
+Über pin()/rollback() kann die App oder train_model.py eine ältere Version aktivieren.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+import joblib
+
+REGISTRY_DIR = 'modelle'
+PIN_DATEI = 'aktiv.json'
+
+_VERSION = re.compile(r'^v(\d+)\.json$')
+
+
+class ModelRegistry:
+    """Zugriff auf die Modellversionen in einem Verzeichnis."""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _pfad(self, version, endung):
+        return os.path.join(self.root, f'{version}.{endung}')
+
+    def versions(self):
+        """Alle vorhandenen Versionen, älteste zuerst (z.B. ['v0001', 'v0002'])."""
+        if not os.path.isdir(self.root):
+            return []
+        nummern = sorted(int(m.group(1)) for m in map(_VERSION.match, os.listdir(self.root)) if m)
+        return [f'v{n:04d}' for n in nummern]
+
+    def latest(self):
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def metadata(self, version):
+        with open(self._pfad(version, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def model_path(self, version):
+        return self._pfad(version, 'joblib')
+
+    def load(self, version):
+        return joblib.load(self.model_path(version))
+
+    def save(self, model, metadata, artefakte=None):
+        """Speichert model als neue Version und gibt die Versionsbezeichnung zurück.
+
+        Das Modell wird zuerst geschrieben, die Metadaten zuletzt; erst mit der JSON-Datei
+        gilt eine Version als vorhanden. artefakte(model_path) schreibt dazwischen abgeleitete
+        Dateien (kompaktes Artefakt, Nachbarindex), damit App und Service eine neue Version
+        erst sehen, wenn sie vollständig ist.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        latest = self.latest()
+        version = f'v{(int(latest[1:]) + 1 if latest else 1):04d}'
+        metadata = dict(metadata, version=version, erstellt=datetime.now().isoformat(timespec='seconds'))
+
+        joblib.dump(model, self.model_path(version))
+        if artefakte is not None:
+            artefakte(self.model_path(version))
+        tmp = self._pfad(version, 'json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._pfad(version, 'json'))
+        return version
+
+    def pinned(self):
+        """Festgepinnte Version oder None."""
+        try:
+            with open(os.path.join(self.root, PIN_DATEI), encoding='utf-8') as f:
+                version = json.load(f).get('version')
+        except (OSError, ValueError):
+            return None
+        return version if version in self.versions() else None
+
+    def active(self):
+        """Aktive Version: die festgepinnte, sonst die neueste."""
+        return self.pinned() or self.latest()
+
+    def pin(self, version):
+        """Pinnt version als aktive Version (gilt für alle Prozesse, die die Registry lesen)."""
+        if version not in self.versions():
+            raise ValueError(f"Unbekannte Modellversion: {version}")
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, PIN_DATEI + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'gepinnt': datetime.now().isoformat(timespec='seconds')}, f)
+        os.replace(tmp, os.path.join(self.root, PIN_DATEI))
+
+    def unpin(self):
+        """Hebt das Pinning auf; danach ist wieder die neueste Version aktiv."""
+        try:
+            os.remove(os.path.join(self.root, PIN_DATEI))
+        except FileNotFoundError:
+            pass
+
+    def rollback(self):
+        """Pinnt die Version vor der aktuell aktiven und gibt sie zurück."""
+        versions = self.versions()
+        active = self.active()
+        if active is None or versions.index(active) == 0:
+            raise ValueError("Keine ältere Modellversion für einen Rollback vorhanden")
+        vorherige = versions[versions.index(active) - 1]
+        self.pin(vorherige)
+        return vorherige
+
+    def active_model_path(self, fallback=None):
+        """Pfad der aktiven Modelldatei, oder fallback, wenn die Registry leer ist."""
+        active = self.active()
+        return self.model_path(active) if active else fallback
+
+
+REGISTRY = ModelRegistry()
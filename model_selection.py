@@ -0,0 +1,136 @@
+"""Modellauswahl per paralleler k-facher Kreuzvalidierung.
+
+Vergleicht mehrere Kandidaten (Random-Forest-Varianten, HistGradientBoosting, lineares
+Basismodell) auf beiden Zielgrößen. Alle (Kandidat, Fold)-Kombinationen laufen parallel
+über joblib auf allen Kernen. Je Kandidat werden R², MAE, Trainingszeit sowie die Latenz
+für eine einzelne Vorhersage und für einen Batch gemessen. Gewählt wird der Kandidat mit
+dem besten Wert aus Genauigkeit minus latenz_gewicht * Einzel-Latenz (in ms).
+
+Die Latenz wird auf dem Modell aus dem ersten Fold gemessen, und zwar so, wie App und
+Service es auswerten: Random Forests als CompactForest (siehe compact_forest.py), alle
+anderen Kandidaten direkt. Neu trainiert wird nur der gewählte Kandidat (in train_model.py).
+"""
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compact_forest import CompactForest, export_forest
+
+ZIELE = ['Zeichnungszeit', 'Stuecklistenzeit']
+
+# R²-Punkte, die eine Millisekunde Einzel-Latenz kosten darf
+LATENZ_GEWICHT = 0.01
+BATCH_GROESSE = 1000
+
+SelectionResult = namedtuple('SelectionResult', ['best_name', 'best_estimator', 'table'])
+SelectionResult.__doc__ = """Ergebnis der Modellauswahl: Name und (unangepasster) Schätzer des
+gewählten Kandidaten sowie die Vergleichstabelle aller Kandidaten."""
+
+
+def default_candidates():
+    """Kandidaten der Modellauswahl (Name -> unangepasster Schätzer, beide Ziele gleichzeitig)."""
+    return {
+        'RandomForest (100)': RandomForestRegressor(n_estimators=100, random_state=42),
+        'RandomForest (300)': RandomForestRegressor(n_estimators=300, random_state=42),
+        'RandomForest (100, Tiefe 8)': RandomForestRegressor(n_estimators=100, max_depth=8, random_state=42),
+        'RandomForest (100, min. 3 je Blatt)': RandomForestRegressor(n_estimators=100, min_samples_leaf=3, random_state=42),
+        'HistGradientBoosting': MultiOutputRegressor(HistGradientBoostingRegressor(random_state=42)),
+        'Linear (Ridge)': make_pipeline(StandardScaler(), Ridge(alpha=1.0)),
+    }
+
+
+def _fit_fold(name, estimator, X, y, train_idx, test_idx, modell_zurueck=False):
+    """Trainiert einen Kandidaten auf einem Fold und bewertet ihn auf dem zugehörigen Testteil.
+
+    Gibt (Kennzahlen, Modell) zurück; das Modell nur mit modell_zurueck, sonst None.
+    """
+    model = clone(estimator)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_s = time.perf_counter() - start
+    prediction = model.predict(X[test_idx])
+    ergebnis = {'name': name, 'fit_s': fit_s}
+    for i, ziel in enumerate(ZIELE):
+        ergebnis[f'r2_{ziel}'] = r2_score(y[test_idx, i], prediction[:, i])
+        ergebnis[f'mae_{ziel}'] = mean_absolute_error(y[test_idx, i], prediction[:, i])
+    return ergebnis, model if modell_zurueck else None
+
+
+def serving_model(model):
+    """Modell in der Form, in der App und Service es auswerten (Random Forest als CompactForest)."""
+    if not isinstance(model, RandomForestRegressor):
+        return model
+    with tempfile.TemporaryDirectory() as ordner:
+        export_forest(model, ordner)
+        return CompactForest.load(ordner, mmap=False)
+
+
+def measure_latency(model, X, repeats=50, batch_groesse=BATCH_GROESSE):
+    """Median-Latenz einer Einzelvorhersage (ms) und Batch-Latenz je Projekt (µs)."""
+    einzel = X[:1]
+    model.predict(einzel)  # Aufwärmen
+    zeiten = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(einzel)
+        zeiten.append(time.perf_counter() - start)
+    batch = X[np.arange(batch_groesse) % len(X)]
+    start = time.perf_counter()
+    model.predict(batch)
+    batch_s = time.perf_counter() - start
+    return float(np.median(zeiten) * 1000), float(batch_s / batch_groesse * 1e6)
+
+
+def select_model(X, y, candidates=None, folds=5, latenz_gewicht=LATENZ_GEWICHT, n_jobs=-1, verbose=True):
+    """Kreuzvalidiert alle Kandidaten parallel und wählt den besten (siehe SelectionResult).
+
+    Die Vergleichstabelle enthält je Kandidat mittleres R² und MAE je Ziel, die mittlere
+    Trainingszeit je Fold, die Latenzen (auf dem Auswertungspfad, siehe serving_model) und den
+    kombinierten Auswahlwert 'auswahl_score'. best_estimator ist unangepasst.
+    """
+    candidates = default_candidates() if candidates is None else candidates
+    folds = min(folds, len(X))
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+
+    start = time.perf_counter()
+    ergebnisse = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(name, estimator, X, y, train_idx, test_idx, modell_zurueck=(fold == 0))
+        for name, estimator in candidates.items()
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+    fold_ergebnisse = [kennzahlen for kennzahlen, _ in ergebnisse]
+    # Für die Latenz genügt das Modell des ersten Folds; kein zusätzliches Training auf allen Daten
+    modelle = {kennzahlen['name']: model for kennzahlen, model in ergebnisse if model is not None}
+    if verbose:
+        print(f"Kreuzvalidierung ({len(candidates)} Kandidaten x {folds} Folds) in {time.perf_counter() - start:.1f}s")
+
+    table = pd.DataFrame(fold_ergebnisse).groupby('name', sort=False).mean()
+    table['r2_mittel'] = table[[f'r2_{ziel}' for ziel in ZIELE]].mean(axis=1)
+
+    # Latenzen nacheinander im Hauptprozess messen, damit sich die Messungen nicht stören
+    for name, model in modelle.items():
+        einzel_ms, batch_us = measure_latency(serving_model(model), X)
+        table.loc[name, 'einzel_ms'] = einzel_ms
+        table.loc[name, 'batch_us_je_projekt'] = batch_us
+
+    table['auswahl_score'] = table['r2_mittel'] - latenz_gewicht * table['einzel_ms']
+    table = table.sort_values('auswahl_score', ascending=False)
+    best_name = table.index[0]
+
+    if verbose:
+        with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+            print(table)
+        print(f"Gewählt: {best_name} (latenz_gewicht={latenz_gewicht})")
+    return SelectionResult(best_name, candidates[best_name], table)
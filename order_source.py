@@ -0,0 +1,305 @@
+"""Auftragsquellen für App, Batch-Schätzung und Kapazitätsplanung.
+
+OrderSource ist die Schnittstelle, über die offene Aufträge gelesen werden (Form wie
+SIMULATED_AP_PLUS_PROJECTS: Dict mit 'Interne_Auftragsnummer', 'Systeme',
+'Zugewiesener_Mitarbeiter', optional 'Geplanter_Start'). Implementierungen:
+
+- InMemoryOrderSource: Liste im Speicher mit Dict-Index (die simulierten ap+ Aufträge).
+- SQLiteOrderSource: lokale SQLite-Datenbank als ap+-Ersatz. Aufträge und Systeme liegen in
+  normalisierten Tabellen; Auftragsnummer und Mitarbeiter sind indiziert (B-Baum, Zugriff in
+  O(log n)). Verbindungen kommen aus einem Pool und werden zwischen Threads geteilt; viele
+  Aufträge werden mit einer einzigen Abfrage geladen.
+
+Später kann eine Quelle für den echten ap+-Zugriff dieselbe Schnittstelle implementieren.
+
+Aufruf:
+    python order_source.py import auftraege.json --db auftraege.sqlite
+    python order_source.py synthetisch 50000 --db auftraege.sqlite
+    python order_source.py info --db auftraege.sqlite
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+
+ORDER_DB_PATH = os.environ.get('ZEITPROGNOSE_AUFTRAEGE', 'auftraege.sqlite')
+POOL_GROESSE = 4
+
+# (Schlüssel im System-Dict, Spalte in der Tabelle systeme)
+SYSTEM_SPALTEN = [
+    ('Produkttyp', 'produkttyp'),
+    ('Größe', 'groesse'),
+    ('Seitenverkleidung', 'seitenverkleidung'),
+    ('Dachtyp', 'dachtyp'),
+    ('Anzahl_Gewerke', 'anzahl_gewerke'),
+    ('Tortyp', 'tortyp'),
+    ('Photovoltaikintegration', 'photovoltaikintegration'),
+    ('Gesamtwert', 'gesamtwert'),
+    ('Besonderheit', 'besonderheit'),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS auftraege (
+    id INTEGER PRIMARY KEY,
+    interne_auftragsnummer TEXT NOT NULL,
+    zugewiesener_mitarbeiter TEXT,
+    geplanter_start TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_auftraege_nummer ON auftraege (interne_auftragsnummer);
+CREATE INDEX IF NOT EXISTS idx_auftraege_mitarbeiter ON auftraege (zugewiesener_mitarbeiter);
+CREATE TABLE IF NOT EXISTS systeme (
+    auftrag_id INTEGER NOT NULL REFERENCES auftraege (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    produkttyp TEXT,
+    groesse REAL,
+    seitenverkleidung TEXT,
+    dachtyp TEXT,
+    anzahl_gewerke INTEGER,
+    tortyp TEXT,
+    photovoltaikintegration TEXT,
+    gesamtwert REAL,
+    besonderheit TEXT,
+    PRIMARY KEY (auftrag_id, position)
+) WITHOUT ROWID;
+"""
+
+_SELECT = """
+SELECT a.id, a.interne_auftragsnummer, a.zugewiesener_mitarbeiter, a.geplanter_start,
+       s.position, {spalten}
+FROM auftraege a
+LEFT JOIN systeme s ON s.auftrag_id = a.id
+""".format(spalten=', '.join(f's.{spalte}' for _, spalte in SYSTEM_SPALTEN))
+
+
+def _date_text(wert):
+    """Starttermin als Text; Datums-Objekte aus Excel/pandas als 'JJJJ-MM-TT' (ohne Uhrzeit, wie JSON-Importe)."""
+    if isinstance(wert, datetime):
+        # pd.Timestamp ist ein datetime; NaT (ungleich sich selbst) als fehlendes Datum
+        wert = wert.date() if wert == wert else None
+    return wert.isoformat() if isinstance(wert, date) else wert
+
+
+class OrderSource(ABC):
+    """Schnittstelle für Auftragsquellen; Unterklassen implementieren get_many, order_numbers und orders_for."""
+
+    def get(self, nummer):
+        """Auftrag zur Auftragsnummer oder None."""
+        return self.get_many([nummer]).get(nummer)
+
+    @abstractmethod
+    def get_many(self, nummern):
+        """Dict Auftragsnummer -> Auftrag für alle vorhandenen Nummern."""
+
+    @abstractmethod
+    def order_numbers(self):
+        """Alle Auftragsnummern in Einfügereihenfolge."""
+
+    @abstractmethod
+    def orders_for(self, mitarbeiter):
+        """Alle Aufträge eines Mitarbeiters."""
+
+    def all_orders(self):
+        """Alle Aufträge als Liste (z.B. für Batch-Schätzung und Kapazitätsplanung)."""
+        auftraege = self.get_many(self.order_numbers())
+        return list(auftraege.values())
+
+    def __len__(self):
+        return len(self.order_numbers())
+
+
+class InMemoryOrderSource(OrderSource):
+    """Aufträge aus einer Liste im Speicher (z.B. SIMULATED_AP_PLUS_PROJECTS)."""
+
+    def __init__(self, projects):
+        self._projects = {p['Interne_Auftragsnummer']: p for p in projects}
+
+    def get_many(self, nummern):
+        return {n: self._projects[n] for n in nummern if n in self._projects}
+
+    def order_numbers(self):
+        return list(self._projects)
+
+    def orders_for(self, mitarbeiter):
+        return [p for p in self._projects.values() if p.get('Zugewiesener_Mitarbeiter') == mitarbeiter]
+
+    def all_orders(self):
+        return list(self._projects.values())
+
+
+class SQLiteOrderSource(OrderSource):
+    """Aufträge in einer SQLite-Datenbank (normalisiert, indiziert, mit Verbindungs-Pool)."""
+
+    def __init__(self, path=ORDER_DB_PATH, pool_groesse=POOL_GROESSE):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_groesse)
+        self._schreiben = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Verbindung aus dem Pool (oder neu); wird danach zurückgelegt, bei vollem Pool geschlossen."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Schließt alle Verbindungen im Pool."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _orders_from_rows(rows):
+        """Fasst die Join-Zeilen (sortiert nach Auftrag und Position) zu Auftrags-Dicts zusammen."""
+        auftraege = {}
+        for row in rows:
+            _, nummer, mitarbeiter, start, position = row[:5]
+            auftrag = auftraege.get(nummer)
+            if auftrag is None:
+                auftrag = auftraege[nummer] = {'Interne_Auftragsnummer': nummer, 'Systeme': []}
+                if mitarbeiter is not None:
+                    auftrag['Zugewiesener_Mitarbeiter'] = mitarbeiter
+                if start is not None:
+                    auftrag['Geplanter_Start'] = start
+            if position is not None:
+                auftrag['Systeme'].append({
+                    schluessel: wert for (schluessel, _), wert in zip(SYSTEM_SPALTEN, row[5:]) if wert is not None
+                })
+        return auftraege
+
+    def get_many(self, nummern):
+        # Alle Nummern als ein JSON-Parameter: eine Abfrage, unabhängig vom Limit für SQL-Variablen
+        with self._connection() as conn:
+            rows = conn.execute(
+                _SELECT + "WHERE a.interne_auftragsnummer IN (SELECT value FROM json_each(?)) "
+                          "ORDER BY a.id, s.position",
+                (json.dumps(list(nummern)),),
+            ).fetchall()
+        return self._orders_from_rows(rows)
+
+    def order_numbers(self):
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute('SELECT interne_auftragsnummer FROM auftraege ORDER BY id')]
+
+    def orders_for(self, mitarbeiter):
+        with self._connection() as conn:
+            rows = conn.execute(
+                _SELECT + "WHERE a.zugewiesener_mitarbeiter = ? ORDER BY a.id, s.position", (mitarbeiter,)
+            ).fetchall()
+        return list(self._orders_from_rows(rows).values())
+
+    def all_orders(self):
+        with self._connection() as conn:
+            rows = conn.execute(_SELECT + "ORDER BY a.id, s.position").fetchall()
+        return list(self._orders_from_rows(rows).values())
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM auftraege').fetchone()[0]
+
+    def add_orders(self, projects):
+        """Fügt Aufträge in einer Transaktion ein; vorhandene Auftragsnummern werden ersetzt.
+
+        Kommt eine Auftragsnummer mehrfach vor, gilt der letzte Eintrag.
+        """
+        projects = list({p['Interne_Auftragsnummer']: p for p in projects}.values())
+        with self._schreiben, self._connection() as conn:
+            with conn:
+                conn.executemany(
+                    'DELETE FROM auftraege WHERE interne_auftragsnummer = ?',
+                    [(p['Interne_Auftragsnummer'],) for p in projects],
+                )
+                conn.executemany(
+                    'INSERT INTO auftraege (interne_auftragsnummer, zugewiesener_mitarbeiter, geplanter_start) VALUES (?, ?, ?)',
+                    [(p['Interne_Auftragsnummer'], p.get('Zugewiesener_Mitarbeiter'), _date_text(p.get('Geplanter_Start'))) for p in projects],
+                )
+                ids = dict(conn.execute(
+                    'SELECT interne_auftragsnummer, id FROM auftraege WHERE interne_auftragsnummer IN (SELECT value FROM json_each(?))',
+                    (json.dumps([p['Interne_Auftragsnummer'] for p in projects]),),
+                ))
+                conn.executemany(
+                    'INSERT INTO systeme (auftrag_id, position, {}) VALUES (?, ?, {})'.format(
+                        ', '.join(spalte for _, spalte in SYSTEM_SPALTEN), ', '.join('?' * len(SYSTEM_SPALTEN))
+                    ),
+                    [
+                        (ids[p['Interne_Auftragsnummer']], position) + tuple(system.get(schluessel) for schluessel, _ in SYSTEM_SPALTEN)
+                        for p in projects
+                        for position, system in enumerate(p.get('Systeme') or [])
+                    ],
+                )
+        return len(projects)
+
+
+_SOURCES = {}
+_SOURCES_LOCK = threading.Lock()
+
+
+def get_order_source(fallback_projects=(), path=ORDER_DB_PATH):
+    """Auftragsquelle der App: die SQLite-Datenbank unter path, falls vorhanden, sonst fallback_projects im Speicher.
+
+    Die Quelle wird einmal pro Prozess angelegt und von allen Sessions geteilt.
+    """
+    schluessel = path if path and os.path.exists(path) else None
+    with _SOURCES_LOCK:
+        if schluessel not in _SOURCES:
+            _SOURCES[schluessel] = SQLiteOrderSource(path) if schluessel else InMemoryOrderSource(fallback_projects)
+        return _SOURCES[schluessel]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verwaltet die lokale Auftragsdatenbank (SQLite).")
+    parser.add_argument('befehl', choices=['import', 'synthetisch', 'info'])
+    parser.add_argument('quelle', nargs='?', help="import: Auftragsliste (.json/.csv/.xlsx); synthetisch: Anzahl Aufträge")
+    parser.add_argument('--db', default=ORDER_DB_PATH, help="SQLite-Datei")
+    args = parser.parse_args(argv)
+
+    source = SQLiteOrderSource(args.db)
+    if args.befehl == 'import':
+        from batch_estimate import load_projects
+        start = time.perf_counter()
+        anzahl = source.add_orders(load_projects(args.quelle))
+        print(f"{anzahl} Aufträge aus {args.quelle} in {time.perf_counter() - start:.2f}s importiert")
+    elif args.befehl == 'synthetisch':
+        from synthetic_data import synthetic_orders
+        start = time.perf_counter()
+        anzahl = source.add_orders(synthetic_orders(int(args.quelle)))
+        print(f"{anzahl} synthetische Aufträge in {time.perf_counter() - start:.2f}s angelegt")
+
+    nummern = source.order_numbers()
+    print(f"{args.db}: {len(nummern)} Aufträge")
+    if nummern:
+        start = time.perf_counter()
+        for nummer in nummern[::max(1, len(nummern) // 1000)]:
+            source.get(nummer)
+        einzel = (time.perf_counter() - start) / len(nummern[::max(1, len(nummern) // 1000)])
+        start = time.perf_counter()
+        alle = source.all_orders()
+        print(f"Einzelabruf: {einzel * 1000:.3f} ms, alle {len(alle)} Aufträge: {time.perf_counter() - start:.3f}s")
+    source.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Begrenzter LRU/TTL-Cache für Modellvorhersagen.
+
+Schlüssel ist der kodierte Feature-Vektor des Projekts (siehe feature_encoder.py) zusammen
+mit der Modellversion. Die Features sind Summen und Zähler über alle Systeme und damit
+unabhängig von der Reihenfolge der Systeme; durch Runden werden auch Rundungsunterschiede
+der Flächensummen ausgeglichen. Ändert sich die Modellversion, wird der Cache geleert.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Nachkommastellen, auf die Feature-Werte für den Schlüssel gerundet werden
+KEY_DECIMALS = 6
+
+
+class PredictionCache:
+    """Thread-sicherer Cache für Vorhersagen (eine Zeile Zielwerte je Feature-Vektor)."""
+
+    def __init__(self, maxsize=10000, ttl_seconds=3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # Schlüssel -> (Vorhersage, Ablaufzeit)
+        self._model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    @staticmethod
+    def make_key(row):
+        """Kanonischer Schlüssel eines Feature-Vektors."""
+        return np.round(np.asarray(row, dtype=np.float64), KEY_DECIMALS).tobytes()
+
+    def _check_version(self, model_version):
+        # Neues Modell: alle bisherigen Vorhersagen sind ungültig
+        if model_version != self._model_version:
+            if self._entries:
+                self.flushes += 1
+            self._entries.clear()
+            self._model_version = model_version
+
+    def lookup(self, X, model_version):
+        """Sucht alle Zeilen von X im Cache.
+
+        Gibt (prediction, missing) zurück: prediction enthält die gecachten Werte (NaN bei
+        fehlenden Einträgen), missing ist eine boolesche Maske der nicht gefundenen Zeilen.
+        """
+        X = np.atleast_2d(X)
+        prediction = None
+        missing = np.ones(len(X), dtype=bool)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(model_version)
+            for i, row in enumerate(X):
+                key = self.make_key(row)
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if prediction is None:
+                    prediction = np.full((len(X), len(entry[0])), np.nan)
+                prediction[i] = entry[0]
+                missing[i] = False
+        return prediction, missing
+
+    def store(self, X, prediction, model_version):
+        """Legt die Vorhersagen für die Zeilen von X im Cache ab."""
+        X = np.atleast_2d(X)
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._check_version(model_version)
+            for row, values in zip(X, np.atleast_2d(prediction)):
+                key = self.make_key(row)
+                self._entries[key] = (np.array(values, dtype=np.float64), expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.flushes += 1
+
+    def stats(self):
+        """Zähler für die Anzeige (Treffer, Fehlzugriffe, Verdrängungen, ...)."""
+        with self._lock:
+            anfragen = self.hits + self.misses
+            return {
+                'eintraege': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'trefferquote': self.hits / anfragen if anfragen else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'flushes': self.flushes,
+            }
+
+
+# Prozessweit geteilter Cache (Streamlit-Sessions, Batch-Schätzung)
+PREDICTION_CACHE = PredictionCache()
@@ -0,0 +1,351 @@
+"""Eigenständiger HTTP-Dienst für Zeitschätzungen (JSON), z.B. für ERP und Planungstabellen.
+
+Endpunkte:
+    POST /schaetzung   ein Projekt ({"Systeme": [...]}) oder viele ({"projekte": [...]} bzw. eine Liste)
+    GET  /status       Latenz (p50/p99), Durchsatz, Batch-Größen, Modellversion
+    GET  /health       Lebenszeichen
+
+Die Anfragen laufen in einem ThreadingHTTPServer (ein Thread je Verbindung). Alle Threads
+reichen ihre Projekte an einen MicroBatcher weiter: Dieser sammelt die Anfragen, die
+innerhalb von max_warten_ms nach der ersten eintreffen (oder bis max_batch Projekte
+beisammen sind), kodiert sie gemeinsam und ruft model.predict einmal für alle auf. Das
+Modell kommt aus resources.get_model() und wird von allen Threads geteilt; eine neue
+Modellversion wird ohne Neustart übernommen.
+
+Aufruf:
+    python prediction_service.py --port 8502
+    python prediction_service.py --lasttest 2000 --threads 16   # Dienst auf localhost starten und messen
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from feature_encoder import ProjectFeatureEncoder
+from instrumentation import TRACER
+from resources import get_model, model_version
+from zeitprognose import QUELLE_MODELL, QUELLE_OHNE_SYSTEME, predict_rows
+
+HOST = '127.0.0.1'
+PORT = 8502
+MAX_WARTEN_MS = 5.0
+MAX_BATCH = 512
+# Längste Wartezeit einer Anfrage auf ihren Batch, danach antwortet der Dienst mit 503
+ANTWORT_TIMEOUT_S = 30.0
+# Anzahl der letzten Anfragen für Latenz-Perzentile und Durchsatz
+STATISTIK_FENSTER = 10000
+
+
+class MicroBatcher:
+    """Fasst gleichzeitige Anfragen zu einem predict-Aufruf zusammen (ein Hintergrund-Thread)."""
+
+    def __init__(self, max_warten_ms=MAX_WARTEN_MS, max_batch=MAX_BATCH, model_getter=get_model):
+        self.max_warten_s = max_warten_ms / 1000
+        self.max_batch = max_batch
+        self.model_getter = model_getter
+        self._queue = queue.Queue()
+        self._encoder = None
+        self._encoder_model = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.projekte = 0
+        self._thread = threading.Thread(target=self._run, name='MicroBatcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, systeme_je_projekt):
+        """Reiht Projekte (Liste von System-Listen) ein; das Future liefert ein Array (n, 2)."""
+        future = Future()
+        self._queue.put((list(systeme_je_projekt), future))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            erstes = self._queue.get()
+            if erstes is None:
+                return
+            batch = [erstes]
+            anzahl = len(erstes[0])
+            frist = time.perf_counter() + self.max_warten_s
+            stoppen = False
+            while anzahl < self.max_batch:
+                rest = frist - time.perf_counter()
+                if rest <= 0:
+                    break
+                try:
+                    eintrag = self._queue.get(timeout=rest)
+                except queue.Empty:
+                    break
+                if eintrag is None:
+                    stoppen = True
+                    break
+                batch.append(eintrag)
+                anzahl += len(eintrag[0])
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Unerwarteter Fehler: offene Anfragen des Batches scheitern, der Thread läuft weiter
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stoppen:
+                return
+
+    def _encoder_for(self, model):
+        # Encoder nur bei Modellwechsel neu anlegen (Spaltenreihenfolge hängt vom Modell ab)
+        if model is not self._encoder_model:
+            self._encoder = ProjectFeatureEncoder.for_model(model)
+            self._encoder_model = model
+        return self._encoder
+
+    def _process(self, batch):
+        try:
+            model = self.model_getter()
+            encoder = self._encoder_for(model)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        systeme = [s for projekte, _ in batch for s in projekte]
+        with TRACER.span('service_batch', anfragen=len(batch), projekte=len(systeme)):
+            # Jede Anfrage einzeln kodieren: eine fehlerhafte Anfrage scheitert allein, nicht der ganze Batch
+            gueltig, matrizen = [], []
+            for projekte, future in batch:
+                try:
+                    matrizen.append(encoder.encode_many(projekte))
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                gueltig.append((projekte, future))
+            if not gueltig:
+                return
+            try:
+                X = np.concatenate(matrizen)
+                prediction = predict_rows(X, model, encoder) if len(X) else np.zeros((0, 2))
+                prediction[[len(s) == 0 for projekte, _ in gueltig for s in projekte]] = 0
+            except Exception as e:
+                for _, future in gueltig:
+                    future.set_exception(e)
+                return
+        with self._lock:
+            self.batches += 1
+            self.projekte += len(X)
+        start = 0
+        for projekte, future in gueltig:
+            future.set_result(prediction[start:start + len(projekte)])
+            start += len(projekte)
+
+
+class ServiceStats:
+    """Latenzen und Zeitpunkte der letzten Anfragen (threadsicher)."""
+
+    def __init__(self, fenster=STATISTIK_FENSTER):
+        self._lock = threading.Lock()
+        self._latenzen = deque(maxlen=fenster)
+        self._zeitpunkte = deque(maxlen=fenster)
+        self.anfragen = 0
+        self.fehler = 0
+        self.gestartet = time.time()
+
+    def record(self, latenz_s, ok=True):
+        with self._lock:
+            self._latenzen.append(latenz_s)
+            self._zeitpunkte.append(time.time())
+            self.anfragen += 1
+            self.fehler += 0 if ok else 1
+
+    def summary(self):
+        with self._lock:
+            latenzen = np.array(self._latenzen) * 1000
+            zeitpunkte = list(self._zeitpunkte)
+            anfragen, fehler = self.anfragen, self.fehler
+        dauer = zeitpunkte[-1] - zeitpunkte[0] if len(zeitpunkte) > 1 else 0.0
+        return {
+            'anfragen': anfragen,
+            'fehler': fehler,
+            'latenz_p50_ms': float(np.percentile(latenzen, 50)) if len(latenzen) else None,
+            'latenz_p99_ms': float(np.percentile(latenzen, 99)) if len(latenzen) else None,
+            'durchsatz_anfragen_s': (len(zeitpunkte) - 1) / dauer if dauer > 0 else None,
+            'laufzeit_s': time.time() - self.gestartet,
+        }
+
+
+def _result(project, zeiten):
+    """Antwort-Dict je Projekt (gleiche Felder wie estimate_batch)."""
+    hat_systeme = bool(project.get('Systeme'))
+    return {
+        'Interne_Auftragsnummer': project.get('Interne_Auftragsnummer'),
+        'Zeichnungszeit_h': float(zeiten[0]),
+        'Stuecklistenzeit_h': float(zeiten[1]),
+        'Quelle': QUELLE_MODELL if hat_systeme else QUELLE_OHNE_SYSTEME,
+    }
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer mit größerer Warteschlange für neue Verbindungen (Standard 5 führt bei
+    vielen gleichzeitigen Clients zu verworfenen Verbindungen und 1 s Wartezeit beim Neuversuch)."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """HTTP-Handler; batcher und stats werden über make_server am Server hinterlegt."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status, daten):
+        body = json.dumps(daten, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/status':
+            batcher = self.server.batcher
+            status = self.server.stats.summary()
+            status.update({
+                'batches': batcher.batches,
+                'projekte': batcher.projekte,
+                'projekte_je_batch': batcher.projekte / batcher.batches if batcher.batches else None,
+                'modellversion': (model_version(get_model()) or '')[:12] or None,
+                'max_warten_ms': batcher.max_warten_s * 1000,
+                'max_batch': batcher.max_batch,
+            })
+            self._send_json(200, status)
+        else:
+            self._send_json(404, {'fehler': f'Unbekannter Pfad: {self.path}'})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        if self.path != '/schaetzung':
+            self._send_json(404, {'fehler': f'Unbekannter Pfad: {self.path}'})
+            return
+        try:
+            laenge = int(self.headers.get('Content-Length', 0))
+            daten = json.loads(self.rfile.read(laenge) or b'null')
+            einzeln = isinstance(daten, dict) and 'projekte' not in daten
+            projekte = [daten] if einzeln else (daten['projekte'] if isinstance(daten, dict) else daten)
+            if not isinstance(projekte, list) or not all(isinstance(p, dict) for p in projekte):
+                raise ValueError("Erwartet ein Projekt-Objekt, {'projekte': [...]} oder eine Liste von Projekten")
+            for nr, p in enumerate(projekte, 1):
+                systeme = p.get('Systeme')
+                if systeme is not None and not (isinstance(systeme, list) and all(isinstance(s, dict) for s in systeme)):
+                    raise ValueError(f"Projekt {nr}: 'Systeme' muss eine Liste von System-Objekten sein")
+        except (ValueError, KeyError) as e:
+            self.server.stats.record(time.perf_counter() - start, ok=False)
+            self._send_json(400, {'fehler': str(e)})
+            return
+
+        try:
+            prediction = self.server.batcher.submit([p.get('Systeme') or [] for p in projekte]).result(
+                timeout=ANTWORT_TIMEOUT_S)
+        except FutureTimeoutError:
+            self.server.stats.record(time.perf_counter() - start, ok=False)
+            self._send_json(503, {'fehler': f'Keine Schätzung innerhalb von {ANTWORT_TIMEOUT_S:g} s'})
+            return
+        except Exception as e:
+            self.server.stats.record(time.perf_counter() - start, ok=False)
+            self._send_json(500, {'fehler': f'Fehler bei Schätzung: {e}'})
+            return
+        ergebnisse = [_result(p, z) for p, z in zip(projekte, prediction)]
+        self._send_json(200, ergebnisse[0] if einzeln else {'ergebnisse': ergebnisse})
+        self.server.stats.record(time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        # Keine Zeile je Anfrage auf stderr; Kennzahlen stehen unter /status
+        pass
+
+
+def make_server(host=HOST, port=PORT, max_warten_ms=MAX_WARTEN_MS, max_batch=MAX_BATCH):
+    """Legt Server, MicroBatcher und Statistik an (Port 0: freien Port wählen)."""
+    server = PredictionServer((host, port), PredictionHandler)
+    server.batcher = MicroBatcher(max_warten_ms, max_batch)
+    server.stats = ServiceStats()
+    return server
+
+
+def _post_json(url, daten, timeout=30):
+    anfrage = urllib.request.Request(
+        url, data=json.dumps(daten).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(anfrage, timeout=timeout) as antwort:
+        return json.loads(antwort.read())
+
+
+def run_load_test(url, projekte, anfragen=1000, threads=16):
+    """Schickt anfragen Einzelanfragen mit threads parallelen Clients; gibt die Client-Kennzahlen zurück."""
+    def eine_anfrage(i):
+        start = time.perf_counter()
+        _post_json(url + '/schaetzung', projekte[i % len(projekte)])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latenzen = np.array(list(pool.map(eine_anfrage, range(anfragen)))) * 1000
+    dauer = time.perf_counter() - start
+    return {
+        'anfragen': anfragen,
+        'threads': threads,
+        'latenz_p50_ms': float(np.percentile(latenzen, 50)),
+        'latenz_p99_ms': float(np.percentile(latenzen, 99)),
+        'durchsatz_anfragen_s': anfragen / dauer,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP-Dienst für Zeitschätzungen mit Micro-Batching.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-warten-ms', type=float, default=MAX_WARTEN_MS, help="Sammelfenster für Micro-Batching")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="Maximale Projekte je predict-Aufruf")
+    parser.add_argument('--lasttest', type=int, metavar='ANFRAGEN', help="Dienst auf localhost starten, ANFRAGEN schicken und Kennzahlen ausgeben")
+    parser.add_argument('--threads', type=int, default=16, help="Parallele Clients im Lasttest")
+    args = parser.parse_args(argv)
+
+    get_model()  # Modell vor der ersten Anfrage laden
+    if args.lasttest:
+        from synthetic_data import synthetic_orders
+
+        server = make_server(HOST, 0, args.max_warten_ms, args.max_batch)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://{HOST}:{server.server_address[1]}'
+        client = run_load_test(url, synthetic_orders(500), args.lasttest, args.threads)
+        with urllib.request.urlopen(url + '/status') as antwort:
+            status = json.loads(antwort.read())
+        server.shutdown()
+        server.batcher.stop()
+        print(f"Client: p50 {client['latenz_p50_ms']:.2f} ms, p99 {client['latenz_p99_ms']:.2f} ms, "
+              f"{client['durchsatz_anfragen_s']:.0f} Anfragen/s ({args.threads} Threads)")
+        print(f"Dienst: p50 {status['latenz_p50_ms']:.2f} ms, p99 {status['latenz_p99_ms']:.2f} ms, "
+              f"{status['batches']} predict-Aufrufe für {status['projekte']} Projekte "
+              f"({status['projekte_je_batch']:.1f} je Batch)")
+        return
+
+    server = make_server(args.host, args.port, args.max_warten_ms, args.max_batch)
+    print(f"Zeitprognose-Dienst läuft auf http://{args.host}:{server.server_address[1]} (Strg+C beendet)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Zentrale, gecachte Ressourcen (Modell, Nachbarindex) für App und Batch-Schätzung.
+
+Jede Ressource wird höchstens einmal pro Prozess geladen. Bei jedem Zugriff wird nur
+os.stat der Datei geprüft; ändern sich Änderungszeit oder Größe, wird der Inhalt per
+SHA-256 verglichen und die Datei bei echter Änderung neu geladen. Das Modell wird aus der
+aktiven Version der Modell-Registry geladen (siehe model_registry.py); eine neu trainierte
+oder gepinnte Version wird so ohne Neustart des Streamlit-Servers übernommen.
+"""
+import os
+import threading
+import time
+
+import joblib
+
+from compact_forest import META_DATEI, CompactForest, compact_path
+from history_cache import file_hash
+from instrumentation import TRACER
+from model_registry import REGISTRY
+from similar_projects import SimilarityIndex, index_path
+
+MODEL_PATH = 'ki_zeitprognose_model.joblib'
+
+# Kompaktes NumPy-Artefakt statt sklearn-Modell verwenden, wenn vorhanden (ZEITPROGNOSE_KOMPAKT=0 schaltet ab)
+USE_COMPACT = os.environ.get('ZEITPROGNOSE_KOMPAKT', '1') != '0'
+
+
+def load_model(path=MODEL_PATH, compact=USE_COMPACT):
+    """Lädt das trainierte Modell.
+
+    Liegt neben der joblib-Datei ein kompaktes Artefakt (<modell>.forest), das aus genau dieser
+    Datei exportiert wurde, wird stattdessen der CompactForest geladen; scikit-learn muss dann
+    weder importiert noch das Modell entpickelt werden.
+    """
+    forest_path = compact_path(path)
+    if compact and os.path.isdir(forest_path):
+        forest = CompactForest.load(forest_path)
+        if forest.meta.get('quelle_hash') == file_hash(path):
+            return forest
+        print(f"Kompaktes Artefakt {forest_path} passt nicht zu {path}, lade sklearn-Modell")
+    return joblib.load(path)
+
+
+class FileResource:
+    """Eine aus einer Datei geladene Ressource, die bei Dateiänderung automatisch neu geladen wird."""
+
+    def __init__(self, name, path, loader):
+        self.name = name
+        self._path = path  # Pfad oder Funktion, die den aktuellen Pfad liefert
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._stat = None
+        self.version = None  # SHA-256 der zuletzt geladenen Datei
+        self.load_seconds = None
+        self.loaded_at = None
+        self.loads = 0
+        self.last_error = None
+
+    @property
+    def path(self):
+        return self._path() if callable(self._path) else self._path
+
+    def get(self):
+        """Gibt den geladenen Inhalt zurück und lädt ihn neu, falls sich die Datei geändert hat."""
+        with self._lock:
+            path = self.path
+            st = os.stat(path)
+            stat = (path, st.st_mtime_ns, st.st_size)
+            if self._value is not None and stat == self._stat:
+                return self._value
+
+            version = file_hash(path)
+            if self._value is not None and version == self.version:
+                # Nur Zeitstempel geändert (z.B. Datei kopiert), Inhalt identisch
+                self._stat = stat
+                return self._value
+
+            start = time.perf_counter()
+            try:
+                with TRACER.span('laden', ressource=self.name, datei=path):
+                    value = self.loader(path)
+            except Exception as e:
+                # Datei wird evtl. gerade geschrieben: alte Version behalten und beim nächsten Zugriff erneut versuchen
+                self.last_error = str(e)
+                if self._value is None:
+                    raise
+                print(f"Neuladen von {path} fehlgeschlagen, verwende bisherige Version: {e}")
+                return self._value
+
+            self._value = value
+            self._stat = stat
+            self.version = version
+            self.load_seconds = time.perf_counter() - start
+            self.loaded_at = time.time()
+            self.loads += 1
+            self.last_error = None
+            return value
+
+    @property
+    def is_loaded(self):
+        return self._value is not None
+
+    def version_of(self, value):
+        """Version, falls value der aktuell geladene Inhalt dieser Ressource ist, sonst None."""
+        return self.version if value is not None and value is self._value else None
+
+    def status(self):
+        """Kurzinfo für die Anzeige (z.B. in der Sidebar)."""
+        return {
+            'name': self.name,
+            'path': self._stat[0] if self._stat else self.path,
+            'geladen': self.is_loaded,
+            'version': self.version[:12] if self.version else None,
+            'ladezeit_s': self.load_seconds,
+            'geladen_um': self.loaded_at,
+            'anzahl_ladevorgaenge': self.loads,
+            'fehler': self.last_error,
+        }
+
+
+def active_model_path():
+    """Aktive Version aus der Modell-Registry, ohne Registry das bisherige ki_zeitprognose_model.joblib."""
+    return REGISTRY.active_model_path(fallback=MODEL_PATH)
+
+
+MODEL = FileResource('Modell', active_model_path, load_model)
+
+
+def get_model():
+    """Aktuelles Modell (einmal pro Prozess geladen, bei Dateiänderung neu)."""
+    return MODEL.get()
+
+
+def model_version(model):
+    """Version (Datei-Hash) des Modells, falls es das über get_model() geladene ist, sonst None."""
+    return MODEL.version_of(model)
+
+
+def active_index_path():
+    """meta.json des Nachbarindex neben der aktiven Modellversion (wird beim Speichern zuletzt geschrieben)."""
+    return os.path.join(index_path(active_model_path()), META_DATEI)
+
+
+def load_similarity_index(meta_path):
+    return SimilarityIndex.load(os.path.dirname(meta_path))
+
+
+NEIGHBORS = FileResource('Nachbarindex', active_index_path, load_similarity_index)
+
+
+def get_similarity_index():
+    """Nachbarindex zur aktiven Modellversion oder None, wenn für sie keiner oder nur ein veralteter gespeichert ist."""
+    if not os.path.exists(NEIGHBORS.path):
+        return None
+    get_model()  # MODEL.version auf die aktive Modelldatei bringen
+    index = NEIGHBORS.get()
+    if index.meta.get('quelle_hash') != MODEL.version:
+        return None
+    return index
+
+
+def resource_status():
+    """Status aller Ressourcen für die Anzeige in der App."""
+    return [MODEL.status(), NEIGHBORS.status()]
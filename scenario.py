@@ -0,0 +1,91 @@
+"""Was-wäre-wenn-Analyse: geschätzte Zeiten eines Projekts über ein Raster von Varianten.
+
+Ausgehend von einem Basisprojekt (Auftrag oder manuelle Eingabe) wird ein System entlang der
+gewählten Dimensionen (Größe, Dachtyp, Seitenverkleidung, Anzahl) variiert. scenario_grid
+bildet das kartesische Produkt als DataFrame (eine Zeile je Variante),
+ProjectFeatureEncoder.encode_variants kodiert alle Varianten spaltenweise in eine Matrix und
+ein einziger predict-Aufruf schätzt sie. Der Vorhersage-Cache wird dabei umgangen, damit ein
+großes Raster die Einträge der übrigen Schätzungen nicht verdrängt.
+"""
+import numpy as np
+import pandas as pd
+
+from feature_encoder import ProjectFeatureEncoder
+from instrumentation import TRACER
+from resources import get_model
+from zeitprognose import predict_rows
+
+# Dimensionen, die variiert werden können (Schlüssel wie im System-Dict des Encoders)
+DIMENSIONEN = ['Größe', 'Dachtyp', 'Seitenverkleidung', 'Anzahl']
+SYSTEM_FELDER = ['Produkttyp', 'Größe', 'Seitenverkleidung', 'Dachtyp', 'Anzahl']
+# Obergrenze für die Rastergröße (Speicher: Varianten x 21 Features x 8 Byte)
+MAX_VARIANTEN = 250000
+
+
+def size_range(von, bis, schritte):
+    """Gleichmäßig verteilte Größen von..bis (m²), auf ganze m² gerundet und ohne Dubletten."""
+    return np.unique(np.round(np.linspace(von, bis, max(int(schritte), 1))))
+
+
+def scenario_grid(basis, variationen):
+    """Alle Kombinationen der variationen ({Dimension: Werte}) als DataFrame mit den Spalten SYSTEM_FELDER.
+
+    Nicht variierte Felder kommen aus dem System-Dict basis ('Anzahl' oder 'Anzahl_Gewerke').
+    """
+    unbekannt = set(variationen) - set(DIMENSIONEN)
+    if unbekannt:
+        raise ValueError(f"Unbekannte Dimensionen: {sorted(unbekannt)} (möglich: {DIMENSIONEN})")
+    werte = {dim: np.asarray(list(v)) for dim, v in variationen.items()}
+    leer = [dim for dim, v in werte.items() if len(v) == 0]
+    if leer:
+        raise ValueError(f"Keine Werte für {', '.join(leer)} gewählt")
+    anzahl = int(np.prod([len(v) for v in werte.values()], dtype=np.int64))
+    if anzahl > MAX_VARIANTEN:
+        raise ValueError(f"{anzahl} Varianten übersteigen das Maximum von {MAX_VARIANTEN}")
+
+    if werte:
+        # Kartesisches Produkt über Indexgitter statt itertools.product (kein Python-Objekt je Variante)
+        index = np.indices([len(v) for v in werte.values()]).reshape(len(werte), -1)
+        grid = pd.DataFrame({dim: v[i] for (dim, v), i in zip(werte.items(), index)})
+    else:
+        grid = pd.DataFrame(index=range(1))
+
+    basiswerte = dict(basis, Anzahl=basis.get('Anzahl', basis.get('Anzahl_Gewerke')))
+    for feld in SYSTEM_FELDER:
+        if feld not in grid:
+            grid[feld] = basiswerte.get(feld)
+    grid['Größe'] = pd.to_numeric(grid['Größe'], errors='coerce')
+    grid['Anzahl'] = pd.to_numeric(grid['Anzahl'], errors='coerce')
+    if grid[['Größe', 'Anzahl']].isna().any(axis=None):
+        raise ValueError("Das variierte System braucht eine gültige Größe und Anzahl")
+    # Ganzzahlig abschneiden wie int(...) in ProjectFeatureEncoder._fill_row (z.B. 2.5 -> 2)
+    grid['Anzahl'] = grid['Anzahl'].astype(np.int64)
+    return grid[list(werte) + [feld for feld in SYSTEM_FELDER if feld not in werte]]
+
+
+def scenario_sweep(systems, variationen, system_index=0, model=None, encoder=None):
+    """Schätzt alle Varianten eines Projekts, in denen das System system_index variiert wird.
+
+    Gibt das Raster aus scenario_grid mit den Spalten 'Zeichnungszeit_h', 'Stuecklistenzeit_h'
+    und 'Gesamtzeit_h' zurück (Zeiten für das ganze Projekt, eine Zeile je Variante).
+    """
+    systems = list(systems)
+    if not 0 <= system_index < len(systems):
+        raise ValueError(f"Projekt hat kein System {system_index + 1}")
+    if model is None:
+        model = get_model()
+    if encoder is None:
+        encoder = ProjectFeatureEncoder.for_model(model)
+    uebrige = systems[:system_index] + systems[system_index + 1:]
+
+    with TRACER.span('szenario', dimensionen=list(variationen)) as attrs:
+        grid = scenario_grid(systems[system_index], variationen)
+        attrs['varianten'] = len(grid)
+        with TRACER.span('kodierung', projekte=len(grid)):
+            X = encoder.encode_variants(uebrige, grid)
+        prediction = predict_rows(X, model, encoder, cache=None)
+
+    grid['Zeichnungszeit_h'] = prediction[:, 0]
+    grid['Stuecklistenzeit_h'] = prediction[:, 1]
+    grid['Gesamtzeit_h'] = prediction.sum(axis=1)
+    return grid
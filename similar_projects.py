@@ -0,0 +1,197 @@
+"""Ähnliche historische Projekte über einen Nachbarschaftsindex (reines NumPy).
+
+SimilarityIndex.build standardisiert die Projekt-Features der Historie (je Spalte Mittelwert
+0 und Streuung 1, damit die Fläche in m² nicht die Zähler je Kategorie überdeckt). Der Index
+wird wie das kompakte Modell-Artefakt als .npy-Dateien mit meta.json in einem Verzeichnis
+neben dem Modell gespeichert (<modell>.nachbarn/); train_model.py erzeugt ihn bei jedem
+Training. Zum Laden wird weder scikit-learn importiert noch etwas entpickelt.
+
+neighbors sucht per Brute Force: die quadrierten Abstände zu allen Projekten kommen aus
+einem Matrixprodukt (|z|² - 2 z·q + |q|², |z|² vorberechnet), die k Kandidaten aus
+np.argpartition, ihre Abstände werden danach exakt nachgerechnet. Bei Zehntausenden
+Projekten dauert eine Abfrage etwa eine Millisekunde. quelle_hash in meta.json ist der
+SHA-256 der Modelldatei, zu der der Index gebaut wurde; resources verwendet nur einen
+passenden Index.
+
+Aufruf für ein vorhandenes Modell:
+    python similar_projects.py ki_zeitprognose_model.joblib [--historie KI_Zeitprognose_Vorlage_Projekt-W.xlsx]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from compact_forest import META_DATEI
+from feature_encoder import FEATURE_ANZAHL_SYSTEME, FEATURE_GESAMTFLAECHE, PRODUKTTYP_KATEGORIEN
+from history_cache import file_hash
+
+INDEX_SUFFIX = '.nachbarn'
+ARRAYS = ['X', 'scaled', 'norm2', 'y', 'project_ids', 'mean', 'scale']
+TOP_K = 5
+# Abfragezeilen je Block, begrenzt die Abstandsmatrix (Block x Projekte)
+BLOCK_ZEILEN = 256
+
+AEHNLICHE_SPALTEN = ['Projekt-ID', 'Abstand', 'Zeichnungszeit', 'Stücklistenzeit', 'Systeme', 'Gesamtfläche']
+
+
+def index_path(model_path):
+    """Pfad des Nachbarindex zu einer Modelldatei (z.B. modelle/v0003.nachbarn)."""
+    return os.path.splitext(model_path)[0] + INDEX_SUFFIX
+
+
+class SimilarityIndex:
+    """Standardisierte Features der Historie samt tatsächlicher Zeiten je Projekt."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.feature_names = list(meta['feature_names'])
+        self.X = arrays['X']
+        self.scaled = arrays['scaled']
+        self.norm2 = arrays['norm2']
+        self.y = arrays['y']
+        self.project_ids = arrays['project_ids']
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+
+    @classmethod
+    def build(cls, X, y, projekt_ids, feature_names, source_hash=None):
+        """Baut den Index aus Trainingsdaten (X, y wie in history_ingest.TrainingSet).
+
+        source_hash (SHA-256 der Modelldatei) erlaubt beim Laden zu prüfen, ob der Index noch
+        zum Modell passt.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        mean = X.mean(axis=0) if len(X) else np.zeros(X.shape[1])
+        scale = X.std(axis=0) if len(X) else np.ones(X.shape[1])
+        scale[scale == 0] = 1.0
+        scaled = (X - mean) / scale
+        arrays = {
+            'X': X,
+            'scaled': scaled,
+            'norm2': np.einsum('ij,ij->i', scaled, scaled),
+            'y': np.asarray(y, dtype=np.float64),
+            # Unicode-Array statt object, damit np.save/np.load ohne Pickle auskommen
+            'project_ids': np.asarray([str(p) for p in projekt_ids], dtype=str),
+            'mean': mean,
+            'scale': scale,
+        }
+        meta = {
+            'n_projekte': len(X),
+            'feature_names': [str(name) for name in feature_names],
+            'quelle_hash': source_hash,
+            'erstellt': datetime.now().isoformat(timespec='seconds'),
+        }
+        return cls(arrays, meta)
+
+    def __len__(self):
+        return len(self.X)
+
+    def save(self, path):
+        """Speichert den Index als Verzeichnis; meta.json wird zuletzt geschrieben."""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        tmp = os.path.join(path, META_DATEI + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(path, META_DATEI))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Lädt einen Index; mit mmap=True werden die Arrays nur bei Bedarf von der Platte gelesen."""
+        with open(os.path.join(path, META_DATEI), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _spalten(self, feature_names):
+        """Spaltenreihenfolge, um Zeilen eines Encoders mit feature_names in die Index-Reihenfolge zu bringen."""
+        if feature_names is None or list(feature_names) == self.feature_names:
+            return None
+        return [list(feature_names).index(name) for name in self.feature_names]
+
+    def neighbors(self, X, k=TOP_K, feature_names=None):
+        """Abstände und Indizes der k nächsten Projekte je Zeile von X, Arrays (N, k), nach Abstand sortiert."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        spalten = self._spalten(feature_names)
+        if spalten is not None:
+            X = X[:, spalten]
+        Q = (X - self.mean) / self.scale
+        k = min(k, len(self))
+        abstand = np.zeros((len(Q), k))
+        index = np.zeros((len(Q), k), dtype=np.int64)
+        if k == 0:
+            return abstand, index
+
+        for start in range(0, len(Q), BLOCK_ZEILEN):
+            q = Q[start:start + BLOCK_ZEILEN]
+            d2 = self.norm2[None, :] - 2.0 * (q @ self.scaled.T) + np.einsum('ij,ij->i', q, q)[:, None]
+            kandidaten = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            # Exakte Abstände der Kandidaten (die Zerlegung oben verliert bei sehr nahen Punkten Stellen)
+            diff = self.scaled[kandidaten] - q[:, None, :]
+            d = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+            reihenfolge = np.argsort(d, axis=1, kind='stable')
+            abstand[start:start + len(q)] = np.take_along_axis(d, reihenfolge, axis=1)
+            index[start:start + len(q)] = np.take_along_axis(kandidaten, reihenfolge, axis=1)
+        return abstand, index
+
+    def similar(self, X, k=TOP_K, feature_names=None):
+        """Die k ähnlichsten historischen Projekte zu einem Projekt (X: Zeile (1, n_features)) als DataFrame."""
+        abstand, index = self.neighbors(X[:1], k, feature_names)
+        abstand, index = abstand[0], index[0]
+        treffer = self.X[index]
+        typen = [self.feature_names.index(f'Produkttyp_{t}') for t in PRODUKTTYP_KATEGORIEN]
+        systeme = [
+            ', '.join(f'{int(n)}× {t}' for t, n in zip(PRODUKTTYP_KATEGORIEN, zeile) if n > 0)
+            for zeile in treffer[:, typen]
+        ]
+        return pd.DataFrame({
+            'Projekt-ID': self.project_ids[index],
+            'Abstand': abstand,
+            'Zeichnungszeit': self.y[index, 0],
+            'Stücklistenzeit': self.y[index, 1],
+            'Systeme': systeme,
+            'Gesamtfläche': treffer[:, self.feature_names.index(FEATURE_GESAMTFLAECHE)],
+        }, columns=AEHNLICHE_SPALTEN)
+
+    def describe(self):
+        """Kurzbeschreibung für Konsolenausgaben."""
+        return (f"{len(self)} Projekte, {len(self.feature_names)} Features, "
+                f"Ø {self.X[:, self.feature_names.index(FEATURE_ANZAHL_SYSTEME)].mean():.2f} Systeme je Projekt")
+
+
+def build_and_save(training_set, model_path):
+    """Baut den Index aus einem TrainingSet und speichert ihn neben model_path; gibt den Index zurück."""
+    index = SimilarityIndex.build(training_set.X, training_set.y, training_set.projekt_ids,
+                                  training_set.feature_names, source_hash=file_hash(model_path))
+    ziel = index_path(model_path)
+    index.save(ziel)
+    print(f"Nachbarindex {ziel}: {index.describe()}")
+    return index
+
+
+def main(argv=None):
+    from train_model import HISTORY_PATH, load_training_set
+
+    parser = argparse.ArgumentParser(description="Baut den Nachbarindex (ähnliche Projekte) für ein vorhandenes Modell.")
+    parser.add_argument('modell', help="Modelldatei (.joblib), neben der der Index gespeichert wird")
+    parser.add_argument('--historie', default=HISTORY_PATH, help="Projekthistorie (Datei, Verzeichnis oder Glob-Muster)")
+    args = parser.parse_args(argv)
+
+    index = build_and_save(load_training_set(args.historie), args.modell)
+    anfragen = index.X[:min(len(index), 200)]
+    start = time.perf_counter()
+    for zeile in anfragen:
+        index.similar(zeile[None, :])
+    print(f"Abfrage (Top {TOP_K}): {(time.perf_counter() - start) / max(len(anfragen), 1) * 1000:.2f} ms je Projekt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Synthetische Projekthistorien und Auftragslisten für Benchmarks und Lasttests.
+
+Die Verteilungen (Produkttypen, Dachtyp je Produkttyp, Seitenverkleidungen, Größen,
+Anzahl der Systeme je Projekt) sind an die Vorlage KI_Zeitprognose_Vorlage_Projekt-W.xlsx
+angelehnt. Die Zeiten folgen einer einfachen Aufwandsformel mit Rauschen, sodass ein
+Modell darauf sinnvoll trainiert werden kann. Erzeugt wird vektorisiert mit NumPy, auch
+100.000 Projekte dauern nur Sekundenbruchteile.
+
+Aufruf:
+    python synthetic_data.py historie 10000 -o historie_10k.xlsx
+    python synthetic_data.py auftraege 5000 -o auftraege_5k.json
+"""
+import argparse
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from history_ingest import SPALTE_PROJEKT_ID, SPALTE_STUECKLISTENZEIT, SPALTE_SYSTEMANZAHL, SPALTE_ZEICHNUNGSZEIT
+
+MAX_SYSTEME = 4
+# Anteil der Projekte mit 1, 2, 3, 4 Systemen
+SYSTEMANZAHL_P = [0.46, 0.36, 0.09, 0.09]
+
+# Produkttyp -> (Anteil, Median Größe m², Min, Max, Grundaufwand Zeichnung h)
+PRODUKTTYPEN = {
+    'Carport': (0.25, 230, 30, 600, 6.0),
+    'Fahrradüberdachung': (0.20, 110, 20, 200, 4.0),
+    'Mülleinhausung': (0.25, 35, 8, 120, 4.0),
+    'Pergola': (0.15, 70, 15, 160, 3.0),
+    'Mülltonnenbox': (0.15, 20, 4, 50, 2.0),
+}
+# Dachtyp-Verteilung je Produkttyp
+DACHTYP_P = {
+    'Carport': {'Trapezblech': 0.59, 'Gründach': 0.24, 'Gründach-Light': 0.17},
+    'Fahrradüberdachung': {'Polycarbonat': 0.75, 'Ohne': 0.25},
+    'Mülleinhausung': {'Gründach-Light': 0.56, 'Gründach': 0.44},
+    'Mülltonnenbox': {'Trapezblech': 0.55, 'Gründach': 0.30, 'Gründach-Light': 0.15},
+    'Pergola': {'Ohne': 1.0},
+}
+SEITENVERKLEIDUNG_P = {
+    'Ohne': 0.22, 'Aluline': 0.16, 'Stahl-Vollblech': 0.14, 'Trespa': 0.14,
+    'Gittermatte': 0.11, 'WL+LBK': 0.11, 'Stahl-Lochblech': 0.08, 'WL': 0.04,
+}
+ANZAHL_P = {5: 0.71, 4: 0.10, 3: 0.10, 2: 0.06, 1: 0.03}
+TORTYP_P = {'Ohne': 0.6, 'N1': 0.15, 'N2': 0.1, 'HST1': 0.1, 'HSTD': 0.05}
+BESONDERHEIT_P = {'Keine': 0.55, 'Photovoltaikintegration': 0.3, 'Sonderhöhe': 0.08, 'Sonderwunsch': 0.04, 'Sonderfarbe': 0.03}
+PV_ANTEIL = 0.39
+
+# Aufschläge auf den Zeichnungsaufwand je System
+DACHTYP_AUFWAND = {'Gründach': 2.0, 'Gründach-Light': 1.0}
+SEITENVERKLEIDUNG_AUFWAND = 1.5
+AUFWAND_JE_M2 = 0.01
+STUECKLISTE_FAKTOR = 0.72
+
+MITARBEITER = [f'Mitarbeiter {i}' for i in range(1, 6)]
+# Geplante Starttermine der Aufträge verteilen sich auf so viele Wochen ab heute
+PLANUNGSWOCHEN = 8
+
+
+def _choice(rng, verteilung, n):
+    werte = list(verteilung)
+    p = np.array(list(verteilung.values()), dtype=np.float64)
+    return np.asarray(werte, dtype=object)[rng.choice(len(werte), size=n, p=p / p.sum())]
+
+
+def synthetic_systems(n, rng):
+    """n zufällige Systeme als Dict von Arrays (Produkttyp, Größe, Dachtyp, ...) plus Aufwand je System."""
+    typen = list(PRODUKTTYPEN)
+    produkttyp_idx = rng.choice(len(typen), size=n, p=[PRODUKTTYPEN[t][0] for t in typen])
+    produkttyp = np.asarray(typen, dtype=object)[produkttyp_idx]
+
+    median, minimum, maximum, grundaufwand = (np.array([PRODUKTTYPEN[t][k] for t in typen])[produkttyp_idx] for k in (1, 2, 3, 4))
+    groesse = np.clip(np.round(median * rng.lognormal(0.0, 0.5, n)), minimum, maximum)
+
+    dachtyp = np.empty(n, dtype=object)
+    for i, typ in enumerate(typen):
+        maske = produkttyp_idx == i
+        dachtyp[maske] = _choice(rng, DACHTYP_P[typ], int(maske.sum()))
+    seitenverkleidung = _choice(rng, SEITENVERKLEIDUNG_P, n)
+    anzahl = _choice(rng, ANZAHL_P, n).astype(np.int64)
+    pv = np.where(rng.random(n) < PV_ANTEIL, 'ja', 'nein').astype(object)
+    gesamtwert = np.maximum(1000, np.round(groesse * 130 * rng.lognormal(0.0, 0.3, n), -2))
+
+    aufwand = (
+        grundaufwand
+        + AUFWAND_JE_M2 * groesse
+        + pd.Series(dachtyp).map(DACHTYP_AUFWAND).fillna(0).to_numpy()
+        + np.where(seitenverkleidung != 'Ohne', SEITENVERKLEIDUNG_AUFWAND, 0.0)
+    ) * (1 + 0.05 * (anzahl - 1))
+
+    return {
+        'Produkttyp': produkttyp,
+        'Größe': groesse,
+        'Dachtyp': dachtyp,
+        'Seitenverkleidung': seitenverkleidung,
+        'Anzahl': anzahl,
+        'Gesamtwert': gesamtwert,
+        'Photovoltaikintegration': pv,
+        'Besonderheit': _choice(rng, BESONDERHEIT_P, n),
+        'Tortyp': _choice(rng, TORTYP_P, n),
+        'aufwand': aufwand,
+    }
+
+
+def _systemanzahl(n, rng):
+    return rng.choice(np.arange(1, MAX_SYSTEME + 1), size=n, p=SYSTEMANZAHL_P)
+
+
+def synthetic_history(n_projects, seed=42):
+    """Projekthistorie im Layout der Excel-Vorlage (eine Zeile je Projekt, Spaltengruppen je System)."""
+    rng = np.random.default_rng(seed)
+    systemanzahl = _systemanzahl(n_projects, rng)
+    df = pd.DataFrame({
+        SPALTE_PROJEKT_ID: [f'S-{i:06d}' for i in range(1, n_projects + 1)],
+        SPALTE_ZEICHNUNGSZEIT: 0.0,
+        SPALTE_STUECKLISTENZEIT: 0.0,
+        'Konstrukteur': np.nan,
+        SPALTE_SYSTEMANZAHL: systemanzahl,
+    })
+
+    aufwand = np.zeros(n_projects)
+    for nr in range(1, MAX_SYSTEME + 1):
+        systeme = synthetic_systems(n_projects, rng)
+        vorhanden = systemanzahl >= nr
+        aufwand += np.where(vorhanden, systeme['aufwand'], 0.0)
+        for feld in ['Produkttyp', 'Anzahl', 'Dachtyp', 'Seitenverkleidung', 'Größe', 'Gesamtwert',
+                     'Photovoltaikintegration', 'Besonderheit']:
+            werte = systeme[feld]
+            if werte.dtype == object:
+                df[f'{feld} {nr}'] = np.where(vorhanden, werte, None)
+            else:
+                df[f'{feld} {nr}'] = np.where(vorhanden, werte, np.nan)
+
+    zeichnung = np.maximum(1, np.round(aufwand * rng.lognormal(0.0, 0.15, n_projects)))
+    df[SPALTE_ZEICHNUNGSZEIT] = zeichnung
+    df[SPALTE_STUECKLISTENZEIT] = np.maximum(1, np.round(zeichnung * STUECKLISTE_FAKTOR + rng.normal(0, 0.5, n_projects)))
+    return df
+
+
+def synthetic_orders(n_projects, seed=42, wochen=PLANUNGSWOCHEN, start=None):
+    """Offene Aufträge in der Form von SIMULATED_AP_PLUS_PROJECTS.
+
+    Jeder Auftrag erhält einen 'Geplanter_Start' (ISO-Datum) innerhalb der nächsten wochen
+    Wochen ab start (Standard: heute).
+    """
+    rng = np.random.default_rng(seed)
+    systemanzahl = _systemanzahl(n_projects, rng)
+    systeme = synthetic_systems(int(systemanzahl.sum()), rng)
+    mitarbeiter = rng.choice(len(MITARBEITER), size=n_projects)
+    start = start or date.today()
+    starttermine = [(start + timedelta(days=int(t))).isoformat() for t in rng.integers(0, 7 * wochen, n_projects)]
+
+    spalten = {
+        'Produkttyp': systeme['Produkttyp'].tolist(),
+        'Größe': systeme['Größe'].tolist(),
+        'Seitenverkleidung': systeme['Seitenverkleidung'].tolist(),
+        'Dachtyp': systeme['Dachtyp'].tolist(),
+        'Anzahl_Gewerke': systeme['Anzahl'].tolist(),
+        'Tortyp': systeme['Tortyp'].tolist(),
+        'Photovoltaikintegration': systeme['Photovoltaikintegration'].tolist(),
+        'Gesamtwert': systeme['Gesamtwert'].tolist(),
+        'Besonderheit': systeme['Besonderheit'].tolist(),
+    }
+    records = [dict(zip(spalten, werte)) for werte in zip(*spalten.values())]
+
+    projects = []
+    start = 0
+    for i, anzahl in enumerate(systemanzahl.tolist()):
+        projects.append({
+            'Interne_Auftragsnummer': f'AUFTRAG-S{i + 1:06d}',
+            'Systeme': records[start:start + anzahl],
+            'Zugewiesener_Mitarbeiter': MITARBEITER[mitarbeiter[i]],
+            'Geplanter_Start': starttermine[i],
+        })
+        start += anzahl
+    return projects
+
+
+def write_history_workbook(df, path):
+    """Schreibt eine Historie wie die Vorlage (Kopfzeile in Zeile 2, lesbar mit header=1)."""
+    df.to_excel(path, index=False, startrow=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Erzeugt synthetische Projekthistorien oder Auftragslisten.")
+    parser.add_argument('art', choices=['historie', 'auftraege'])
+    parser.add_argument('anzahl', type=int, help="Anzahl Projekte")
+    parser.add_argument('-o', '--ausgabe', required=True, help="Zieldatei (.xlsx/.csv/.parquet für Historie, .json für Aufträge)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.art == 'auftraege':
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_orders(args.anzahl, args.seed), f, ensure_ascii=False)
+    else:
+        df = synthetic_history(args.anzahl, args.seed)
+        endung = os.path.splitext(args.ausgabe)[1].lower()
+        if endung == '.csv':
+            df.to_csv(args.ausgabe, index=False)
+        elif endung == '.parquet':
+            df.to_parquet(args.ausgabe, index=False)
+        else:
+            write_history_workbook(df, args.ausgabe)
+    print(f"{args.anzahl} Projekte ({args.art}) nach {args.ausgabe} geschrieben")
+
+
+if __name__ == '__main__':
+    main()
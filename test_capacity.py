@@ -0,0 +1,118 @@
+"""Tests für Kalenderwochen, Auslastung und Umverteilung in der Kapazitätsplanung."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from capacity import NICHT_ZUGEWIESEN, WOCHE_UNGUELTIG, calendar_weeks, plan_capacity, rebalance, workload
+
+HEUTE = date(2026, 3, 2)  # Montag der KW 10
+
+
+def test_calendar_weeks_gemischte_formate():
+    starts = [
+        '2026-03-09',
+        '2026-03-11T08:00:00',
+        '16.03.2026',
+        '03.04.2026',
+        date(2026, 3, 23),
+        pd.Timestamp('2026-03-30 14:00'),
+        None,
+        '',
+        '2025-01-01',
+        'demnächst',
+    ]
+    assert list(calendar_weeks(starts, HEUTE)) == [
+        '2026-W11',
+        '2026-W11',
+        '2026-W12',
+        '2026-W14',
+        '2026-W13',
+        '2026-W14',
+        '2026-W10',
+        '2026-W10',
+        '2026-W10',
+        WOCHE_UNGUELTIG,
+    ]
+
+
+def _auftraege():
+    return pd.DataFrame([
+        ('A-1', 'Anna', '2026-W10', 30.0),
+        ('A-2', 'Anna', '2026-W10', 20.0),
+        ('B-1', 'Ben', '2026-W10', 10.0),
+        ('N-1', NICHT_ZUGEWIESEN, '2026-W11', 5.0),
+        ('U-1', 'Anna', WOCHE_UNGUELTIG, 12.0),
+    ], columns=['Interne_Auftragsnummer', 'Mitarbeiter', 'Woche', 'Stunden'])
+
+
+def test_workload():
+    last = workload(_auftraege(), mitarbeiter=['Anna', 'Ben', 'Clara']).set_index(['Mitarbeiter', 'Woche'])
+
+    assert last.loc[('Anna', '2026-W10'), 'Stunden'] == 50.0
+    assert last.loc[('Anna', '2026-W10'), 'Ueberlastet']
+    assert not last.loc[('Ben', '2026-W10'), 'Ueberlastet']
+    # Mitarbeiter ohne Aufträge erscheint in jeder Woche mit voller Kapazität
+    assert last.loc[('Clara', '2026-W11'), 'Frei'] == 38.0
+    # Nicht zugewiesen: ohne Kapazität, nur in Wochen mit Aufträgen
+    assert last.loc[(NICHT_ZUGEWIESEN, '2026-W11'), 'Kapazitaet'] == 0.0
+    assert last.loc[(NICHT_ZUGEWIESEN, '2026-W11'), 'Ueberlastet']
+    assert np.isnan(last.loc[(NICHT_ZUGEWIESEN, '2026-W11'), 'Auslastung'])
+    assert (NICHT_ZUGEWIESEN, '2026-W10') not in last.index
+    # Ohne lesbares Startdatum: keine Kapazität, nie überlastet, nur wo es Aufträge gibt
+    ungueltig = last.loc[('Anna', WOCHE_UNGUELTIG)]
+    assert ungueltig['Stunden'] == 12.0
+    assert np.isnan(ungueltig['Kapazitaet']) and np.isnan(ungueltig['Auslastung'])
+    assert not ungueltig['Ueberlastet']
+    assert ('Ben', WOCHE_UNGUELTIG) not in last.index
+
+
+def test_workload_kapazitaet_je_mitarbeiter():
+    last = workload(_auftraege(), kapazitaet={'Ben': 8.0}).set_index(['Mitarbeiter', 'Woche'])
+    assert last.loc[('Ben', '2026-W10'), 'Kapazitaet'] == 8.0
+    assert last.loc[('Ben', '2026-W10'), 'Ueberlastet']
+    assert last.loc[('Anna', '2026-W10'), 'Kapazitaet'] == 38.0
+
+
+def test_rebalance():
+    auftraege = _auftraege()
+    vorschlaege = rebalance(auftraege, workload(auftraege, mitarbeiter=['Anna', 'Ben', 'Clara']))
+    # Kleinster Auftrag, der die Überlast allein abbaut, zum Kollegen mit der meisten freien Zeit;
+    # der nicht zugewiesene Auftrag geht an den ersten freien Mitarbeiter; WOCHE_UNGUELTIG bleibt
+    assert vorschlaege.values.tolist() == [
+        ['A-2', '2026-W10', 20.0, 'Anna', 'Clara'],
+        ['N-1', '2026-W11', 5.0, NICHT_ZUGEWIESEN, 'Anna'],
+    ]
+
+
+def test_rebalance_ohne_passendes_ziel():
+    auftraege = pd.DataFrame([
+        ('A-1', 'Anna', '2026-W10', 45.0),
+        ('B-1', 'Ben', '2026-W10', 30.0),
+    ], columns=['Interne_Auftragsnummer', 'Mitarbeiter', 'Woche', 'Stunden'])
+    assert rebalance(auftraege, workload(auftraege)).empty
+
+
+class _StundenJeSystem:
+    """Modell mit festen Stunden je System (Zeichnung 10 h, Stückliste 5 h)."""
+
+    def predict(self, X):
+        return np.column_stack([X[:, 0] * 10.0, X[:, 0] * 5.0])
+
+
+def test_plan_capacity():
+    system = {'Produkttyp': 'Carport', 'Größe': 30.0, 'Seitenverkleidung': 'Ohne', 'Dachtyp': 'Trapezblech', 'Anzahl_Gewerke': 2}
+    projekte = [
+        {'Interne_Auftragsnummer': 'P-1', 'Systeme': [system, system], 'Zugewiesener_Mitarbeiter': 'Anna', 'Geplanter_Start': '2026-03-04'},
+        {'Interne_Auftragsnummer': 'P-2', 'Systeme': [system], 'Zugewiesener_Mitarbeiter': 'Anna', 'Geplanter_Start': '05.03.2026'},
+        {'Interne_Auftragsnummer': 'P-3', 'Systeme': [system], 'Geplanter_Start': 'unklar'},
+        {'Interne_Auftragsnummer': 'P-4', 'Systeme': [], 'Zugewiesener_Mitarbeiter': 'Ben'},
+    ]
+    plan = plan_capacity(projekte, _StundenJeSystem(), mitarbeiter=['Anna', 'Ben'], heute=HEUTE)
+
+    assert plan.auftraege['Stunden'].tolist() == [30.0, 15.0, 15.0, 0.0]
+    assert plan.auftraege['Woche'].tolist() == ['2026-W10', '2026-W10', WOCHE_UNGUELTIG, '2026-W10']
+    last = plan.auslastung.set_index(['Mitarbeiter', 'Woche'])
+    assert last.loc[('Anna', '2026-W10'), 'Stunden'] == 45.0
+    assert last.loc[(NICHT_ZUGEWIESEN, WOCHE_UNGUELTIG), 'Stunden'] == 15.0
+    assert plan.vorschlaege.values.tolist() == [['P-2', '2026-W10', 15.0, 'Anna', 'Ben']]
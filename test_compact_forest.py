@@ -0,0 +1,50 @@
+"""Tests für das kompakte Modell-Artefakt: gleiche Vorhersagen wie der sklearn-Wald."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from compact_forest import CompactForest, export_forest, verify
+from feature_encoder import ProjectFeatureEncoder
+from history_ingest import build_training_set
+from synthetic_data import synthetic_history, synthetic_orders
+
+
+@pytest.fixture(scope='module')
+def wald():
+    training_set = build_training_set(synthetic_history(300, seed=5))
+    model = RandomForestRegressor(n_estimators=15, random_state=0).fit(training_set.X, training_set.y)
+    return model, training_set
+
+
+@pytest.fixture(scope='module')
+def anfragen():
+    return ProjectFeatureEncoder().encode_many(a['Systeme'] for a in synthetic_orders(400, seed=6))
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_verify_ohne_abweichung(wald, anfragen, tmp_path, mmap):
+    model, training_set = wald
+    export_forest(model, tmp_path / 'modell.forest')
+    forest = CompactForest.load(tmp_path / 'modell.forest', mmap=mmap)
+    assert forest.n_trees == 15
+    assert verify(model, forest, anfragen) == 0.0
+    assert verify(model, forest, training_set.X) == 0.0
+    assert verify(model, forest, anfragen[:0]) == 0.0
+
+
+def test_baumvorhersagen_wie_sklearn(wald, anfragen, tmp_path):
+    model, _ = wald
+    export_forest(model, tmp_path / 'modell.forest')
+    forest = CompactForest.load(tmp_path / 'modell.forest')
+    erwartet = np.stack([baum.predict(anfragen.astype(np.float32)) for baum in model.estimators_])
+    np.testing.assert_array_equal(forest.predict_trees(anfragen), erwartet)
+
+
+def test_begrenzte_tiefe_und_baumzahl(wald, anfragen, tmp_path):
+    model, _ = wald
+    meta = export_forest(model, tmp_path / 'klein.forest', max_depth=3, max_trees=5)
+    forest = CompactForest.load(tmp_path / 'klein.forest')
+    assert meta['n_trees'] == 5
+    assert forest.max_depth <= 3
+    assert forest.predict(anfragen).shape == (len(anfragen), 2)
+    assert np.isfinite(forest.predict(anfragen)).all()
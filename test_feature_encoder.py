@@ -0,0 +1,58 @@
+"""Tests für RunningProjectVector: die laufende Zeile entspricht immer encoder.encode."""
+import numpy as np
+
+from feature_encoder import ProjectFeatureEncoder, RunningProjectVector
+from synthetic_data import synthetic_orders
+
+
+def _systeme(n=6, seed=3):
+    return [system for auftrag in synthetic_orders(n, seed=seed) for system in auftrag['Systeme']]
+
+
+def test_leerer_vektor_wie_encode():
+    encoder = ProjectFeatureEncoder()
+    np.testing.assert_array_equal(RunningProjectVector(encoder).row(), encoder.encode([]))
+
+
+def test_update_und_remove_wie_encode():
+    encoder = ProjectFeatureEncoder()
+    systeme = _systeme()
+    vektor = RunningProjectVector(encoder)
+    aktuell = {}
+    for i, system in enumerate(systeme):
+        vektor.update(i, system)
+        aktuell[i] = system
+        np.testing.assert_allclose(vektor.row(), encoder.encode(list(aktuell.values())))
+
+    # Geändertes System: nur die Differenz wird angepasst
+    geaendert = dict(systeme[0], Größe=systeme[0]['Größe'] + 40, Dachtyp='Gründach')
+    vektor.update(0, geaendert)
+    aktuell[0] = geaendert
+    np.testing.assert_allclose(vektor.row(), encoder.encode(list(aktuell.values())))
+
+    for schluessel in [1, 3, 0]:
+        vektor.remove(schluessel)
+        del aktuell[schluessel]
+        np.testing.assert_allclose(vektor.row(), encoder.encode(list(aktuell.values())))
+    assert vektor.keys() == list(aktuell)
+
+
+def test_ungueltiges_system_zaehlt_nicht():
+    encoder = ProjectFeatureEncoder()
+    gueltig = _systeme(1)[0]
+    vektor = RunningProjectVector(encoder)
+    vektor.update('a', gueltig)
+    vektor.update('b', dict(gueltig, Größe='unbekannt'))
+    np.testing.assert_allclose(vektor.row(), encoder.encode([gueltig]))
+    # Unbekannter Schlüssel: keine Änderung
+    vektor.remove('gibt-es-nicht')
+    np.testing.assert_allclose(vektor.row(), encoder.encode([gueltig]))
+
+
+def test_spaltenreihenfolge_des_modells():
+    encoder = ProjectFeatureEncoder(list(reversed(ProjectFeatureEncoder().feature_names)))
+    systeme = _systeme(3)
+    vektor = RunningProjectVector(encoder)
+    for i, system in enumerate(systeme):
+        vektor.update(i, system)
+    np.testing.assert_allclose(vektor.row(), encoder.encode(systeme))
@@ -0,0 +1,71 @@
+"""Tests für das Einlesen mehrerer Historiendateien (load_history_files)."""
+import numpy as np
+import pandas as pd
+
+from history_files import load_history_files
+from history_ingest import SPALTE_PROJEKT_ID, SPALTE_ZEICHNUNGSZEIT, build_training_set
+from synthetic_data import synthetic_history, write_history_workbook
+
+
+def _historie(ids, seed):
+    df = synthetic_history(len(ids), seed=seed)
+    df[SPALTE_PROJEKT_ID] = ids
+    return df
+
+
+def test_doppelte_id_letzte_datei_gewinnt(tmp_path):
+    alt = _historie(['P-1', 'P-2', 'P-3'], seed=1)
+    neu = _historie(['P-3', 'P-4'], seed=2)
+    neu[SPALTE_ZEICHNUNGSZEIT] = [111.0, 112.0]
+    alt.to_csv(tmp_path / 'historie_2023.csv', index=False)
+    neu.to_csv(tmp_path / 'historie_2024.csv', index=False)
+
+    training_set, bericht, duplikate = load_history_files(tmp_path, max_workers=1)
+
+    assert duplikate == 1
+    assert list(bericht['Projekte']) == [3, 2]
+    assert bericht['Fehler'].isna().all()
+    assert sorted(training_set.projekt_ids) == ['P-1', 'P-2', 'P-3', 'P-4']
+    zeile = list(training_set.projekt_ids).index('P-3')
+    assert training_set.y[zeile, 0] == 111.0
+
+
+def test_zeilen_ohne_id_werden_nicht_zusammengelegt(tmp_path):
+    for name, seed in [('a.csv', 1), ('b.csv', 2)]:
+        _historie([None, None], seed=seed).to_csv(tmp_path / name, index=False)
+
+    training_set, _, duplikate = load_history_files(tmp_path, max_workers=1)
+
+    assert duplikate == 0
+    assert len(training_set.projekt_ids) == 4
+    assert len(set(training_set.projekt_ids)) == 4
+    assert all(str(tmp_path) in p for p in training_set.projekt_ids)
+
+
+def test_abweichende_spaltennamen_und_deutsches_csv(tmp_path):
+    df = _historie(['P-1', 'P-2', 'P-3', 'P-4'], seed=3)
+    df.to_csv(tmp_path / 'vorlage.csv', index=False)
+    alt = df.rename(columns={SPALTE_PROJEKT_ID: 'Projektnr', SPALTE_ZEICHNUNGSZEIT: 'Zeichnung [h]', 'Größe 1': 'Groesse_1'})
+    alt.to_csv(tmp_path / 'export.csv', index=False, sep=';', decimal=',', encoding='cp1252')
+
+    erwartet, _, _ = load_history_files(tmp_path / 'vorlage.csv', max_workers=1)
+    training_set, _, _ = load_history_files(tmp_path / 'export.csv', max_workers=1)
+
+    np.testing.assert_array_equal(training_set.X, erwartet.X)
+    np.testing.assert_array_equal(training_set.y, erwartet.y)
+    assert list(training_set.projekt_ids) == list(erwartet.projekt_ids)
+
+
+def test_einzelne_arbeitsmappe_wie_build_training_set(tmp_path, monkeypatch):
+    # Parquet-Cache (relativer Ordner) im temporären Verzeichnis anlegen
+    monkeypatch.chdir(tmp_path)
+    df = synthetic_history(20, seed=4)
+    write_history_workbook(df, tmp_path / 'historie.xlsx')
+
+    training_set, bericht, duplikate = load_history_files(str(tmp_path / 'historie.xlsx'), max_workers=1)
+    erwartet = build_training_set(pd.read_excel(tmp_path / 'historie.xlsx', header=1))
+
+    assert duplikate == 0
+    assert bericht['Fehler'].isna().all()
+    np.testing.assert_allclose(training_set.X, erwartet.X)
+    np.testing.assert_allclose(training_set.y, erwartet.y)
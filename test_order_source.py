@@ -0,0 +1,99 @@
+"""Tests für die Auftragsquellen (im Speicher und SQLite)."""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+import order_source
+from order_source import InMemoryOrderSource, OrderSource, SQLiteOrderSource, _date_text, get_order_source
+from synthetic_data import synthetic_orders
+
+
+@pytest.fixture
+def auftraege():
+    return synthetic_orders(30, seed=7)
+
+
+@pytest.fixture(params=['speicher', 'sqlite'])
+def quelle(request, auftraege, tmp_path):
+    if request.param == 'speicher':
+        yield InMemoryOrderSource(auftraege)
+        return
+    quelle = SQLiteOrderSource(str(tmp_path / 'auftraege.sqlite'))
+    quelle.add_orders(auftraege)
+    yield quelle
+    quelle.close()
+
+
+def test_alle_auftraege_unveraendert(quelle, auftraege):
+    assert len(quelle) == len(auftraege)
+    assert quelle.order_numbers() == [a['Interne_Auftragsnummer'] for a in auftraege]
+    assert quelle.all_orders() == auftraege
+
+
+def test_get_und_get_many(quelle, auftraege):
+    assert quelle.get(auftraege[4]['Interne_Auftragsnummer']) == auftraege[4]
+    assert quelle.get('GIBT-ES-NICHT') is None
+    nummern = [auftraege[i]['Interne_Auftragsnummer'] for i in (9, 2, 17)]
+    treffer = quelle.get_many(nummern + ['GIBT-ES-NICHT'])
+    assert sorted(treffer) == sorted(nummern)
+    assert all(treffer[n]['Interne_Auftragsnummer'] == n for n in nummern)
+
+
+def test_orders_for(quelle, auftraege):
+    mitarbeiter = auftraege[0]['Zugewiesener_Mitarbeiter']
+    assert quelle.orders_for(mitarbeiter) == [a for a in auftraege if a.get('Zugewiesener_Mitarbeiter') == mitarbeiter]
+    assert quelle.orders_for('Niemand') == []
+
+
+def test_sqlite_ersetzt_vorhandene_nummern(tmp_path, auftraege):
+    quelle = SQLiteOrderSource(str(tmp_path / 'auftraege.sqlite'))
+    quelle.add_orders(auftraege[:3])
+    nummer = auftraege[0]['Interne_Auftragsnummer']
+    zwischenstand = dict(auftraege[0], Systeme=auftraege[1]['Systeme'])
+    neu = dict(auftraege[0], Systeme=auftraege[2]['Systeme'][:1], Zugewiesener_Mitarbeiter='Mitarbeiter 9')
+    # Doppelte Nummer in einem Aufruf: der letzte Eintrag gilt
+    assert quelle.add_orders([zwischenstand, neu]) == 1
+    assert len(quelle) == 3
+    assert quelle.get(nummer) == neu
+    assert quelle.orders_for('Mitarbeiter 9') == [neu]
+    quelle.close()
+
+
+def test_sqlite_starttermine_als_iso_text(tmp_path):
+    quelle = SQLiteOrderSource(str(tmp_path / 'auftraege.sqlite'))
+    quelle.add_orders([
+        {'Interne_Auftragsnummer': 'A-1', 'Systeme': [], 'Geplanter_Start': pd.Timestamp('2026-03-02 08:30')},
+        {'Interne_Auftragsnummer': 'A-2', 'Systeme': [], 'Geplanter_Start': date(2026, 3, 9)},
+        {'Interne_Auftragsnummer': 'A-3', 'Systeme': [], 'Geplanter_Start': pd.NaT},
+    ])
+    treffer = quelle.get_many(['A-1', 'A-2', 'A-3'])
+    assert treffer['A-1']['Geplanter_Start'] == '2026-03-02'
+    assert treffer['A-2']['Geplanter_Start'] == '2026-03-09'
+    assert 'Geplanter_Start' not in treffer['A-3']
+    quelle.close()
+
+
+@pytest.mark.parametrize('wert, erwartet', [
+    (pd.Timestamp('2026-01-05 14:00'), '2026-01-05'),
+    (datetime(2026, 1, 5, 9, 15), '2026-01-05'),
+    (date(2026, 1, 5), '2026-01-05'),
+    (pd.NaT, None),
+    (None, None),
+    ('05.01.2026', '05.01.2026'),
+])
+def test_date_text(wert, erwartet):
+    assert _date_text(wert) == erwartet
+
+
+def test_schnittstelle_nicht_instanziierbar():
+    with pytest.raises(TypeError):
+        OrderSource()
+
+
+def test_ohne_datenbank_auftraege_im_speicher(tmp_path, auftraege, monkeypatch):
+    # Quellen werden je Prozess geteilt; eigener Zwischenspeicher, damit der Test nichts hinterlässt
+    monkeypatch.setattr(order_source, '_SOURCES', {})
+    quelle = get_order_source(auftraege, path=str(tmp_path / 'fehlt.sqlite'))
+    assert isinstance(quelle, InMemoryOrderSource)
+    assert len(quelle) == len(auftraege)
@@ -0,0 +1,81 @@
+"""Tests für Batch-Schätzung und Prognoseintervalle aus den Bäumen des Random Forest."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from compact_forest import CompactForest, export_forest
+from feature_encoder import ProjectFeatureEncoder
+from history_ingest import build_training_set
+from synthetic_data import synthetic_history, synthetic_orders
+from zeitprognose import INTERVALL_SPALTEN, estimate_batch, prediction_intervals, tree_predictions
+
+
+@pytest.fixture(scope='module')
+def training_set():
+    return build_training_set(synthetic_history(300, seed=5))
+
+
+@pytest.fixture(scope='module')
+def wald(training_set):
+    return RandomForestRegressor(n_estimators=20, random_state=0).fit(training_set.X, training_set.y)
+
+
+@pytest.fixture(scope='module')
+def auftraege():
+    auftraege = synthetic_orders(50, seed=8)
+    auftraege[3] = dict(auftraege[3], Systeme=[])
+    return auftraege
+
+
+def test_baumvorhersagen_mitteln_zu_predict(wald, training_set):
+    baeume = tree_predictions(training_set.X[:40], wald)
+    assert baeume.shape == (20, 40, 2)
+    np.testing.assert_allclose(baeume.mean(axis=0), wald.predict(training_set.X[:40]))
+
+
+def test_intervalle_sklearn_und_kompakt_gleich(wald, training_set, tmp_path):
+    export_forest(wald, tmp_path / 'modell.forest')
+    forest = CompactForest.load(tmp_path / 'modell.forest')
+    quantile = (0.1, 0.5, 0.9)
+    intervall = prediction_intervals(training_set.X, wald, quantile)
+    assert intervall.shape == (3, len(training_set.X), 2)
+    assert (np.diff(intervall, axis=0) >= 0).all()
+    np.testing.assert_array_equal(prediction_intervals(training_set.X, forest, quantile), intervall)
+
+
+def test_kein_baum_ensemble(training_set):
+    ridge = Ridge().fit(training_set.X, training_set.y)
+    assert tree_predictions(training_set.X, ridge) is None
+    assert prediction_intervals(training_set.X, ridge) is None
+
+
+@pytest.mark.parametrize('quantile', [(0.1, 0.9), (0.05, 0.5, 0.95)])
+def test_estimate_batch_mit_intervallen(wald, auftraege, quantile):
+    ergebnis = estimate_batch(auftraege, wald, cache=None, quantile=quantile)
+    assert len(ergebnis) == len(auftraege)
+    assert ergebnis[INTERVALL_SPALTEN].notna().all().all()
+    # Unteres und oberes Quantil wie prediction_intervals, auch bei mehr als zwei Quantilen
+    X = ProjectFeatureEncoder().encode_many(a['Systeme'] for a in auftraege)
+    intervall = prediction_intervals(X, wald, quantile)
+    mit_systemen = ergebnis['Anzahl_Systeme'].to_numpy() > 0
+    np.testing.assert_array_equal(ergebnis['Zeichnungszeit_h_unten'][mit_systemen], intervall[0, mit_systemen, 0])
+    np.testing.assert_array_equal(ergebnis['Stuecklistenzeit_h_oben'][mit_systemen], intervall[-1, mit_systemen, 1])
+    for zeit in ['Zeichnungszeit_h', 'Stuecklistenzeit_h']:
+        assert (ergebnis[f'{zeit}_unten'] <= ergebnis[f'{zeit}_oben']).all()
+    ohne = ergebnis.iloc[3]
+    assert ohne['Anzahl_Systeme'] == 0
+    assert (ohne[['Zeichnungszeit_h', 'Stuecklistenzeit_h'] + INTERVALL_SPALTEN] == 0).all()
+
+
+def test_estimate_batch_ohne_baeume_nan(training_set, auftraege):
+    ridge = Ridge().fit(training_set.X, training_set.y)
+    ergebnis = estimate_batch(auftraege, ridge, cache=None, quantile=(0.1, 0.5, 0.9))
+    assert ergebnis.drop(index=3)[INTERVALL_SPALTEN].isna().all().all()
+    assert (ergebnis.loc[3, INTERVALL_SPALTEN] == 0).all()
+
+
+def test_estimate_batch_leer(wald):
+    ergebnis = estimate_batch([], wald, cache=None, quantile=(0.1, 0.5, 0.9))
+    assert ergebnis.empty
+    assert set(INTERVALL_SPALTEN) <= set(ergebnis.columns)
@@ -1,136 +1,300 @@
-import pandas as pd
+"""Training des Zeitprognose-Modells.
+
+Aufruf:
+    python train_model.py                    # vollständiges Training, neue Modellversion
+    python train_model.py --inkrementell     # nur neue Projekt-IDs ergänzen (Warm-Start)
+    python train_model.py --modellauswahl    # Kandidaten per Kreuzvalidierung vergleichen
+    python train_model.py --liste            # vorhandene Modellversionen anzeigen
+    python train_model.py --pin v0003        # Version festpinnen (--rollback, --entpinnen)
+    python train_model.py --profil           # Trainingslauf mit cProfile aufzeichnen (profile/)
+    python train_model.py --historie "exporte/*.xlsx"   # mehrere Exporte (Verzeichnis oder Glob) parallel lesen
+
+Jedes Training wird als neue Version in der Modell-Registry (modelle/) gespeichert. Für
+Random-Forest-Modelle wird zusätzlich das kompakte NumPy-Artefakt (modelle/vNNNN.forest)
+exportiert, das die App ohne scikit-learn auswertet, und für jede Version der Nachbarindex
+der Historie (modelle/vNNNN.nachbarn/) für die Anzeige ähnlicher Projekte.
+"""
+import argparse
+import math
+import os
+import zlib
+from contextlib import nullcontext
+
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-import joblib
-
-# Lade die Excel-Datei
-print("Lade Excel-Datei...")
-df = pd.read_excel('KI_Zeitprognose_Vorlage_Projekt-W.xlsx', header=1)
-
-# Debug: Zeige Spaltennamen
-print("\nSpaltennamen in der Excel-Datei:")
-print(df.columns.tolist())
-
-# Debug: Zeige erste Zeile
-print("\nErste Zeile der Excel-Datei:")
-print(df.iloc[0])
-
-# Extrahiere die Gesamtzeiten pro Projekt
-print("\nExtrahiere Gesamtzeiten pro Projekt...")
-X = []
-y = []
-
-for index, row in df.iterrows():
-    try:
-        # Lese Basisinformationen der Projektzeile
-        systemanzahl = int(row.get('Systemanzahl', 0))
-        # Korrigierte Spaltennamen
-        gesamt_zeichnungszeit = row.get('Zeichnungszeit')
-        gesamt_stuecklistenzeit = row.get('Stücklistenzeit')
-
-        print(f"\nVerarbeite Zeile {index}:")
-        print(f"Systemanzahl: {systemanzahl}")
-        print(f"Zeichnungszeit: {gesamt_zeichnungszeit}")
-        print(f"Stücklistenzeit: {gesamt_stuecklistenzeit}")
-
-        # Ignoriere Zeilen mit unzureichenden Daten
-        if systemanzahl <= 0 or pd.isna(gesamt_zeichnungszeit) or pd.isna(gesamt_stuecklistenzeit):
-            print("Zeile übersprungen: Unzureichende Daten")
-            continue
-
-        # Sammle alle Systeme aus der Excel-Zeile
-        systems = []
-        for sys_idx in range(1, systemanzahl + 1):
-            produkttyp = row.get(f'Produkttyp {sys_idx}')
-            anzahl = row.get(f'Anzahl {sys_idx}')
-            dachtyp = row.get(f'Dachtyp {sys_idx}')
-            seitenverkleidung = row.get(f'Seitenverkleidung {sys_idx}')
-            groesse = row.get(f'Größe {sys_idx}')
-
-            print(f"\nSystem {sys_idx}:")
-            print(f"Produkttyp: {produkttyp}")
-            print(f"Anzahl: {anzahl}")
-            print(f"Dachtyp: {dachtyp}")
-            print(f"Seitenverkleidung: {seitenverkleidung}")
-            print(f"Größe: {groesse}")
-
-            if (pd.notna(produkttyp) and pd.notna(anzahl) and 
-                pd.notna(dachtyp) and pd.notna(seitenverkleidung) and 
-                pd.notna(groesse)):
-                try:
-                    systems.append({
-                        'Produkttyp': produkttyp,
-                        'Größe': float(groesse),
-                        'Seitenverkleidung': seitenverkleidung,
-                        'Dachtyp': dachtyp,
-                        'Anzahl': int(anzahl)
-                    })
-                except (ValueError, TypeError) as e:
-                    print(f"Fehler bei Konvertierung: {e}")
-                    continue
-
-        if len(systems) == systemanzahl:
-            # Erstelle Features für das gesamte Projekt
-            features = {
-                "Anzahl_Systeme": len(systems),
-                "Gesamtflaeche": sum(sys['Größe'] for sys in systems),
-                "Durchschnittliche_Systemgroesse": sum(sys['Größe'] for sys in systems) / len(systems),
-                "Gesamt_Anzahl_Gewerke": sum(sys['Anzahl'] for sys in systems),
-                "Produkttyp_Carport": sum(1 for sys in systems if sys['Produkttyp'] == 'Carport'),
-                "Produkttyp_Fahrradüberdachung": sum(1 for sys in systems if sys['Produkttyp'] == 'Fahrradüberdachung'),
-                "Produkttyp_Mülleinhausung": sum(1 for sys in systems if sys['Produkttyp'] == 'Mülleinhausung'),
-                "Produkttyp_Pergola": sum(1 for sys in systems if sys['Produkttyp'] == 'Pergola'),
-                "Produkttyp_Mülltonnenbox": sum(1 for sys in systems if sys['Produkttyp'] == 'Mülltonnenbox'),
-                "Seitenverkleidung_Gittermatte": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'Gittermatte'),
-                "Seitenverkleidung_Ohne": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'Ohne'),
-                "Seitenverkleidung_Stahl-Lochblech": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'Stahl-Lochblech'),
-                "Seitenverkleidung_Stahl-Vollblech": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'Stahl-Vollblech'),
-                "Seitenverkleidung_Trespa": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'Trespa'),
-                "Seitenverkleidung_WL": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'WL'),
-                "Seitenverkleidung_WL+LBK": sum(1 for sys in systems if sys['Seitenverkleidung'] == 'WL+LBK'),
-                "Dachtyp_Gründach": sum(1 for sys in systems if sys['Dachtyp'] == 'Gründach'),
-                "Dachtyp_Gründach-Light": sum(1 for sys in systems if sys['Dachtyp'] == 'Gründach-Light'),
-                "Dachtyp_Ohne": sum(1 for sys in systems if sys['Dachtyp'] == 'Ohne'),
-                "Dachtyp_Polycarbonat": sum(1 for sys in systems if sys['Dachtyp'] == 'Polycarbonat'),
-                "Dachtyp_Trapezblech": sum(1 for sys in systems if sys['Dachtyp'] == 'Trapezblech')
-            }
-            X.append(features)
-            y.append([float(gesamt_zeichnungszeit), float(gesamt_stuecklistenzeit)])
-            print("Projekt erfolgreich extrahiert")
-        else:
-            print(f"Zeile übersprungen: {len(systems)} Systeme gefunden, {systemanzahl} erwartet")
+from sklearn.metrics import mean_absolute_error
+
+from compact_forest import CompactForest, compact_path, export_forest, verify
+from feature_encoder import ProjectFeatureEncoder
+from history_files import load_history_files, print_report
+from history_ingest import skip_summary
+from instrumentation import TRACER, profile, profile_path
+from model_registry import REGISTRY
+from model_selection import LATENZ_GEWICHT, select_model
+from resources import file_hash
+from similar_projects import build_and_save
+
+HISTORY_PATH = 'KI_Zeitprognose_Vorlage_Projekt-W.xlsx'
+N_ESTIMATORS = 100
+TEST_ANTEIL = 0.2
+# Faktor, um den der Fehler auf neuen Projekten den Testfehler der Basisversion übersteigen darf
+DRIFT_SCHWELLE = 1.5
+# Obergrenze für die Waldgröße beim Warm-Start, danach wird neu trainiert
+MAX_BAEUME = 500
+
+
+def load_training_set(path=HISTORY_PATH, encoder=None, max_workers=None):
+    """Lädt die Projekthistorie und erzeugt daraus die Trainingsdaten.
+
+    path ist eine einzelne Datei (Excel, CSV, Parquet) oder ein Verzeichnis bzw. Glob-Muster
+    mit mehreren Exporten. Alles läuft über load_history_files (Spaltennamen vereinheitlichen,
+    Ersatz-IDs, Dubletten); mehrere Dateien werden mit max_workers Prozessen gelesen.
+    """
+    print(f"Lade Projekthistorie aus {path}...")
+    with TRACER.span('historie_lesen', datei=path):
+        training_set, bericht, duplikate = load_history_files(path, encoder, max_workers)
+    print_report(bericht, duplikate)
+    if bericht['Fehler'].notna().all():
+        raise ValueError(f"Keine Historiendatei lesbar: {'; '.join(bericht['Fehler'])}")
+    TRACER.count('projekte', len(training_set.X))
+    TRACER.count('zeilen_uebersprungen', len(training_set.skipped))
+    print(skip_summary(training_set))
+    return training_set
+
+
+def test_mask(projekt_ids, test_anteil=TEST_ANTEIL):
+    """Stabile Train/Test-Aufteilung über einen Hash der Projekt-ID.
+
+    Ein Projekt landet bei jedem Training im selben Set, sodass inkrementelle Versionen
+    auf denselben Testprojekten bewertet werden wie ihre Basisversion.
+    """
+    grenze = int(round(test_anteil * 100))
+    return np.array([zlib.crc32(str(p).encode('utf-8')) % 100 < grenze for p in projekt_ids], dtype=bool)
+
+
+def evaluate(model, X, y, ist_test):
+    """R²-Scores für Trainings- und Testset sowie mittlerer absoluter Fehler auf dem Testset."""
+    scores = {'train_score': float(model.score(X[~ist_test], y[~ist_test])), 'test_score': None, 'test_mae': None}
+    if ist_test.sum() >= 2:
+        scores['test_score'] = float(model.score(X[ist_test], y[ist_test]))
+        scores['test_mae'] = float(mean_absolute_error(y[ist_test], model.predict(X[ist_test])))
+    return scores
+
+
+def train_full(X, y, ist_test, estimator=None):
+    """Trainiert einen neuen Schätzer (Standard: Random Forest) auf allen Trainingsprojekten."""
+    if estimator is None:
+        model = RandomForestRegressor(n_estimators=N_ESTIMATORS, random_state=42)
+    else:
+        model = clone(estimator)
+    # Training auf allen Kernen; danach wieder ein Thread, damit Einzelvorhersagen keinen Overhead haben
+    parallel = 'n_jobs' in model.get_params(deep=False)
+    if parallel:
+        model.set_params(n_jobs=-1)
+    model.fit(X[~ist_test], y[~ist_test])
+    if parallel:
+        model.set_params(n_jobs=None)
+    return model
+
+
+def train_incremental(base_model, base_meta, X, y, neu, ist_test, drift_schwelle=DRIFT_SCHWELLE, max_baeume=MAX_BAEUME):
+    """Ergänzt die Basisversion um neue Projekte.
+
+    Ist der Fehler der Basisversion auf den neuen Projekten höher als drift_schwelle mal ihr
+    Testfehler, oder würde der Wald größer als max_baeume, wird komplett neu trainiert.
+    Sonst werden per Warm-Start zusätzliche Bäume angelegt, deren Anzahl dem Anteil der
+    neuen Projekte entspricht; die bestehenden Bäume bleiben unverändert. Basisversionen,
+    die kein Random Forest sind, werden immer mit denselben Parametern neu trainiert.
+    Gibt (model, modus, drift) zurück.
+    """
+    if not isinstance(base_model, RandomForestRegressor):
+        print("Basisversion ist kein Random Forest (kein Warm-Start möglich): trainiere komplett neu")
+        return train_full(X, y, ist_test, base_model), 'voll (kein Warm-Start)', None
+
+    basis_mae = (base_meta.get('scores') or {}).get('test_mae')
+    drift = None
+    if basis_mae:
+        neu_mae = mean_absolute_error(y[neu], base_model.predict(X[neu]))
+        drift = float(neu_mae / basis_mae)
+        print(f"Fehler der Basisversion auf {neu.sum()} neuen Projekten: {neu_mae:.2f} h "
+              f"(Testfehler {basis_mae:.2f} h, Verhältnis {drift:.2f})")
+    if drift is None or drift > drift_schwelle:
+        print("Drift über Schwelle (oder kein Vergleichswert): trainiere komplett neu")
+        return train_full(X, y, ist_test, base_model), 'voll (Drift)', drift
 
-    except Exception as e:
-        print(f"Fehler bei Zeile {index}: {e}")
-        continue
+    basis_baeume = len(base_model.estimators_)
+    zusaetzlich = max(10, math.ceil(basis_baeume * neu.sum() / max(1, (~neu).sum())))
+    if basis_baeume + zusaetzlich > max_baeume:
+        print(f"Wald würde {basis_baeume + zusaetzlich} Bäume haben (Maximum {max_baeume}): trainiere komplett neu")
+        return train_full(X, y, ist_test, base_model), 'voll (Waldgröße)', drift
 
-# Konvertiere zu DataFrames
-X_df = pd.DataFrame(X)
-y_df = pd.DataFrame(y, columns=['Zeichnungszeit', 'Stuecklistenzeit'])
+    print(f"Warm-Start: {basis_baeume} bestehende + {zusaetzlich} neue Bäume")
+    base_model.set_params(warm_start=True, n_estimators=basis_baeume + zusaetzlich, n_jobs=-1)
+    base_model.fit(X[~ist_test], y[~ist_test])
+    base_model.set_params(warm_start=False, n_jobs=None)
+    return base_model, 'inkrementell', drift
 
-print(f"\nAnzahl der Projekte zum Training: {len(X_df)}")
 
-if len(X_df) > 0:
-    # Teile die Daten in Trainings- und Testsets
-    X_train, X_test, y_train, y_test = train_test_split(X_df, y_df, test_size=0.2, random_state=42)
+def export_compact(model, model_path, X, feature_names, max_tiefe=None, max_baeume=None):
+    """Exportiert das kompakte Artefakt neben model_path und prüft es gegen model.predict."""
+    ziel = compact_path(model_path)
+    meta = export_forest(model, ziel, max_tiefe, max_baeume, feature_names, source_hash=file_hash(model_path))
+    abweichung = verify(model, CompactForest.load(ziel), X)
+    print(f"Kompaktes Artefakt {ziel}: {meta['n_trees']} Bäume, {meta['n_nodes']} Knoten, "
+          f"max. Abweichung {abweichung:.3g} h")
+    return abweichung
+
+
+def print_versions():
+    active = REGISTRY.active()
+    versions = REGISTRY.versions()
+    if not versions:
+        print("Noch keine Modellversionen vorhanden.")
+    for version in versions:
+        meta = REGISTRY.metadata(version)
+        scores = meta.get('scores') or {}
+        test_score = scores.get('test_score')
+        markierung = '*' if version == active else ' '
+        baeume = f"{meta['n_estimators']} Bäume, " if meta.get('n_estimators') else ''
+        print(f"{markierung} {version}  {meta.get('erstellt')}  {meta.get('modus'):<18} {meta.get('kandidat')}, "
+              f"{meta.get('trainingszeilen')} Trainingszeilen, {baeume}"
+              f"Test-Score {test_score if test_score is None else f'{test_score:.3f}'}")
+    if REGISTRY.pinned():
+        print(f"Gepinnt: {REGISTRY.pinned()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trainiert das Zeitprognose-Modell und speichert es als neue Version.")
+    parser.add_argument('--historie', default=HISTORY_PATH, help="Projekthistorie (Excel, CSV oder Parquet) oder Verzeichnis/Glob-Muster mit mehreren Exporten")
+    parser.add_argument('--prozesse', type=int, help="Worker-Prozesse beim Lesen mehrerer Historiendateien (Standard: Anzahl CPUs)")
+    parser.add_argument('--inkrementell', action='store_true', help="Nur neue Projekt-IDs zur aktiven Version hinzufügen")
+    parser.add_argument('--drift-schwelle', type=float, default=DRIFT_SCHWELLE, help="Fehlerverhältnis, ab dem komplett neu trainiert wird")
+    parser.add_argument('--max-baeume', type=int, default=MAX_BAEUME, help="Maximale Anzahl Bäume beim Warm-Start")
+    parser.add_argument('--modellauswahl', action='store_true', help="Kandidaten per Kreuzvalidierung vergleichen und den besten trainieren")
+    parser.add_argument('--folds', type=int, default=5, help="Anzahl Folds der Kreuzvalidierung")
+    parser.add_argument('--latenz-gewicht', type=float, default=LATENZ_GEWICHT, help="R²-Punkte, die 1 ms Einzel-Latenz kosten darf")
+    parser.add_argument('--kompakt-max-tiefe', type=int, help="Bäume im kompakten Artefakt auf diese Tiefe kürzen")
+    parser.add_argument('--kompakt-max-baeume', type=int, help="Nur die ersten N Bäume ins kompakte Artefakt übernehmen")
+    parser.add_argument('--liste', action='store_true', help="Modellversionen anzeigen")
+    parser.add_argument('--pin', metavar='VERSION', help="Modellversion festpinnen")
+    parser.add_argument('--rollback', action='store_true', help="Version vor der aktiven festpinnen")
+    parser.add_argument('--entpinnen', action='store_true', help="Pinning aufheben (neueste Version aktiv)")
+    parser.add_argument('--profil', nargs='?', const='', metavar='DATEI',
+                        help="Trainingslauf mit cProfile aufzeichnen (ohne DATEI: profile/training-<Zeit>.prof)")
+    args = parser.parse_args(argv)
+
+    if args.pin:
+        REGISTRY.pin(args.pin)
+        print(f"Version {args.pin} gepinnt.")
+        return
+    if args.rollback:
+        print(f"Rollback auf Version {REGISTRY.rollback()}.")
+        return
+    if args.entpinnen:
+        REGISTRY.unpin()
+        print(f"Pinning aufgehoben, aktiv: {REGISTRY.active()}")
+        return
+    if args.liste:
+        print_versions()
+        return
+
+    profil = nullcontext() if args.profil is None else profile(args.profil or profile_path('training'))
+    with profil, TRACER.span('trainingslauf', historie=args.historie, inkrementell=args.inkrementell):
+        train(args)
+
+
+def train(args):
+    """Ein Trainingslauf mit den Optionen aus main(); speichert eine neue Version in der Registry."""
+    encoder = ProjectFeatureEncoder()
+    training_set = load_training_set(args.historie, encoder, args.prozesse)
+    X, y = training_set.X, training_set.y
+    projekt_ids = [str(p) for p in training_set.projekt_ids]
+
+    print(f"\nAnzahl der Projekte zum Training: {len(X)}")
+    if len(X) == 0:
+        print("Keine gültigen Projekte zum Training gefunden!")
+        return
+
+    ist_test = test_mask(projekt_ids)
+    basis_version = REGISTRY.active() if args.inkrementell else None
+    drift = None
+    kandidat = 'RandomForest (100)'
+    auswahl = None
+    neu = np.ones(len(X), dtype=bool)
+
+    if basis_version is not None:
+        base_meta = REGISTRY.metadata(basis_version)
+        if base_meta.get('feature_names') != encoder.feature_names:
+            print(f"Feature-Schema von {basis_version} weicht ab: trainiere komplett neu")
+            basis_version = None
+        else:
+            bekannt = set(base_meta.get('projekt_ids', []))
+            neu = np.array([p not in bekannt for p in projekt_ids], dtype=bool)
+            print(f"Basisversion {basis_version}: {len(bekannt)} bekannte, {neu.sum()} neue Projekte")
+            if not neu.any():
+                print("Keine neuen Projekte, keine neue Version nötig.")
+                return
+    elif args.inkrementell:
+        print("Noch keine Modellversion vorhanden: trainiere komplett neu")
 
     # Trainiere das Modell
+    if basis_version is None and args.modellauswahl:
+        print("Modellauswahl per Kreuzvalidierung...")
+        with TRACER.span('modellauswahl', folds=args.folds):
+            auswahl = select_model(X[~ist_test], y[~ist_test], folds=args.folds, latenz_gewicht=args.latenz_gewicht)
+        kandidat = auswahl.best_name
     print("Trainiere Modell...")
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
-
-    # Speichere das Modell
-    print("Speichere Modell...")
-    joblib.dump(model, 'ki_zeitprognose_model.joblib')
+    with TRACER.span('training', zeilen=int((~ist_test).sum())) as span:
+        if basis_version is None:
+            model, modus = train_full(X, y, ist_test, auswahl.best_estimator if auswahl else None), 'voll'
+        else:
+            kandidat = base_meta.get('kandidat', kandidat)
+            model, modus, drift = train_incremental(
+                REGISTRY.load(basis_version), base_meta, X, y, neu, ist_test, args.drift_schwelle, args.max_baeume
+            )
+        span['modus'] = modus
 
     # Evaluierung
-    train_score = model.score(X_train, y_train)
-    test_score = model.score(X_test, y_test)
-    print(f"Trainings-Score: {train_score:.3f}")
-    print(f"Test-Score: {test_score:.3f}")
+    with TRACER.span('evaluierung'):
+        scores = evaluate(model, X, y, ist_test)
+    print(f"Trainings-Score: {scores['train_score']:.3f}")
+    if scores['test_score'] is not None:
+        print(f"Test-Score: {scores['test_score']:.3f}")
 
+    def artefakte_schreiben(model_path):
+        # Vor der Registry-JSON: sonst lädt eine laufende App die neue Version als sklearn-Modell
+        # und wechselt nicht mehr auf das kompakte Artefakt (die joblib-Datei ändert sich nicht)
+        if isinstance(model, RandomForestRegressor):
+            with TRACER.span('kompakt_export'):
+                export_compact(model, model_path, X, encoder.feature_names,
+                               args.kompakt_max_tiefe, args.kompakt_max_baeume)
+        with TRACER.span('nachbarindex', projekte=len(X)):
+            build_and_save(training_set, model_path)
+
+    # Speichere das Modell als neue Version
+    print("Speichere Modell...")
+    with TRACER.span('speichern'):
+        version = REGISTRY.save(model, {
+            'modus': modus,
+            'basis_version': basis_version,
+            'historie': args.historie,
+            'feature_names': list(encoder.feature_names),
+            'zielgroessen': ['Zeichnungszeit', 'Stuecklistenzeit'],
+            'trainingszeilen': int((~ist_test).sum()),
+            'testzeilen': int(ist_test.sum()),
+            'neue_projekte': int(neu.sum()),
+            'kandidat': kandidat,
+            'n_estimators': len(model.estimators_) if isinstance(model, RandomForestRegressor) else None,
+            'drift': drift,
+            'scores': scores,
+            'modellauswahl': auswahl.table.reset_index().to_dict('records') if auswahl else None,
+            'projekt_ids': projekt_ids,
+            'test_projekt_ids': [p for p, t in zip(projekt_ids, ist_test) if t],
+        }, artefakte=artefakte_schreiben)
+    print(f"Gespeichert als Version {version} ({modus}), aktiv: {REGISTRY.active()}")
     print("Fertig!")
-else:
-    print("Keine gültigen Projekte zum Training gefunden!") 
\ No newline at end of file
+
+
+if __name__ == '__main__':
+    main()
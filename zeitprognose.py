@@ -0,0 +1,201 @@
+"""Schätzlogik der Zeitprognose, gemeinsam genutzt von der Streamlit-App und der Batch-Schätzung."""
+import numpy as np
+import pandas as pd
+
+from feature_encoder import FEATURE_ANZAHL_SYSTEME, ProjectFeatureEncoder
+from instrumentation import TRACER
+from prediction_cache import PREDICTION_CACHE
+from resources import get_model, model_version
+
+QUELLE_MODELL = 'KI-Modell'
+QUELLE_OHNE_SYSTEME = 'Kein System zur Schätzung gefunden'
+
+# Spalten der Batch-Ergebnisse (estimate_batch und batch_estimate.py)
+ERGEBNIS_SPALTEN = [
+    'Interne_Auftragsnummer',
+    'Zugewiesener_Mitarbeiter',
+    'Anzahl_Systeme',
+    'Zeichnungszeit_h',
+    'Stuecklistenzeit_h',
+    'Quelle',
+]
+# Zusätzliche Spalten von estimate_batch(..., quantile=...)
+INTERVALL_SPALTEN = [
+    'Zeichnungszeit_h_unten',
+    'Zeichnungszeit_h_oben',
+    'Stuecklistenzeit_h_unten',
+    'Stuecklistenzeit_h_oben',
+]
+# Standard für Prognoseintervalle: 10 %- und 90 %-Quantil der Baumvorhersagen (80 %-Intervall)
+INTERVALL_QUANTILE = (0.1, 0.9)
+
+
+def predict_rows(X, model, encoder, cache=PREDICTION_CACHE):
+    """Vorhersage für eine Feature-Matrix (N, n_features) -> (N, 2).
+
+    Für das über resources geladene Modell werden Vorhersagen im geteilten Cache gehalten;
+    nur die nicht gecachten Zeilen gehen an model.predict. Für andere Modelle (oder
+    cache=None) wird immer direkt vorhergesagt.
+    """
+    version = model_version(model) if cache is not None else None
+    if version is None:
+        with TRACER.span('predict', zeilen=len(X)):
+            return np.asarray(model.predict(encoder.model_input(X, model)), dtype=np.float64)
+
+    prediction, missing = cache.lookup(X, version)
+    anzahl_fehlend = int(missing.sum())
+    TRACER.count('cache_treffer', len(X) - anzahl_fehlend)
+    TRACER.count('cache_fehlzugriffe', anzahl_fehlend)
+    if anzahl_fehlend:
+        with TRACER.span('predict', zeilen=anzahl_fehlend):
+            neu = np.asarray(model.predict(encoder.model_input(X[missing], model)), dtype=np.float64)
+        cache.store(X[missing], neu, version)
+        if prediction is None:
+            return neu
+        prediction[missing] = neu
+    return prediction
+
+
+def tree_predictions(X, model):
+    """Vorhersagen aller Bäume eines Random Forest als Array (n_trees, N, 2); None für andere Modelle.
+
+    CompactForest liefert das Array direkt. Beim sklearn-Modell wird jeder Baum einmal für den
+    ganzen Batch ausgewertet (wie in RandomForestRegressor.predict), nicht je Projekt.
+    """
+    if hasattr(model, 'predict_trees'):
+        return np.asarray(model.predict_trees(X), dtype=np.float64)
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None or not all(hasattr(baum, 'tree_') for baum in estimators):
+        return None
+    X32 = np.ascontiguousarray(X, dtype=np.float32)
+    return np.stack([baum.predict(X32, check_input=False) for baum in estimators]).reshape(len(estimators), len(X), -1)
+
+
+def prediction_intervals(X, model, quantile=INTERVALL_QUANTILE):
+    """Quantile der Baumvorhersagen je Zeile als Array (len(quantile), N, 2).
+
+    Alle Baumvorhersagen des Batches liegen in einem Array, die Quantile werden in einem
+    np.quantile-Aufruf gebildet. None, wenn das Modell kein Baum-Ensemble ist.
+    """
+    with TRACER.span('intervall', zeilen=len(X)):
+        baeume = tree_predictions(X, model)
+        if baeume is None:
+            return None
+        return np.quantile(baeume, quantile, axis=0)
+
+
+# --- Funktion zur Schätzung der Zeiten (wird von beiden Optionen genutzt) ---
+def estimate_times(produkttyp_list, größe_list, seitenverkleidung_list, dachtyp_list, anzahl_gewerke_list, tortyp_list, pv_integration_list, gesamtwert_gesamt, besonderheit_gesamt, mitarbeiter_filter, df_excel, model, encoder=None, cache=PREDICTION_CACHE, quantile=None):
+    """Schätzt Zeichnungs- und Stücklistenzeit eines Projekts; gibt ((zeichnung, stueckliste), quelle).
+
+    Mit quantile (z.B. INTERVALL_QUANTILE) kommt als drittes Element das Prognoseintervall
+    als Array (len(quantile), 2) hinzu: Zeilen je Quantil, Spalten Zeichnung/Stückliste. Es
+    ist None, wenn das Modell keine Baumvorhersagen liefert oder nicht geschätzt wurde.
+    """
+    # Quelle ist immer das KI-Modell nach Entfernung des Excel-Lookups
+    quelle = QUELLE_MODELL
+    gesamt_zeichnungszeit_h = 0
+    gesamt_stuecklistenzeit_h = 0
+
+    intervall = None
+
+    if not produkttyp_list:
+        return ((0, 0), QUELLE_OHNE_SYSTEME, None) if quantile is not None else ((0, 0), QUELLE_OHNE_SYSTEME)
+
+    if encoder is None:
+        encoder = ProjectFeatureEncoder.for_model(model)
+
+    # Erstelle eine Liste aller Systeme im aktuellen Projekt
+    current_systems = [
+        {
+            'Produkttyp': produkttyp_list[i],
+            'Größe': größe_list[i],
+            'Seitenverkleidung': seitenverkleidung_list[i],
+            'Dachtyp': dachtyp_list[i],
+            'Anzahl': anzahl_gewerke_list[i]
+        }
+        for i in range(len(produkttyp_list))
+    ]
+
+    # --- KI-Modell Schätzung für das gesamte Projekt ---
+    try:
+        # Kodiere das Projekt in eine Feature-Zeile (Systeme mit ungültiger Größe/Anzahl werden übersprungen)
+        with TRACER.span('kodierung', systeme=len(current_systems)):
+            X_input = encoder.encode(current_systems)
+        TRACER.count('projekte')
+
+        prediction = predict_rows(X_input, model, encoder, cache)[0]
+        gesamt_zeichnungszeit_h = prediction[0]
+        gesamt_stuecklistenzeit_h = prediction[1]
+        quelle = QUELLE_MODELL # Quelle ist immer KI nach Entfernung des Lookups
+
+        if quantile is not None:
+            intervall = prediction_intervals(X_input, model, quantile)
+            intervall = None if intervall is None else intervall[:, 0]
+
+    except Exception as e:
+        print(f"Fehler bei KI-Vorhersage: {e}")
+        gesamt_zeichnungszeit_h = 0
+        gesamt_stuecklistenzeit_h = 0
+        quelle = f'Fehler bei Schätzung: {e}'
+        intervall = None
+
+    if quantile is not None:
+        return (gesamt_zeichnungszeit_h, gesamt_stuecklistenzeit_h), quelle, intervall
+    return (gesamt_zeichnungszeit_h, gesamt_stuecklistenzeit_h), quelle
+
+
+def estimate_batch(projects, model=None, encoder=None, cache=PREDICTION_CACHE, quantile=None):
+    """Schätzt Zeichnungs- und Stücklistenzeit für viele Aufträge mit einem einzigen predict-Aufruf.
+
+    projects ist eine Liste von Aufträgen in der Form von SIMULATED_AP_PLUS_PROJECTS
+    (Dicts mit 'Interne_Auftragsnummer', 'Systeme' und optional 'Zugewiesener_Mitarbeiter').
+    Gibt einen DataFrame mit den Spalten ERGEBNIS_SPALTEN zurück (eine Zeile je Auftrag,
+    Reihenfolge wie in projects). Bereits gecachte Projekte werden nicht erneut vorhergesagt.
+    Anzahl_Systeme zählt wie das Modell-Feature nur die kodierbaren Systeme.
+
+    Mit quantile (aufsteigend, z.B. (unten, oben)) kommen die Spalten INTERVALL_SPALTEN aus dem
+    ersten und letzten Quantil hinzu (NaN, wenn das Modell keine Baumvorhersagen liefert).
+    """
+    if model is None:
+        model = get_model()
+    if encoder is None:
+        encoder = ProjectFeatureEncoder.for_model(model)
+
+    projects = list(projects)
+    systeme = [project.get('Systeme') or [] for project in projects]
+
+    # Alle Aufträge in eine Matrix kodieren und gemeinsam vorhersagen
+    with TRACER.span('kodierung', projekte=len(systeme)):
+        X = encoder.encode_many(systeme)
+    TRACER.count('projekte', len(systeme))
+    if len(X) > 0:
+        prediction = predict_rows(X, model, encoder, cache)
+    else:
+        prediction = np.zeros((0, 2), dtype=np.float64)
+
+    # Aufträge ohne Systeme bekommen wie in estimate_times keine Schätzung
+    ohne_systeme = np.array([len(s) == 0 for s in systeme], dtype=bool)
+    # Anzahl wie im Modell-Feature: vom Encoder übersprungene Systeme (ungültige Größe/Anzahl) zählen nicht
+    anzahl_systeme = X[:, encoder.feature_names.index(FEATURE_ANZAHL_SYSTEME)].astype(np.int64)
+    prediction[ohne_systeme] = 0
+
+    ergebnis = pd.DataFrame({
+        'Interne_Auftragsnummer': [project.get('Interne_Auftragsnummer') for project in projects],
+        'Zugewiesener_Mitarbeiter': [project.get('Zugewiesener_Mitarbeiter') for project in projects],
+        'Anzahl_Systeme': anzahl_systeme,
+        'Zeichnungszeit_h': prediction[:, 0],
+        'Stuecklistenzeit_h': prediction[:, 1],
+        'Quelle': np.where(ohne_systeme, QUELLE_OHNE_SYSTEME, QUELLE_MODELL),
+    }, columns=ERGEBNIS_SPALTEN)
+
+    if quantile is not None:
+        intervall = prediction_intervals(X, model, quantile) if len(X) > 0 else np.zeros((len(quantile), 0, 2))
+        if intervall is None:
+            intervall = np.full((len(quantile), len(X), 2), np.nan)
+        intervall[:, ohne_systeme] = 0
+        ergebnis['Zeichnungszeit_h_unten'] = intervall[0, :, 0]
+        ergebnis['Zeichnungszeit_h_oben'] = intervall[-1, :, 0]
+        ergebnis['Stuecklistenzeit_h_unten'] = intervall[0, :, 1]
+        ergebnis['Stuecklistenzeit_h_oben'] = intervall[-1, :, 1]
+    return ergebnis
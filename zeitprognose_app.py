@@ -1,17 +1,80 @@
+import time
+from contextlib import contextmanager
+
 import streamlit as st
-import joblib
 import pandas as pd
 import numpy as np
 
-# Excel-Tabelle laden (für Modell-Lookups und Filterung)
-excel_path = 'KI_Zeitprognose_Vorlage_Projekt-W.xlsx'
-df_excel = pd.read_excel(excel_path, header=1) # Angabe, dass Kopfzeile in Zeile 2 (Index 1) ist
-
-# Temporärer Print zur Fehlersuche: Zeige die gelesenen Spaltennamen
-# print("Gelesene Spaltennamen aus Excel:", df_excel.columns.tolist())
-
-# Modell laden (trainiert auf allen Daten)
-model = joblib.load("ki_zeitprognose_model.joblib")
+from batch_estimate import load_projects
+from capacity import WOCHE_UNGUELTIG, WOCHENKAPAZITAET_H, plan_capacity
+from feature_encoder import FEATURE_ANZAHL_SYSTEME, ProjectFeatureEncoder, RunningProjectVector
+from instrumentation import TRACER, profile, profile_path
+from model_registry import REGISTRY
+from order_source import get_order_source
+from prediction_cache import PREDICTION_CACHE
+from resources import get_model, get_similarity_index, resource_status
+from scenario import DIMENSIONEN, scenario_sweep, size_range
+from zeitprognose import INTERVALL_QUANTILE, estimate_times, prediction_intervals, predict_rows
+
+# Die Excel-Historie wird für die Schätzung nicht mehr gebraucht (Lookup entfernt) und daher
+# nicht gelesen; ähnliche Projekte kommen aus dem Nachbarindex.
+df_excel = None
+
+# Modell laden (trainiert auf allen Daten); einmal pro Prozess, neu bei geänderter Modelldatei
+with TRACER.span('modell_laden'):
+    model = get_model()
+
+# Feature-Encoder (gleiche Kodierung wie in train_model.py, Spaltenreihenfolge passend zum Modell)
+encoder = ProjectFeatureEncoder.for_model(model)
+
+
+@contextmanager
+def anfrage_messen(art):
+    """Zeitmessung einer Schätzung; ist im Debug-Panel das Profiling aktiviert, zusätzlich mit cProfile."""
+    with TRACER.span('anfrage', art=art):
+        if not st.session_state.get('profil_naechste'):
+            yield
+            return
+        st.session_state.profil_naechste = False
+        with profile(profile_path(f'anfrage-{art}')) as profil:
+            yield
+        st.session_state.letztes_profil = profil
+
+
+AEHNLICHE_PROJEKTE_K = 5
+
+
+def aehnliche_projekte_anzeigen(X):
+    """Die ähnlichsten historischen Projekte zur Feature-Zeile X mit ihren tatsächlichen Zeiten."""
+    if X[0, encoder.feature_names.index(FEATURE_ANZAHL_SYSTEME)] == 0:
+        return
+    index = get_similarity_index()
+    if index is None:
+        st.caption("Für die aktive Modellversion gibt es keinen passenden Nachbarindex (python similar_projects.py <modell>).")
+        return
+    with TRACER.span('aehnliche_projekte', projekte=len(index)):
+        aehnliche = index.similar(X, AEHNLICHE_PROJEKTE_K, encoder.feature_names)
+    st.write("**Ähnliche abgeschlossene Projekte (tatsächliche Zeiten):**")
+    st.dataframe(
+        aehnliche,
+        hide_index=True,
+        column_config={
+            'Abstand': st.column_config.NumberColumn(format="%.2f"),
+            'Zeichnungszeit': st.column_config.NumberColumn(format="%.1f h"),
+            'Stücklistenzeit': st.column_config.NumberColumn(format="%.1f h"),
+            'Gesamtfläche': st.column_config.NumberColumn(format="%.0f m²"),
+        },
+    )
+
+
+def zeiten_anzeigen(estimated_times, intervall):
+    """Geschätzte Zeiten als st.metric, darunter das Prognoseintervall aus den Einzelbäumen (falls vorhanden)."""
+    unten, oben = (round(q * 100) for q in INTERVALL_QUANTILE)
+    for i, bezeichnung in enumerate(["Zeichnung", "Stückliste"]):
+        st.metric(bezeichnung, f"{estimated_times[i]:.1f} Stunden")
+        if intervall is not None:
+            st.caption(f"{oben - unten} %-Intervall ({unten}.–{oben}. Perzentil der Bäume): "
+                       f"{intervall[0, i]:.1f} – {intervall[-1, i]:.1f} Stunden")
 
 # Spaltennamen in der Excel-Datei für den Lookup (müssen exakt übereinstimmen)
 EXCEL_PROJEKT_ID = 'Projekt-ID'
@@ -29,112 +92,6 @@ EXCEL_GROESSE_PREFIX = 'Größe '
 # EXCEL_PV_INTEGRATION_PREFIX = 'Photovoltaikintegration '
 # EXCEL_BESONDERHEIT_PREFIX = 'Besonderheit '
 
-# Namen der Features, die das Modell erwartet (aus train_model.py)
-# Dies ist eine manuelle Liste basierend auf dem Training mit drop_first=True
-# Eine robustere Lösung würde diese Liste aus dem gespeicherten Modell/Encoder laden.
-MODEL_FEATURE_NAMES = np.array([
-    'Fläche_m2',
-    'Anzahl_Gewerke',
-    'Produkttyp_Carport', 
-    'Produkttyp_Fahrradüberdachung',
-    'Produkttyp_Mülleinhausung',
-    'Produkttyp_Pergola',
-    'Produkttyp_Mülltonnenbox', 
-    'Seitenverkleidung_Gittermatte',
-    'Seitenverkleidung_Ohne',
-    'Seitenverkleidung_Stahl-Lochblech',
-    'Seitenverkleidung_Stahl-Vollblech',
-    'Seitenverkleidung_Trespa',
-    'Seitenverkleidung_WL',
-    'Seitenverkleidung_WL+LBK',
-    'Dachtyp_Gründach',
-    'Dachtyp_Gründach-Light',
-    'Dachtyp_Ohne',
-    'Dachtyp_Polycarbonat',
-    'Dachtyp_Trapezblech'
-])
-
-# --- Funktion zur Schätzung der Zeiten (wird von beiden Optionen genutzt) ---
-def estimate_times(produkttyp_list, größe_list, seitenverkleidung_list, dachtyp_list, anzahl_gewerke_list, tortyp_list, pv_integration_list, gesamtwert_gesamt, besonderheit_gesamt, mitarbeiter_filter, df_excel, model):
-    
-    # Quelle ist immer das KI-Modell nach Entfernung des Excel-Lookups
-    quelle = "KI-Modell"
-    gesamt_zeichnungszeit_h = 0
-    gesamt_stuecklistenzeit_h = 0
-
-    if not produkttyp_list:
-        return (0, 0), "Kein System zur Schätzung gefunden"
-
-    # Erstelle eine Liste aller Systeme im aktuellen Projekt
-    current_systems = []
-    for i in range(len(produkttyp_list)):
-        try:
-            current_größe_float = float(größe_list[i])
-            current_anzahl_gewerke_int = int(anzahl_gewerke_list[i])
-        except (ValueError, TypeError):
-            continue
-
-        current_systems.append({
-            'Produkttyp': produkttyp_list[i],
-            'Größe': current_größe_float,
-            'Seitenverkleidung': seitenverkleidung_list[i],
-            'Dachtyp': dachtyp_list[i],
-            'Anzahl': current_anzahl_gewerke_int
-        })
-
-    # --- KI-Modell Schätzung für das gesamte Projekt ---
-    try:
-        # Erstelle DataFrame für die Vorhersage des gesamten Projekts
-        X_input = pd.DataFrame([{
-            "Anzahl_Systeme": len(current_systems),
-            "Gesamtflaeche": sum(sys['Größe'] for sys in current_systems),
-            "Durchschnittliche_Systemgroesse": sum(sys['Größe'] for sys in current_systems) / len(current_systems) if len(current_systems) > 0 else 0,
-            "Gesamt_Anzahl_Gewerke": sum(sys['Anzahl'] for sys in current_systems),
-            "Produkttyp_Carport": sum(1 for sys in current_systems if sys['Produkttyp'] == 'Carport'),
-            "Produkttyp_Fahrradüberdachung": sum(1 for sys in current_systems if sys['Produkttyp'] == 'Fahrradüberdachung'),
-            "Produkttyp_Mülleinhausung": sum(1 for sys in current_systems if sys['Produkttyp'] == 'Mülleinhausung'),
-            "Produkttyp_Pergola": sum(1 for sys in current_systems if sys['Produkttyp'] == 'Pergola'),
-            "Produkttyp_Mülltonnenbox": sum(1 for sys in current_systems if sys['Produkttyp'] == 'Mülltonnenbox'),
-            "Seitenverkleidung_Gittermatte": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'Gittermatte'),
-            "Seitenverkleidung_Ohne": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'Ohne'),
-            "Seitenverkleidung_Stahl-Lochblech": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'Stahl-Lochblech'),
-            "Seitenverkleidung_Stahl-Vollblech": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'Stahl-Vollblech'),
-            "Seitenverkleidung_Trespa": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'Trespa'),
-            "Seitenverkleidung_WL": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'WL'),
-            "Seitenverkleidung_WL+LBK": sum(1 for sys in current_systems if sys['Seitenverkleidung'] == 'WL+LBK'),
-            "Dachtyp_Gründach": sum(1 for sys in current_systems if sys['Dachtyp'] == 'Gründach'),
-            "Dachtyp_Gründach-Light": sum(1 for sys in current_systems if sys['Dachtyp'] == 'Gründach-Light'),
-            "Dachtyp_Ohne": sum(1 for sys in current_systems if sys['Dachtyp'] == 'Ohne'),
-            "Dachtyp_Polycarbonat": sum(1 for sys in current_systems if sys['Dachtyp'] == 'Polycarbonat'),
-            "Dachtyp_Trapezblech": sum(1 for sys in current_systems if sys['Dachtyp'] == 'Trapezblech')
-        }])
-
-        # One-Hot-Encode die Eingabe
-        X_input_processed = pd.get_dummies(X_input, drop_first=True)
-
-        # Füge fehlende Spalten hinzu (mit Wert 0) und ordne die Spalten neu an
-        # Stelle sicher, dass model.feature_names_in_ existiert
-        if hasattr(model, 'feature_names_in_'):
-             X_input_reindexed = X_input_processed.reindex(columns=model.feature_names_in_, fill_value=0)
-        else:
-             # Fallback, falls feature_names_in_ nicht verfügbar ist (z.B. bei älteren scikit-learn Versionen)
-             print("Warnung: model.feature_names_in_ nicht verfügbar. Die Feature-Reihenfolge wird möglicherweise nicht korrekt gehandhabt.")
-             X_input_reindexed = X_input_processed
-
-        prediction = model.predict(X_input_reindexed)[0]
-        gesamt_zeichnungszeit_h = prediction[0]
-        gesamt_stuecklistenzeit_h = prediction[1]
-        quelle = 'KI-Modell' # Quelle ist immer KI nach Entfernung des Lookups
-
-    except Exception as e:
-        print(f"Fehler bei KI-Vorhersage: {e}")
-        gesamt_zeichnungszeit_h = 0
-        gesamt_stuecklistenzeit_h = 0
-        quelle = f'Fehler bei Schätzung: {e}'
-
-    return (gesamt_zeichnungszeit_h, gesamt_stuecklistenzeit_h), quelle
-
-
 # Simulierte ap+ Projektdaten (OHNE Zeiten, mit detaillierten Feldern)
 # Später durch tatsächlichen ap+ Zugriff ersetzen!
 SIMULATED_AP_PLUS_PROJECTS = [
@@ -185,7 +142,9 @@ SIMULATED_AP_PLUS_PROJECTS = [
 
 ]
 
-df_simulated_projects = pd.DataFrame(SIMULATED_AP_PLUS_PROJECTS)
+# Auftragsquelle: lokale SQLite-Datenbank (auftraege.sqlite bzw. ZEITPROGNOSE_AUFTRAEGE), falls vorhanden,
+# sonst die simulierten ap+ Aufträge; einmal pro Prozess angelegt und von allen Sessions geteilt
+order_source = get_order_source(SIMULATED_AP_PLUS_PROJECTS)
 
 # Listen für Dropdown-Optionen
 PRODUKTTYPEN = ['Carport', 'Mülleinhausung', 'Fahrradüberdachung', 'Pergola', 'Mülltonnenbox']
@@ -203,14 +162,13 @@ st.header("Projektzeiten per Auftragsnummer abrufen")
 auftragsnummer = st.text_input("Interne Auftragsnummer eingeben", key="auftragsnummer_input")
 
 if st.button("Zeiten für Auftragsnummer abrufen", key="btn_abrufen"):
-    # Projekt in simulierten Daten suchen
-    project_data = df_simulated_projects[df_simulated_projects['Interne_Auftragsnummer'] == auftragsnummer]
+    # Projekt in der Auftragsquelle suchen (Index auf der Auftragsnummer)
+    projekt_details = order_source.get(auftragsnummer)
 
-    if project_data.empty:
-        st.warning(f"Kein Projekt mit Auftragsnummer {auftragsnummer} in den simulierten Daten gefunden.")
+    if projekt_details is None:
+        st.warning(f"Kein Projekt mit Auftragsnummer {auftragsnummer} in den Auftragsdaten gefunden.")
     else:
         # Projektdetails extrahieren
-        projekt_details = project_data.iloc[0]
         systeme = projekt_details['Systeme']
 
         st.subheader(f"Details für Projekt {auftragsnummer}")
@@ -246,25 +204,31 @@ if st.button("Zeiten für Auftragsnummer abrufen", key="btn_abrufen"):
         pv_integration_list = [s.get('Photovoltaikintegration') for s in systeme]
 
         # Gesamtwert und Besonderheit hier nicht pro System übergeben, da estimate_times diese für den Lookup nicht nutzt
-        estimated_times, quelle = estimate_times(
-            produkttyp_list,
-            größe_list,
-            seitenverkleidung_list,
-            dachtyp_list,
-            anzahl_gewerke_list,
-            tortyp_list, # Wird in estimate_times aktuell nicht verwendet
-            pv_integration_list, # Wird in estimate_times aktuell nicht verwendet
-            None, # Gesamtwert pro Projekt entfernt
-            None, # Besonderheit pro Projekt entfernt
-            'Alle',  # Mitarbeiterfilter entfernt
-            df_excel,
-            model
-        )
+        with anfrage_messen('auftragsnummer'):
+            estimated_times, quelle, intervall = estimate_times(
+                produkttyp_list,
+                größe_list,
+                seitenverkleidung_list,
+                dachtyp_list,
+                anzahl_gewerke_list,
+                tortyp_list, # Wird in estimate_times aktuell nicht verwendet
+                pv_integration_list, # Wird in estimate_times aktuell nicht verwendet
+                None, # Gesamtwert pro Projekt entfernt
+                None, # Besonderheit pro Projekt entfernt
+                'Alle',  # Mitarbeiterfilter entfernt
+                df_excel,
+                model,
+                encoder,
+                quantile=INTERVALL_QUANTILE
+            )
 
         st.subheader("Geschätzte Bearbeitungszeiten")
         st.write(f"Quelle der Werte: **{quelle}**")
-        st.metric("Zeichnung", f"{estimated_times[0]:.1f} Stunden")
-        st.metric("Stückliste", f"{estimated_times[1]:.1f} Stunden")
+        col_schaetzung, col_aehnlich = st.columns([1, 2])
+        with col_schaetzung:
+            zeiten_anzeigen(estimated_times, intervall)
+        with col_aehnlich:
+            aehnliche_projekte_anzeigen(encoder.encode(systeme))
         st.write("_Hinweis: Die Zeiten sind die Summe aller Systeme im Projekt._")
 
 # --- Option 2: Manuelle Eingabe Projektdetails ---
@@ -286,76 +250,408 @@ with col2:
         st.session_state.num_systems -= 1
         st.rerun()
 
-with st.form("manual_input_form"):
+
+def system_eingabe(i, **widget_args):
+    """Eingabefelder für System i (Formular und Live-Schätzung); gibt das System-Dict zurück.
+
+    widget_args (z.B. on_change) werden an alle Widgets weitergereicht.
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        manual_produkttyp = st.selectbox(f"Produkttyp System {i+1}", PRODUKTTYPEN, key=f"manual_produkttyp_{i}", **widget_args)
+        manual_größe = st.number_input(f"Größe System {i+1} in m²", min_value=1, value=100, key=f"manual_größe_{i}", **widget_args)
+        manual_seitenverkleidung = st.selectbox(f"Seitenverkleidung System {i+1}", SEITENVERKLEIDUNGEN, key=f"manual_seitenverkleidung_{i}", **widget_args)
+        manual_dachtyp = st.selectbox(f"Dachtyp System {i+1}", DACHTYPEN, key=f"manual_dachtyp_{i}", **widget_args)
+    with col2:
+        manual_anzahl_gewerke = st.slider(f"Anzahl System {i+1}", min_value=1, max_value=5, value=2, key=f"manual_anzahl_gewerke_{i}", **widget_args) # Ändere Label zu "Anzahl"
+        manual_tortyp = st.selectbox(f"Tortyp System {i+1}", TORTYPEN, key=f"manual_tortyp_{i}", **widget_args)
+        manual_pv_integration = st.selectbox(f"Photovoltaikintegration System {i+1}", PV_OPTIONEN, key=f"manual_pv_integration_{i}", **widget_args)
+        manual_gesamtwert = st.number_input(f"Gesamtwert System {i+1} (Euro Brutto)", min_value=0, value=10000, key=f"manual_gesamtwert_{i}", **widget_args)
+        manual_besonderheit = st.selectbox(f"Besonderheit System {i+1}", BESONDERHEITEN, index=1, key=f"manual_besonderheit_{i}", **widget_args) # Standard auf 'Keine' (Index 1)
+
+    return {
+        'Produkttyp': manual_produkttyp,
+        'Größe': manual_größe,
+        'Seitenverkleidung': manual_seitenverkleidung,
+        'Dachtyp': manual_dachtyp,
+        'Anzahl_Gewerke': manual_anzahl_gewerke, # Behalte 'Anzahl_Gewerke' für Konsistenz mit Excel/Modell
+        'Tortyp': manual_tortyp,
+        'Photovoltaikintegration': manual_pv_integration,
+        'Gesamtwert': manual_gesamtwert,
+        'Besonderheit': manual_besonderheit
+    }
+
+
+# Live-Schätzung: Eingaben und Ergebnis in einem Fragment, eine Änderung rendert nur diesen Bereich neu.
+# Die Feature-Zeile wird nur um das geänderte System angepasst (RunningProjectVector), geschätzt wird
+# nur bei geänderter Zeile (wenige Millisekunden). Kein Warten im Skript-Thread: kommt während eines
+# Laufs eine weitere Eingabe, bricht Streamlit ihn ab und startet das Fragment mit dem neuesten Stand.
+
+
+def _live_system_geaendert(i):
+    st.session_state.setdefault('live_geaendert', set()).add(i)
+
+
+@st.fragment
+def live_schaetzung():
     st.subheader("Details zu den Systemen")
-    
-    manual_systeme_inputs = []
+    systeme = []
     for i in range(st.session_state.num_systems):
         st.write(f"**System {i+1}:**")
-        col1, col2 = st.columns(2)
-        with col1:
-            manual_produkttyp = st.selectbox(f"Produkttyp System {i+1}", PRODUKTTYPEN, key=f"manual_produkttyp_{i}")
-            manual_größe = st.number_input(f"Größe System {i+1} in m²", min_value=1, value=100, key=f"manual_größe_{i}")
-            manual_seitenverkleidung = st.selectbox(f"Seitenverkleidung System {i+1}", SEITENVERKLEIDUNGEN, key=f"manual_seitenverkleidung_{i}")
-            manual_dachtyp = st.selectbox(f"Dachtyp System {i+1}", DACHTYPEN, key=f"manual_dachtyp_{i}")
-        with col2:
-            manual_anzahl_gewerke = st.slider(f"Anzahl System {i+1}", min_value=1, max_value=5, value=2, key=f"manual_anzahl_gewerke_{i}") # Ändere Label zu "Anzahl"
-            manual_tortyp = st.selectbox(f"Tortyp System {i+1}", TORTYPEN, key=f"manual_tortyp_{i}")
-            manual_pv_integration = st.selectbox(f"Photovoltaikintegration System {i+1}", PV_OPTIONEN, key=f"manual_pv_integration_{i}")
-            manual_gesamtwert = st.number_input(f"Gesamtwert System {i+1} (Euro Brutto)", min_value=0, value=10000, key=f"manual_gesamtwert_{i}")
-            manual_besonderheit = st.selectbox(f"Besonderheit System {i+1}", BESONDERHEITEN, index=1, key=f"manual_besonderheit_{i}") # Standard auf 'Keine' (Index 1)
-
-        manual_systeme_inputs.append({
-            'Produkttyp': manual_produkttyp,
-            'Größe': manual_größe,
-            'Seitenverkleidung': manual_seitenverkleidung,
-            'Dachtyp': manual_dachtyp,
-            'Anzahl_Gewerke': manual_anzahl_gewerke, # Behalte 'Anzahl_Gewerke' für Konsistenz mit Excel/Modell
-            'Tortyp': manual_tortyp,
-            'Photovoltaikintegration': manual_pv_integration,
-            'Gesamtwert': manual_gesamtwert,
-            'Besonderheit': manual_besonderheit
-        })
-
-    st.subheader("Projektdetails")
-    manual_konstrukteur = st.selectbox("Zuständiger Konstrukteur", MITARBEITER, index=0, key="manual_konstrukteur")
-
-    submit_manual_button = st.form_submit_button("Zeiten schätzen (Manuell)")
-
-    if submit_manual_button:
-        # --- Zeiten schätzen (verwendet die gleiche Logik) ---
-        # Sammle die Listen für die Schätzfunktion aus den manuellen Inputs
-        manual_produkttyp_list = [s.get('Produkttyp') for s in manual_systeme_inputs]
-        manual_größe_list = [s.get('Größe') for s in manual_systeme_inputs]
-        manual_seitenverkleidung_list = [s.get('Seitenverkleidung') for s in manual_systeme_inputs]
-        manual_dachtyp_list = [s.get('Dachtyp') for s in manual_systeme_inputs]
-        manual_anzahl_gewerke_list = [s.get('Anzahl_Gewerke') for s in manual_systeme_inputs]
-        manual_tortyp_list = [s.get('Tortyp') for s in manual_systeme_inputs]
-        manual_pv_integration_list = [s.get('Photovoltaikintegration') for s in manual_systeme_inputs]
-        manual_gesamtwert_list = [s.get('Gesamtwert') for s in manual_systeme_inputs]
-        manual_besonderheit_list = [s.get('Besonderheit') for s in manual_systeme_inputs]
-
-        estimated_times_manual, quelle_manual = estimate_times(
-            manual_produkttyp_list,
-            manual_größe_list,
-            manual_seitenverkleidung_list,
-            manual_dachtyp_list,
-            manual_anzahl_gewerke_list,
-            manual_tortyp_list, # Wird in estimate_times aktuell nicht verwendet
-            manual_pv_integration_list, # Wird in estimate_times aktuell nicht verwendet
-            sum(manual_gesamtwert_list),  # Wird in estimate_times aktuell nicht verwendet
-            ", ".join(filter(None, manual_besonderheit_list)),  # Wird in estimate_times aktuell nicht verwendet
-            'Alle',  # Mitarbeiterfilter entfernt
-            df_excel,
-            model
+        systeme.append(system_eingabe(i, on_change=_live_system_geaendert, args=(i,)))
+
+    # Dauer ab der Aktualisierung der Feature-Zeile bis zur fertigen Schätzung
+    start = time.perf_counter()
+    vektor = st.session_state.get('live_vektor')
+    if vektor is None or vektor.encoder.feature_names != encoder.feature_names:
+        vektor = st.session_state.live_vektor = RunningProjectVector(encoder)
+    geaendert = st.session_state.get('live_geaendert', set())
+    for i, system in enumerate(systeme):
+        if i in geaendert or i not in vektor:
+            vektor.update(i, system)
+    for i in vektor.keys():
+        if i >= len(systeme):
+            vektor.remove(i)
+    st.session_state.live_geaendert = set()
+
+    st.subheader("Geschätzte Bearbeitungszeiten (Live)")
+    X = vektor.row()
+    letzte = st.session_state.get('live_ergebnis')
+    # Nur neu schätzen, wenn sich die Feature-Zeile oder das Modell geändert hat (nicht z.B. bei Tortyp)
+    if letzte is None or letzte['modell'] is not model or not np.array_equal(letzte['X'], X):
+        with anfrage_messen('live'):
+            if X[0, encoder.feature_names.index(FEATURE_ANZAHL_SYSTEME)] > 0:
+                zeiten = predict_rows(X, model, encoder)[0]
+                intervall = prediction_intervals(X, model, INTERVALL_QUANTILE)
+                intervall = None if intervall is None else intervall[:, 0]
+            else:
+                zeiten, intervall = (0, 0), None
+        letzte = st.session_state.live_ergebnis = {
+            'X': X, 'modell': model, 'zeiten': zeiten, 'intervall': intervall,
+            'dauer_ms': (time.perf_counter() - start) * 1000,
+        }
+
+    col_schaetzung, col_aehnlich = st.columns([1, 2])
+    with col_schaetzung:
+        zeiten_anzeigen(letzte['zeiten'], letzte['intervall'])
+    with col_aehnlich:
+        aehnliche_projekte_anzeigen(X)
+    st.caption(f"Schätzung in {letzte['dauer_ms']:.1f} ms aktualisiert.")
+    st.write("_Hinweis: Die Zeiten sind die Summe aller Systeme im Projekt._")
+    return systeme
+
+
+# Beim Umschalten den laufenden Vektor verwerfen (Änderungen im Formular wurden nicht mitgezählt)
+manual_live = st.toggle(
+    "Live-Schätzung (aktualisiert bei jeder Änderung, ohne Absenden)",
+    key="manual_live",
+    on_change=lambda: st.session_state.pop('live_vektor', None),
+)
+if manual_live:
+    manual_systeme_inputs = live_schaetzung()
+else:
+    with st.form("manual_input_form"):
+        st.subheader("Details zu den Systemen")
+    
+        manual_systeme_inputs = []
+        for i in range(st.session_state.num_systems):
+            st.write(f"**System {i+1}:**")
+            manual_systeme_inputs.append(system_eingabe(i))
+
+        st.subheader("Projektdetails")
+        manual_konstrukteur = st.selectbox("Zuständiger Konstrukteur", MITARBEITER, index=0, key="manual_konstrukteur")
+
+        submit_manual_button = st.form_submit_button("Zeiten schätzen (Manuell)")
+
+        if submit_manual_button:
+            # --- Zeiten schätzen (verwendet die gleiche Logik) ---
+            # Sammle die Listen für die Schätzfunktion aus den manuellen Inputs
+            manual_produkttyp_list = [s.get('Produkttyp') for s in manual_systeme_inputs]
+            manual_größe_list = [s.get('Größe') for s in manual_systeme_inputs]
+            manual_seitenverkleidung_list = [s.get('Seitenverkleidung') for s in manual_systeme_inputs]
+            manual_dachtyp_list = [s.get('Dachtyp') for s in manual_systeme_inputs]
+            manual_anzahl_gewerke_list = [s.get('Anzahl_Gewerke') for s in manual_systeme_inputs]
+            manual_tortyp_list = [s.get('Tortyp') for s in manual_systeme_inputs]
+            manual_pv_integration_list = [s.get('Photovoltaikintegration') for s in manual_systeme_inputs]
+            manual_gesamtwert_list = [s.get('Gesamtwert') for s in manual_systeme_inputs]
+            manual_besonderheit_list = [s.get('Besonderheit') for s in manual_systeme_inputs]
+
+            with anfrage_messen('manuell'):
+                estimated_times_manual, quelle_manual, intervall_manual = estimate_times(
+                    manual_produkttyp_list,
+                    manual_größe_list,
+                    manual_seitenverkleidung_list,
+                    manual_dachtyp_list,
+                    manual_anzahl_gewerke_list,
+                    manual_tortyp_list, # Wird in estimate_times aktuell nicht verwendet
+                    manual_pv_integration_list, # Wird in estimate_times aktuell nicht verwendet
+                    sum(manual_gesamtwert_list),  # Wird in estimate_times aktuell nicht verwendet
+                    ", ".join(filter(None, manual_besonderheit_list)),  # Wird in estimate_times aktuell nicht verwendet
+                    'Alle',  # Mitarbeiterfilter entfernt
+                    df_excel,
+                    model,
+                    encoder,
+                    quantile=INTERVALL_QUANTILE
+                )
+
+            st.subheader("Geschätzte Bearbeitungszeiten (Manuell)")
+            st.write(f"Quelle der Werte: **{quelle_manual}**")
+            col_schaetzung, col_aehnlich = st.columns([1, 2])
+            with col_schaetzung:
+                zeiten_anzeigen(estimated_times_manual, intervall_manual)
+            with col_aehnlich:
+                aehnliche_projekte_anzeigen(encoder.encode(manual_systeme_inputs))
+            st.write("_Hinweis: Die Zeiten sind die Summe aller Systeme im Projekt._")
+
+# --- Szenario-Analyse: ein System des Projekts variieren und alle Varianten in einem Durchgang schätzen ---
+SZENARIO_MAX_SERIEN = 20
+st.header("Szenario-Analyse (Was-wäre-wenn)")
+st.write("Wie ändern sich die Zeiten, wenn ein System eine andere Größe, einen anderen Dachtyp, eine andere Seitenverkleidung oder Anzahl bekommt?")
+
+szenario_basis = st.radio("Basisprojekt", ["Auftragsnummer", "Manuelle Eingabe"], horizontal=True, key="szenario_basis")
+szenario_systeme = []
+if szenario_basis == "Auftragsnummer":
+    szenario_auftrag = st.text_input("Auftragsnummer des Basisprojekts", key="szenario_auftrag")
+    szenario_projekt = order_source.get(szenario_auftrag) if szenario_auftrag else None
+    if szenario_auftrag and szenario_projekt is None:
+        st.warning(f"Kein Projekt mit Auftragsnummer {szenario_auftrag} in den Auftragsdaten gefunden.")
+    elif szenario_projekt is not None:
+        szenario_systeme = szenario_projekt['Systeme']
+else:
+    st.caption("Basis sind die Systeme aus der manuellen Eingabe (zuletzt übernommene Werte).")
+    szenario_systeme = manual_systeme_inputs
+
+if szenario_systeme:
+    szenario_system = st.selectbox(
+        "Variiertes System",
+        range(len(szenario_systeme)),
+        format_func=lambda i: f"System {i + 1}: {szenario_systeme[i].get('Produkttyp')}, {szenario_systeme[i].get('Größe')} m²",
+        key="szenario_system",
+    )
+    szenario_dimensionen = st.multiselect("Variierte Merkmale", DIMENSIONEN, default=['Größe', 'Dachtyp'], key="szenario_dimensionen")
+
+    variationen = {}
+    if 'Größe' in szenario_dimensionen:
+        sz_col1, sz_col2 = st.columns(2)
+        with sz_col1:
+            groessen_bereich = st.slider("Größe von/bis (m²)", min_value=1, max_value=1000, value=(50, 300), key="szenario_groesse")
+        with sz_col2:
+            groessen_stufen = st.number_input("Anzahl Größenstufen", min_value=2, max_value=1000, value=26, key="szenario_stufen")
+        variationen['Größe'] = size_range(groessen_bereich[0], groessen_bereich[1], groessen_stufen)
+    if 'Dachtyp' in szenario_dimensionen:
+        variationen['Dachtyp'] = st.multiselect("Dachtypen", DACHTYPEN, default=DACHTYPEN, key="szenario_dachtypen")
+    if 'Seitenverkleidung' in szenario_dimensionen:
+        variationen['Seitenverkleidung'] = st.multiselect(
+            "Seitenverkleidungen", SEITENVERKLEIDUNGEN, default=SEITENVERKLEIDUNGEN, key="szenario_seitenverkleidungen"
         )
+    if 'Anzahl' in szenario_dimensionen:
+        anzahl_bereich = st.slider("Anzahl von/bis", min_value=1, max_value=5, value=(1, 5), key="szenario_anzahl")
+        variationen['Anzahl'] = list(range(anzahl_bereich[0], anzahl_bereich[1] + 1))
 
-        st.subheader("Geschätzte Bearbeitungszeiten (Manuell)")
-        st.write(f"Quelle der Werte: **{quelle_manual}**")
-        st.metric("Zeichnung", f"{estimated_times_manual[0]:.1f} Stunden")
-        st.metric("Stückliste", f"{estimated_times_manual[1]:.1f} Stunden")
-        st.write("_Hinweis: Die Zeiten sind die Summe aller Systeme im Projekt._")
+    st.write(f"Varianten im Raster: **{int(np.prod([len(v) for v in variationen.values()]))}**")
+    if st.button("Szenarien schätzen", key="btn_szenario"):
+        try:
+            with anfrage_messen('szenario'):
+                ergebnis = scenario_sweep(szenario_systeme, variationen, szenario_system, model, encoder)
+            # Ergebnis über Reruns hinweg behalten (z.B. beim Ändern anderer Widgets)
+            st.session_state.szenario_ergebnis = (ergebnis, list(variationen))
+        except ValueError as e:
+            st.error(f"Szenarien konnten nicht geschätzt werden: {e}")
+
+if st.session_state.get('szenario_ergebnis') is not None:
+    szenario_ergebnis, szenario_dims = st.session_state.szenario_ergebnis
+    # Bezeichnung je Variante aus allen variierten Merkmalen außer der Größe (Größe ist die x-Achse)
+    andere_dims = [d for d in szenario_dims if d != 'Größe']
+    if andere_dims:
+        variante = szenario_ergebnis[andere_dims[0]].astype(str).str.cat(
+            [szenario_ergebnis[d].astype(str) for d in andere_dims[1:]], sep=' / '
+        )
+    else:
+        variante = pd.Series('Basis', index=szenario_ergebnis.index)
 
-# Optional: Anzeige der simulierten Projektdaten (hilfreich für die Demo)
-st.sidebar.subheader("Simulierte ap+ Projekte Struktur")
-st.sidebar.write("\n".join([f"- {p['Interne_Auftragsnummer']}" for p in SIMULATED_AP_PLUS_PROJECTS]))
\ No newline at end of file
+    if 'Größe' in szenario_dims:
+        diagramm = szenario_ergebnis.assign(Variante=variante).pivot_table(index='Größe', columns='Variante', values='Gesamtzeit_h')
+        anzahl_serien = diagramm.shape[1]
+        st.line_chart(diagramm.iloc[:, :SZENARIO_MAX_SERIEN], x_label="Größe (m²)", y_label="Gesamtzeit (Stunden)")
+    else:
+        diagramm = szenario_ergebnis.assign(Variante=variante).set_index('Variante')[['Zeichnungszeit_h', 'Stuecklistenzeit_h']]
+        anzahl_serien = len(diagramm)
+        st.bar_chart(diagramm.iloc[:SZENARIO_MAX_SERIEN], y_label="Stunden")
+    if anzahl_serien > SZENARIO_MAX_SERIEN:
+        st.caption(f"Das Diagramm zeigt die ersten {SZENARIO_MAX_SERIEN} Varianten, die Tabelle enthält alle.")
+
+    st.dataframe(
+        szenario_ergebnis,
+        hide_index=True,
+        column_config={
+            'Zeichnungszeit_h': st.column_config.NumberColumn("Zeichnung", format="%.1f h"),
+            'Stuecklistenzeit_h': st.column_config.NumberColumn("Stückliste", format="%.1f h"),
+            'Gesamtzeit_h': st.column_config.NumberColumn("Gesamt", format="%.1f h"),
+        },
+    )
+
+# --- Kapazitätsplanung: Arbeitslast aller offenen Aufträge je Konstrukteur und Woche ---
+KAPA_AUTOMATISCH_MAX = 5000
+# Höchstzahl der Auftragsnummern in Hinweisen
+KAPA_MAX_GENANNT = 20
+st.header("Kapazitätsplanung")
+st.write("Geschätzte Zeichnungs- und Stücklistenstunden aller offenen Aufträge je Konstrukteur und Kalenderwoche.")
+
+kapa_col1, kapa_col2 = st.columns(2)
+with kapa_col1:
+    wochenkapazitaet = st.number_input(
+        "Wochenkapazität je Konstrukteur (Stunden)", min_value=1.0, value=WOCHENKAPAZITAET_H, step=1.0, key="kapa_wochenstunden"
+    )
+with kapa_col2:
+    kapa_mitarbeiter = st.selectbox("Konstrukteur", MITARBEITER, index=0, key="kapa_mitarbeiter")
+kapa_datei = st.file_uploader(
+    "Auftragsliste hochladen (JSON, CSV oder Excel; ohne Datei: alle Aufträge der Auftragsquelle)",
+    type=['json', 'csv', 'xlsx'],
+    key="kapa_datei",
+)
+# Bei sehr großen Auftragsbeständen nicht bei jedem Rerun automatisch rechnen
+kapa_berechnen = st.toggle(
+    "Kapazitätsplanung berechnen", value=len(order_source) <= KAPA_AUTOMATISCH_MAX, key="kapa_berechnen"
+)
+
+offene_auftraege = []
+if kapa_berechnen:
+    try:
+        offene_auftraege = load_projects(kapa_datei) if kapa_datei is not None else order_source.all_orders()
+    except ValueError as e:
+        st.error(f"Auftragsliste konnte nicht gelesen werden: {e}")
+
+if offene_auftraege:
+    plan = plan_capacity(offene_auftraege, model, encoder, wochenkapazitaet, mitarbeiter=MITARBEITER[1:])
+    auslastung = plan.auslastung
+    vorschlaege = plan.vorschlaege
+    if kapa_mitarbeiter != 'Alle':
+        auslastung = auslastung[auslastung['Mitarbeiter'] == kapa_mitarbeiter]
+        vorschlaege = vorschlaege[(vorschlaege['Von'] == kapa_mitarbeiter) | (vorschlaege['Nach'] == kapa_mitarbeiter)]
+
+    ohne_woche = plan.auftraege.loc[plan.auftraege['Woche'] == WOCHE_UNGUELTIG, 'Interne_Auftragsnummer']
+    if not ohne_woche.empty:
+        st.warning(
+            f"{len(ohne_woche)} Aufträge mit nicht lesbarem Startdatum (in der Spalte '{WOCHE_UNGUELTIG}'): "
+            + ", ".join(str(nummer) for nummer in ohne_woche.head(KAPA_MAX_GENANNT))
+            + (" ..." if len(ohne_woche) > KAPA_MAX_GENANNT else "")
+        )
+
+    st.bar_chart(auslastung, x='Woche', y='Stunden', color='Mitarbeiter', stack=False)
+    st.dataframe(
+        auslastung,
+        hide_index=True,
+        column_config={
+            'Stunden': st.column_config.NumberColumn(format="%.1f h"),
+            'Kapazitaet': st.column_config.NumberColumn("Kapazität", format="%.0f h"),
+            'Frei': st.column_config.NumberColumn(format="%.1f h"),
+            'Auslastung': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+            'Ueberlastet': st.column_config.CheckboxColumn("Überlastet"),
+        },
+    )
+
+    ueberlastet = auslastung[auslastung['Ueberlastet']]
+    if ueberlastet.empty:
+        st.success("Keine Überlastung bei der eingestellten Wochenkapazität.")
+    else:
+        st.warning(
+            "Überlastet: " + ", ".join(f"{z.Mitarbeiter} ({z.Woche}, {z.Stunden:.1f} h)" for z in ueberlastet.itertuples())
+        )
+        if vorschlaege.empty:
+            st.write("_Keine Umverteilung möglich: In den betroffenen Wochen hat kein Konstrukteur genug freie Kapazität._")
+        else:
+            st.subheader("Vorschläge zur Umverteilung")
+            st.dataframe(vorschlaege, hide_index=True, column_config={'Stunden': st.column_config.NumberColumn(format="%.1f h")})
+
+# Optional: Anzeige der Auftragsnummern (hilfreich für die Demo); bei großen Datenbanken nur die ersten
+SIDEBAR_MAX_AUFTRAEGE = 20
+auftragsnummern = order_source.order_numbers()
+st.sidebar.subheader("Aufträge")
+st.sidebar.write("\n".join([f"- {nummer}" for nummer in auftragsnummern[:SIDEBAR_MAX_AUFTRAEGE]]))
+if len(auftragsnummern) > SIDEBAR_MAX_AUFTRAEGE:
+    st.sidebar.write(f"... und {len(auftragsnummern) - SIDEBAR_MAX_AUFTRAEGE} weitere")
+
+# Ladezeiten der gecachten Ressourcen (Modell, Nachbarindex)
+st.sidebar.subheader("Ladezeiten")
+for status in resource_status():
+    if status['geladen']:
+        geladen_um = time.strftime('%H:%M:%S', time.localtime(status['geladen_um']))
+        st.sidebar.write(
+            f"- {status['name']}: {status['ladezeit_s']:.2f} s (geladen um {geladen_um}, "
+            f"Version {status['version']}, {status['anzahl_ladevorgaenge']}x geladen)"
+        )
+    else:
+        st.sidebar.write(f"- {status['name']}: noch nicht geladen")
+    if status['fehler']:
+        st.sidebar.warning(f"{status['name']}: Neuladen fehlgeschlagen ({status['fehler']})")
+
+# Modellversion aus der Registry: neueste automatisch oder eine Version festpinnen (gilt für alle Sessions)
+MODELL_AUTOMATISCH = 'Neueste (automatisch)'
+
+
+def _modellversion_geaendert():
+    auswahl = st.session_state.modellversion
+    if auswahl == MODELL_AUTOMATISCH:
+        REGISTRY.unpin()
+    else:
+        REGISTRY.pin(auswahl)
+
+
+def _modell_rollback():
+    try:
+        REGISTRY.rollback()
+    except ValueError as e:
+        st.session_state.rollback_fehler = str(e)
+
+
+modell_versionen = REGISTRY.versions()
+if modell_versionen:
+    st.sidebar.subheader("Modellversion")
+    # Auswahl bei jedem Lauf mit der Registry abgleichen (Pinning kann aus anderer Session stammen)
+    st.session_state.modellversion = REGISTRY.pinned() or MODELL_AUTOMATISCH
+    st.sidebar.selectbox(
+        "Aktive Version",
+        [MODELL_AUTOMATISCH] + modell_versionen[::-1],
+        key="modellversion",
+        on_change=_modellversion_geaendert,
+    )
+    st.sidebar.button("Rollback auf vorherige Version", key="modell_rollback", on_click=_modell_rollback)
+    if st.session_state.get('rollback_fehler'):
+        st.sidebar.warning(st.session_state.pop('rollback_fehler'))
+    aktive_version = REGISTRY.active()
+    meta = REGISTRY.metadata(aktive_version)
+    test_score = (meta.get('scores') or {}).get('test_score')
+    st.sidebar.write(
+        f"Aktiv: **{aktive_version}** ({meta.get('modus')}, {meta.get('erstellt')}), "
+        f"{meta.get('trainingszeilen')} Trainingsprojekte"
+        + (f", Test-Score {test_score:.3f}" if test_score is not None else "")
+    )
+
+# Zähler des geteilten Vorhersage-Caches (über alle Sessions und die Batch-Schätzung)
+cache_stats = PREDICTION_CACHE.stats()
+st.sidebar.subheader("Vorhersage-Cache")
+st.sidebar.write(
+    f"{cache_stats['eintraege']}/{cache_stats['maxsize']} Einträge, "
+    f"{cache_stats['hits']} Treffer, {cache_stats['misses']} Fehlzugriffe "
+    f"({cache_stats['trefferquote']:.0%}), {cache_stats['evictions']} verdrängt, "
+    f"{cache_stats['flushes']}x geleert"
+)
+
+# Debug-Panel: letzte Zeitmessungen, Zähler und Profiling der nächsten Anfrage
+if st.sidebar.checkbox("Debug-Ansicht (Zeitmessung)", key="debug_panel"):
+    spans = TRACER.recent(30)
+    if spans:
+        st.sidebar.dataframe(
+            pd.DataFrame(spans)[['zeit', 'pfad', 'dauer_ms']],
+            hide_index=True,
+        )
+    zaehler = TRACER.counters()
+    st.sidebar.write(", ".join(f"{name}: {wert}" for name, wert in sorted(zaehler.items())) or "Noch keine Zähler")
+    if TRACER.path:
+        st.sidebar.caption(f"Strukturiertes Log: {TRACER.path}")
+    st.sidebar.checkbox("Nächste Schätzung mit cProfile aufzeichnen", key="profil_naechste")
+    letztes_profil = st.session_state.get('letztes_profil')
+    if letztes_profil:
+        st.sidebar.caption(f"Letztes Profil: {letztes_profil['datei']}")
+        with st.sidebar.expander("Profil-Zusammenfassung"):
+            st.text(letztes_profil['zusammenfassung'])